@@ -0,0 +1,152 @@
+import os
+import time
+import streamlit as st
+import pandas as pd
+from utils.dataset_cache import feature_matrix
+from utils.features import FEATURES
+from utils.fleet import VEHICLE_COLUMN, Fleet, simulate_fleet, split_streams
+from utils.render import LiveChart
+from utils.stream import FEATURE_DTYPES, SchemaError, validate_header
+
+# Seconds of scoring per script run before the view is refreshed
+STEP_BUDGET = 0.5
+
+
+def load_uploaded_fleet(uploaded_file):
+    """Per-vehicle feature matrices from an uploaded CSV with a ``vehicle_id`` column."""
+    validate_header(uploaded_file)
+    if VEHICLE_COLUMN not in pd.read_csv(uploaded_file, nrows=0).columns:
+        raise SchemaError(f"no '{VEHICLE_COLUMN}' column to tell the vehicles apart")
+    uploaded_file.seek(0)
+    data = pd.read_csv(uploaded_file, usecols=FEATURES + [VEHICLE_COLUMN], dtype=FEATURE_DTYPES)
+    return split_streams(data)
+
+
+def stop_fleet():
+    fleet = st.session_state.get('fleet')
+    if fleet is not None:
+        fleet.cancel()
+    st.session_state.fleet_active = False
+
+
+def app():
+    theme = st.get_option("theme.base")
+    st.markdown("""
+        <style>
+            .big-font {
+                font-size: 28px !important;
+                font-weight: bold;
+                text-align: center;
+                padding: 10px;
+                border-radius: 8px;
+            }
+            .metrics-center {
+                text-align: center;
+                font-size: 18px;
+                margin-top: 10px;
+            }
+        </style>
+    """, unsafe_allow_html=True)
+    st.markdown("<h1 class='big-font'>Fleet Threat Monitor</h1>", unsafe_allow_html=True)
+    st.write("Scores several UAV telemetry streams at once. Each vehicle keeps its own threshold, "
+             "history and counters, and scoring is spread across a pool of worker processes.")
+
+    if 'fleet' not in st.session_state:
+        st.session_state.fleet = None
+    if 'fleet_active' not in st.session_state:
+        st.session_state.fleet_active = False
+
+    source = st.radio("Fleet Source:", ["Simulated fleet (built-in stream)", "Upload CSV with vehicle_id"],
+                      horizontal=True)
+    uploaded_file = None
+    if source.startswith("Simulated"):
+        vehicles = st.slider("Number of Vehicles:", 2, 16, 4)
+    else:
+        uploaded_file = st.file_uploader("Upload Fleet CSV File", type=["csv"])
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        batch_size = st.number_input("Batch Size (rows per vehicle):", min_value=1, max_value=5000, value=256)
+    with col2:
+        contamination_threshold = st.slider("Contamination Threshold:", 0.0, 1.0, 0.20, 0.01)
+    with col3:
+        cpus = os.cpu_count() or 1
+        workers = st.number_input("Worker Processes:", min_value=1, max_value=max(cpus, 1) * 2, value=cpus)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("Start"):
+            if st.session_state.fleet is None or st.session_state.fleet.done:
+                try:
+                    if uploaded_file is not None:
+                        streams = load_uploaded_fleet(uploaded_file)
+                    elif source.startswith("Simulated"):
+                        stream_path = os.path.join("datasets", "synthetic_data_stream.csv")
+                        streams = simulate_fleet(feature_matrix(stream_path), vehicles)
+                    else:
+                        streams = None
+                        st.warning("Upload a fleet CSV first.")
+                except (SchemaError, ValueError) as exc:
+                    streams = None
+                    st.error(f"The fleet can't be streamed: {exc}")
+                if streams:
+                    st.session_state.fleet = Fleet(streams, contamination_threshold, batch_size, workers)
+                    st.session_state.fleet_started = time.perf_counter()
+                    st.session_state.fleet_active = True
+            else:
+                st.session_state.fleet_active = True
+    with col2:
+        if st.button("Stop"):
+            stop_fleet()
+    with col3:
+        if st.button("Reset"):
+            stop_fleet()
+            st.session_state.fleet = None
+            st.rerun()
+
+    fleet = st.session_state.fleet
+    if fleet is None:
+        st.info("Press Start to stream the fleet.")
+        return
+    if (fleet.batch_size, fleet.contamination_threshold) != (batch_size, contamination_threshold):
+        st.caption("Batch size and threshold changes take effect after Reset.")
+
+    if st.session_state.fleet_active:
+        deadline = time.perf_counter() + STEP_BUDGET
+        while not fleet.done and time.perf_counter() < deadline:
+            fleet.step()
+        if fleet.done:
+            st.session_state.fleet_active = False
+
+    summary = fleet.summary()
+    rows = int(summary["Rows Scored"].sum())
+    elapsed = time.perf_counter() - st.session_state.fleet_started
+    flagged = int((summary["Malicious"] > 0).sum())
+    st.markdown(
+        f"<div class='metrics-center'><b>Vehicles:</b> {len(summary)}     <b>Rows Scored:</b> {rows}     "
+        f"<b>Vehicles with Threats:</b> {flagged}     <b>Throughput:</b> {rows / max(elapsed, 1e-9):,.0f} rows/s</div>",
+        unsafe_allow_html=True)
+    if fleet.done:
+        st.success("Fleet Stream Completed")
+
+    st.dataframe(summary, use_container_width=True, hide_index=True, column_config={
+        "Progress": st.column_config.ProgressColumn("Progress", min_value=0.0, max_value=1.0),
+        "Flagged Rate": st.column_config.NumberColumn("Flagged Rate", format="%.3f"),
+    })
+
+    vehicle_id = st.selectbox("Vehicle Detail:", list(fleet.vehicles))
+    history = fleet.vehicles[vehicle_id].history
+    if history["time"]:
+        chart = LiveChart(
+            [("Speed", "skyblue"), ("Jamming Indicator", "orange"), ("Noise/ms", "lightgreen")],
+            title=f"{vehicle_id} Metrics", template="plotly" if theme == "light" else "plotly_dark")
+        fig = chart.update([str(int(t)) for t in history["time"]],
+                           history["speed"], history["signal"], history["noise"])
+        st.plotly_chart(fig, use_container_width=True)
+
+    if st.session_state.fleet_active:
+        st.rerun()
+
+
+if __name__ == "__main__":
+    app()
@@ -1,17 +1,10 @@
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from sklearn.cluster import KMeans
-from sklearn.metrics import f1_score
-import folium
-from streamlit_folium import st_folium
-from utils.load_model import load_isolation_forest, load_classifier, load_data, load_training_data, load_unscaled
-import matplotlib.pyplot as plt
-import numpy as np
-import seaborn as sns
-from datetime import datetime
-from sklearn.inspection import permutation_importance
-import os
+from utils import metrics
+from utils.summary import home_summary
+from utils.model_registry import model_stats
 
 # Detect theme mode
 base_theme = st.get_option("theme.base") or "light"
@@ -40,22 +33,63 @@ else:
 def render_metric_box(label, count, bg_color):
     return f'<div class="metric-box {label}">Total {label.capitalize()} Signals<br><h2>{count}</h2></div>'
 
+def importance_job_status():
+    """Progress of the background importance job; polls while it runs."""
+    job = st.session_state.importance_job
+
+    @st.fragment(run_every=2 if job.is_alive() else None)
+    def status():
+        if job.is_alive():
+            st.info(f"Recomputing permutation importance… ({time.time() - job.started_at:.0f} s)")
+        elif job.error is not None:
+            st.error(f"Feature importance could not be recomputed: {job.error}")
+        else:
+            st.success("Feature importance is up to date" + (" (from cache)." if job.from_cache else "."))
+            if st.session_state.get('importance_shown') != job.finished_at:
+                # Redraw the charts from the new CSVs
+                st.session_state.importance_shown = job.finished_at
+                st.rerun(scope="app")
+
+    status()
+
+
+@st.fragment
+def flight_track_map():
+    """Training flight coloured by its labels, simplified for the map's current zoom level."""
+    import folium
+    from streamlit_folium import st_folium
+    from utils.track import flight_track
+
+    with metrics.stage("flight_track"):
+        track = flight_track()
+    colors = {"Benign": benign_bg, "Spoofing": spoofed_bg, "Jamming": jammed_bg}
+
+    # The base map never changes, so st_folium keeps it (and the user's view) across
+    # reruns and only swaps in the polylines for the new zoom level
+    m = folium.Map(location=track.center, tiles=None, max_zoom=22)
+    # Tiles stop at zoom 19; beyond that they are stretched, since whole flights can span a few metres
+    folium.TileLayer("OpenStreetMap", max_zoom=22, max_native_zoom=19).add_to(m)
+    m.fit_bounds(track.bounds)
+    # Zoom level the map last reported; zooming reruns this fragment with the new one
+    zoom = (st.session_state.get("flight_track") or {}).get("zoom") or 18
+    layer = folium.FeatureGroup(name="track")
+    for verdict, lines in track.polylines(zoom).items():
+        folium.PolyLine(lines, color=colors[verdict], weight=3, opacity=0.9, tooltip=verdict).add_to(layer)
+
+    st_folium(m, key="flight_track", feature_group_to_add=layer, returned_objects=["zoom"],
+              use_container_width=True, height=450)
+    st.caption(f"Showing {len(track.kept(zoom)):,} of {track.total_fixes:,} fixes at zoom {zoom}, coloured by the "
+               f"training labels (benign, spoofing, jamming). Detail smaller than a pixel is simplified away.")
+
+
 # Set up Streamlit page config
 def app():
     st.markdown("<h1 class='big-font'> UAV Cyber Threat Detection Dashboard Overview</h1>", unsafe_allow_html=True)
     st.write("Monitoring UAV GPS navigation threats detected by AI-based models.")
 
-    # Load Data & Models
-    isolation_forest = load_isolation_forest()
-    classifier = load_classifier()
-    df = load_data()
-    df2 = load_unscaled()
-    data = load_training_data()
-
-    def isolation_forest_scorer(estimator, X, y):
-        predictions = estimator.predict(X)
-        pred_binary = (predictions == -1).astype(int)
-        return f1_score(y, pred_binary, average='binary')
+    # Precomputed dataset summary; the models themselves aren't needed to render this page
+    with metrics.stage("home_summary"):
+        summary = home_summary()
 
     # Custom Styling
     st.markdown(f"""
@@ -93,13 +127,11 @@ def app():
         """, unsafe_allow_html=True)
 
     # Display metrics for the signal counts
-    if not df.empty:
-        benign_count = df[df["label"] == 0].shape[0]
-        malicious_count = df[df["label"] == 1].shape[0]
-        spoofing_count = df[(df["label"] == 1) & (df["source"] == 1)].shape[0]
-        jamming_count = df[(df["label"] == 1) & (df["source"] == 2)].shape[0]
-    else:
-        benign_count = malicious_count = spoofing_count = jamming_count = 0
+    counts = summary["counts"]
+    benign_count = counts["benign"]
+    malicious_count = counts["malicious"]
+    spoofing_count = counts["spoofed"]
+    jamming_count = counts["jammed"]
 
     # Layout for metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -118,21 +150,22 @@ def app():
     st.markdown("<h1 class='big-font'>UAV Attack Dataset Details</h1>", unsafe_allow_html=True)
     st.markdown("<div class='dataframe-container'>", unsafe_allow_html=True)
     st.markdown("<div class='dataframe-header'>Feature Overview</div>", unsafe_allow_html=True)
-    st.dataframe(df2.head(), use_container_width=True)
+    st.dataframe(summary["preview"], use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
+    st.markdown("<h1 class='big-font'>Flight Track</h1>", unsafe_allow_html=True)
+    flight_track_map()
+
     st.markdown("<h1 class='big-font'>Feature Importance of Trained Models</h1>", unsafe_allow_html=True)
 
     # Feature Importance (Isolation Forest)
-    features = pd.read_csv(os.path.join("Feature Importance IF.csv"))
-    top_10 = features.sort_values(by='Importance', ascending=False).head(10)
+    top_10 = summary["importance_if"]
     fig = px.bar(top_10, x='Feature', y='Importance', title="Top 10 Feature Importances (Isolation Forest)", 
                  color='Importance', color_continuous_scale=feature_bar_colors, template=plot_template)
     st.plotly_chart(fig)
 
     # Feature Importance (Random Forest)
-    rf_features = pd.read_csv(os.path.join("Feature Importance RF.csv"))
-    top_10_rf = rf_features.sort_values(by='Importance', ascending=False).head(10)
+    top_10_rf = summary["importance_rf"]
     fig_rf = px.scatter(top_10_rf, x='Feature', y='Importance', size='Importance', color='Importance', 
                         color_continuous_scale=rf_colors, title="Top 10 Feature Importances (Random Forest)", 
                         template=plot_template, size_max=30)
@@ -140,4 +173,21 @@ def app():
     fig_rf.update_layout(xaxis_tickangle=0)
     st.plotly_chart(fig_rf)
 
-    st.write("---")
\ No newline at end of file
+    # Permutation importance is recomputed on the training data in the background
+    with st.expander("Recompute Feature Importance"):
+        st.write("Re-runs permutation importance for both models on the training data and updates the charts above. "
+                 "Results are cached per model and dataset version.")
+        sample = st.slider("Training rows (stratified sample):", 500, 7000, 3000, 500)
+        repeats = st.slider("Permutations per feature:", 1, 10, 5)
+        if st.button("Recompute"):
+            from utils.importance import start_job
+
+            st.session_state.importance_job = start_job(n_repeats=repeats, sample=sample, n_jobs=-1)
+        if st.session_state.get('importance_job') is not None:
+            importance_job_status()
+
+    st.write("---")
+
+    # Model registry: artifacts are loaded once per process and shared by all sessions
+    with st.expander("Loaded Models"):
+        st.dataframe(pd.DataFrame(model_stats()), use_container_width=True)
\ No newline at end of file
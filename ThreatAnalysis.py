@@ -1,26 +1,119 @@
+import io
 import os
 import streamlit as st
-import pandas as pd
-import numpy as np
-import time
-import joblib
-import plotly.graph_objs as go
 from collections import deque
-from utils.load_model import load_classifier, load_data, load_isolation_forest, load_scaler_function
+from utils import metrics
+from utils.cascade import break_even, get_cascade, stored_calibration
+from utils.dataset_cache import feature_matrix, load_dataset
+from utils.quantile import P2Quantile
+from utils.producer import REAL_TIME_ROWS_PER_SECOND, DetectionWorker
+from utils.history import FlightHistory
+from utils.render import LiveChart, RenderScheduler, history_figure
+from utils.score_cache import flight_scores
+from utils.stream import SchemaError, csv_batches, dataset_batches, read_chunks
+from utils.threat_log import SIGNAL_CODES, ThreatLog
+
+# Replay speed -> rows per second (None = as fast as detection runs)
+REPLAY_SPEEDS = {
+    "1x": REAL_TIME_ROWS_PER_SECOND,
+    "2x": 2 * REAL_TIME_ROWS_PER_SECOND,
+    "5x": 5 * REAL_TIME_ROWS_PER_SECOND,
+    "10x": 10 * REAL_TIME_ROWS_PER_SECOND,
+    "100x": 100 * REAL_TIME_ROWS_PER_SECOND,
+    "Max": None,
+}
+
+HISTORY_LEN = 30
+# A stopped worker finishes its current batch at most; the sketch is safe even if it doesn't
+WORKER_JOIN_TIMEOUT = 5.0
+HISTORY_REFRESH_SECONDS = 2.0
+
+
+def new_history():
+    """Rolling window of the values shown on the live chart."""
+    return {key: deque(maxlen=HISTORY_LEN) for key in ("time", "speed", "signal", "noise")}
+
+
+def apply_results(items):
+    """Fold verdicts drained from the detection worker into the session state."""
+    if not items:
+        return
+    history = st.session_state.history
+    for item in items:
+        row = item["row"]
+        history["speed"].append(row['vel_m_s'])
+        history["signal"].append(row['jamming_indicator'])
+        history["noise"].append(row['noise_per_ms'])
+        history["time"].append(str(row["timestamp"]))
+    st.session_state.flight_history.append(
+        [item["row"]["timestamp"] for item in items],
+        [SIGNAL_CODES[item["signal_type"]] for item in items],
+        speed=[item["row"]["vel_m_s"] for item in items],
+        signal=[item["row"]["jamming_indicator"] for item in items],
+        noise=[item["row"]["noise_per_ms"] for item in items],
+    )
+
+    malicious = sum(item["malicious"] for item in items)
+    st.session_state.malicious_count += malicious
+    st.session_state.benign_count += len(items) - malicious
+    cascaded = [item["early_exit"] for item in items if "early_exit" in item]
+    st.session_state.cascade_rows += len(cascaded)
+    st.session_state.early_exits += sum(cascaded)
+    st.session_state.threat_log.append(
+        [item["row"]["timestamp"] for item in items],
+        [item["signal_type"] for item in items],
+        [item["score"] for item in items],
+    )
+
+    last = items[-1]
+    if last["malicious"] == 0:
+        st.session_state.status_html = "<div class='status-box benign'>Normal Signal Detected</div>"
+    else:
+        st.session_state.status_html = f"<div class='status-box malicious'>Malicious Detected: {last['signal_type']}</div>"
+    st.session_state.current_index = last["index"] + 1
+
+
+def stop_worker(keep_results):
+    """Stop the background worker, optionally keeping the verdicts it already queued.
+
+    The worker is joined first, so nothing lands on its queue after the drain and a
+    replacement never runs alongside it.
+    """
+    worker = st.session_state.get('detection_worker')
+    if worker is None:
+        return
+    worker.stop()
+    worker.join(timeout=WORKER_JOIN_TIMEOUT)
+    st.session_state.detection_worker = None
+    if keep_results:
+        items, _ = worker.drain()
+        apply_results(items)
+
+
+def reset_stream(contamination_threshold):
+    """Discard the current run so the active stream source replays from its first row."""
+    stop_worker(keep_results=False)
+    st.session_state.history = new_history()
+    st.session_state.flight_history = FlightHistory()
+    st.session_state.status_html = ""
+    st.session_state.current_index = 0
+    st.session_state.stream_active = False
+    st.session_state.stream_done = False
+    st.session_state.stream_error = None
+    st.session_state.threat_log.close()
+    st.session_state.threat_log = ThreatLog()
+    st.session_state.benign_count = 0
+    st.session_state.malicious_count = 0
+    st.session_state.cascade_rows = 0
+    st.session_state.early_exits = 0
+    st.session_state.threshold_sketch = P2Quantile(contamination_threshold)
+    st.session_state.render_scheduler = RenderScheduler()
+
 
 def app():
-    # Load models and preprocessing
-    isolation_forest = load_isolation_forest()
-    classifier = load_classifier()
-    transformer = load_scaler_function()
-    data = data = pd.read_csv(os.path.join("datasets", "synthetic_data_stream.csv"))
-
-    features = ['noise_per_ms', 'eph', 'timestamp', 's_variance_m_s', 'epv', 'lat_x',
-                'epv_x', 'evh', 'alt_ellipsoid_x', 'alt_ellipsoid_y', 'vel_m_s',
-                'satellites_used', 'hdop', 'vdop', 'y', 'vel_d_m_s', 'delta_heading',
-                'c_variance_rad', 'vel_n_m_s', 'z', 'heading_y', 'vy', 'vx',
-                'vel_e_m_s', 'q[2]', 'jamming_indicator', 'cog_rad', 'z_deriv', 'vz',
-                'ay', 'az', 'ax', 'q[1]', 'terrain_alt_valid']
+    stream_path = os.path.join("datasets", "synthetic_data_stream.csv")
+    data = load_dataset(stream_path)
+    feature_rows = feature_matrix(stream_path)
 
     # --- Custom Styling for Dark Theme ---
     # Detect current theme
@@ -170,18 +263,57 @@ def app():
         st.session_state.current_index = 0
     if 'stream_active' not in st.session_state:
         st.session_state.stream_active = False
-    if 'threat_logs' not in st.session_state:
-        st.session_state.threat_logs = []
+    if 'stream_done' not in st.session_state:
+        st.session_state.stream_done = False
+    if 'stream_source' not in st.session_state:
+        # None streams the built-in dataset; an upload is stored as {"name", "data"},
+        # live telemetry as {"name", "live": True}
+        st.session_state.stream_source = None
+    if 'threat_log' not in st.session_state:
+        st.session_state.threat_log = ThreatLog()
     if 'benign_count' not in st.session_state:
         st.session_state.benign_count = 0
     if 'malicious_count' not in st.session_state:
         st.session_state.malicious_count = 0
+    if 'cascade_rows' not in st.session_state:
+        # Rows scored with the early-exit cascade, and how many of them exited early
+        st.session_state.cascade_rows = 0
+        st.session_state.early_exits = 0
+    if 'history' not in st.session_state:
+        st.session_state.history = new_history()
+    if 'flight_history' not in st.session_state:
+        # Every scored row, indexed for the downsampled full-flight chart
+        st.session_state.flight_history = FlightHistory()
+    if 'status_html' not in st.session_state:
+        st.session_state.status_html = ""
 
     batch_size = st.number_input("Batch Size (rows per stream):", min_value=1, max_value=100, value=12)
     with st.container():
         st.markdown("<div class='slider-style'>", unsafe_allow_html=True)
         contamination_threshold = st.slider("Contamination Threshold (adjust if needed):", 0.0, 1.0, 0.20, 0.01)
         st.markdown("</div>", unsafe_allow_html=True)
+    frame_rate = st.slider("Chart Frame Rate (updates per second):", 1, 30, 5)
+    replay_speed = st.select_slider("Replay Speed:", options=list(REPLAY_SPEEDS), value="1x")
+    # Calibration runs offline (python -m utils.cascade); below its break-even batch
+    # size the cascade is slower than the full forest, so it is only offered from there
+    calibration = stored_calibration()
+    cascade_from = break_even(calibration) if calibration else None
+    cascade_ready = cascade_from is not None and batch_size >= cascade_from
+    if calibration is None:
+        cascade_help = "Not calibrated for the current model yet: run `python -m utils.cascade`."
+    elif cascade_from is None:
+        cascade_help = "Slower than the full Isolation Forest at every calibrated batch size."
+    else:
+        cascade_help = (f"Available from a batch size of {cascade_from}, where it is faster than the full "
+                        "Isolation Forest.")
+    cascade = st.toggle("Early-exit scoring", disabled=not cascade_ready,
+                        help="Score clearly benign or clearly malicious rows with a subset of the Isolation "
+                             "Forest's trees. Calibrated to agree with the full model on at least 99.9% of "
+                             f"verdicts. {cascade_help}") and cascade_ready
+
+    # Running cut-off over the whole stream, so verdicts don't depend on the batch size
+    if 'threshold_sketch' not in st.session_state or st.session_state.threshold_sketch.p != contamination_threshold:
+        st.session_state.threshold_sketch = P2Quantile(contamination_threshold)
 
     # --- Buttons Row ---
     st.markdown("<div class='button-row'>", unsafe_allow_html=True)
@@ -189,31 +321,17 @@ def app():
     with col1:
         if st.button("Start"):
             st.session_state.stream_active = True
+            st.session_state.stream_error = None
     with col2:
         if st.button("Stop"):
             st.session_state.stream_active = False
+            stop_worker(keep_results=True)
     with col3:
         if st.button("Reset"):
-            st.session_state.current_index = 0
-            st.session_state.stream_active = False
-            st.session_state.threat_logs = []
-            st.session_state.benign_count = 0
-            st.session_state.malicious_count = 0
+            reset_stream(contamination_threshold)
             st.rerun()
     st.markdown("</div>", unsafe_allow_html=True)
 
-    status_placeholder = st.empty()
-    chart_placeholder = st.empty()
-    log_placeholder = st.empty()
-    progress_placeholder = st.empty()
-    counter_placeholder = st.empty()
-
-    max_len = 30
-    speed_hist = deque(maxlen=max_len)
-    signal_hist = deque(maxlen=max_len)
-    noise_hist = deque(maxlen=max_len)
-    time_hist = deque(maxlen=max_len)
-
     # Define Plotly colors based on theme
     if theme == "light":
         speed_color = "#4682B4"  # Darker skyblue
@@ -226,70 +344,202 @@ def app():
         noise_color = "lightgreen"
         plotly_template = "plotly_dark"
 
-    if st.session_state.stream_active and st.session_state.current_index < len(data):
-        batch = data.iloc[st.session_state.current_index:st.session_state.current_index+batch_size].copy()
-        X_batch = transformer.transform(batch[features])
-        scores = isolation_forest.decision_function(X_batch)
-        threshold = np.percentile(scores, contamination_threshold * 100)
-        is_malicious = (scores < threshold).astype(int)
-
-        for i, row in batch.iterrows():
-            if not st.session_state.stream_active:
-                break
-
-            row_scaled = X_batch[i - st.session_state.current_index]
-            timestamp = str(row["timestamp"])
-            pred = is_malicious[i - st.session_state.current_index]
-
-            speed_hist.append(row['vel_m_s'])
-            signal_hist.append(row['jamming_indicator'])
-            noise_hist.append(row['noise_per_ms'])
-            time_hist.append(timestamp)
-
-            if pred == 0:
-                st.session_state.benign_count += 1
-                status_placeholder.markdown("""
-                    <div class='status-box benign'>Normal Signal Detected</div>
-                """, unsafe_allow_html=True)
-                st.session_state.threat_logs.append({"Time": timestamp, "Signal Type": "Benign"})
-            else:
-                attack_type = "Spoofing" if classifier.predict([row_scaled])[0] == 0 else "Jamming"
-                st.session_state.malicious_count += 1
-                status_placeholder.markdown(f"""
-                    <div class='status-box malicious'>Malicious Detected: {attack_type}</div>
-                """, unsafe_allow_html=True)
-                st.session_state.threat_logs.append({"Time": timestamp, "Signal Type": attack_type})
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=list(time_hist), y=list(speed_hist), name="Speed", line=dict(color=speed_color)))
-            fig.add_trace(go.Scatter(x=list(time_hist), y=list(signal_hist), name="Jamming Indicator", line=dict(color=signal_color)))
-            fig.add_trace(go.Scatter(x=list(time_hist), y=list(noise_hist), name="Noise/ms", line=dict(color=noise_color)))
-            fig.update_layout(title="Live UAV Metrics", template=plotly_template, xaxis_title="Timestamp", yaxis_title="Value")
-            chart_placeholder.plotly_chart(fig, use_container_width=True)
-
-            counter_placeholder.markdown(
-                f"<div class='metrics-center'><b>Benign Signals:</b> {st.session_state.benign_count}     "
-                f"<b>Malicious Signals:</b> {st.session_state.malicious_count}</div>",
-                unsafe_allow_html=True
-            )
-
-            time.sleep(0.4)
-
-        st.session_state.current_index += batch_size
-        progress = st.session_state.current_index / len(data)
-        progress_placeholder.progress(min(progress, 1.0))
-
-        if st.session_state.current_index >= len(data):
-            status_placeholder.markdown("<div class='status-box completed'>Stream Completed</div>", unsafe_allow_html=True)
+    # The live panel reruns at the frame rate and the figure is built once per theme;
+    # each frame only swaps the trace data
+    if 'render_scheduler' not in st.session_state:
+        st.session_state.render_scheduler = RenderScheduler()
+    scheduler = st.session_state.render_scheduler
+    scheduler.fps = frame_rate
+    if 'live_chart' not in st.session_state or st.session_state.live_chart_theme != theme:
+        st.session_state.live_chart = LiveChart(
+            [("Speed", speed_color), ("Jamming Indicator", signal_color), ("Noise/ms", noise_color)],
+            title="Live UAV Metrics", template=plotly_template)
+        st.session_state.live_chart_theme = theme
+    live_chart = st.session_state.live_chart
+
+    source = st.session_state.stream_source
+    total_rows = len(data) if source is None else None
+    # Live telemetry is scored by the ingestion server; the page only subscribes to its verdicts
+    live = source is not None and source.get("live", False)
+
+    def stream_batches(start_index):
+        if source is None:
+            return dataset_batches(data, batch_size, start_index, feature_rows)
+        # Uploads are parsed chunk by chunk, never loaded as a whole DataFrame
+        return csv_batches(io.BytesIO(source["data"]), batch_size, start_index)
+
+    # While streaming, only this panel reruns, once per frame; the page around it
+    # (styles, settings, models, dataset) is left as it is
+    @st.fragment(run_every=scheduler.interval if st.session_state.stream_active else None)
+    def live_panel():
+        was_active = st.session_state.stream_active
+        status_placeholder = st.empty()
+        chart_placeholder = st.empty()
+        log_placeholder = st.empty()
+        progress_placeholder = st.empty()
+        counter_placeholder = st.empty()
+        frames_placeholder = st.empty()
+        history = st.session_state.history
+
+        def render_frame():
+            with metrics.stage("render"):
+                if st.session_state.status_html:
+                    status_placeholder.markdown(st.session_state.status_html, unsafe_allow_html=True)
+                if history["time"]:
+                    fig = live_chart.update(history["time"], history["speed"], history["signal"], history["noise"])
+                    chart_placeholder.plotly_chart(fig, use_container_width=True)
+                counter_placeholder.markdown(
+                    f"<div class='metrics-center'><b>Benign Signals:</b> {st.session_state.benign_count}     "
+                    f"<b>Malicious Signals:</b> {st.session_state.malicious_count}</div>",
+                    unsafe_allow_html=True
+                )
+                frames = scheduler.stats()
+                frames_placeholder.caption(f"Frames rendered: {frames['rendered']} · dropped: {frames['dropped']}")
+
+        # Detection runs on a background worker; this run only drains its queue and renders
+        worker = st.session_state.get('detection_worker')
+        if worker is not None and not live and (worker.sketch is not st.session_state.threshold_sketch
+                                                or worker.batch_size != batch_size or worker.cascade != cascade):
+            # Settings changed mid-stream: keep what was scored, restart from there
+            stop_worker(keep_results=True)
+            worker = None
+        if st.session_state.stream_active and not st.session_state.stream_done:
+            if worker is None and live:
+                from utils.ingest_server import get_server
+
+                worker = get_server().subscribe()
+                st.session_state.detection_worker = worker
+            elif worker is None:
+                scores = None
+                if source is None and not cascade:
+                    # The built-in flight's model outputs are cached, so replays only apply the cut-off
+                    with st.spinner("Scoring the flight..."):
+                        scores = flight_scores(stream_path)
+                worker = DetectionWorker(
+                    stream_batches(st.session_state.current_index), contamination_threshold,
+                    st.session_state.threshold_sketch, batch_size=batch_size,
+                    rows_per_second=REPLAY_SPEEDS[replay_speed], cascade=cascade, scores=scores)
+                worker.start()
+                st.session_state.detection_worker = worker
+            if not live:
+                worker.rows_per_second = REPLAY_SPEEDS[replay_speed]
+
+            items, finished = worker.drain()
+            apply_results(items)
+            if worker.error is not None:
+                stop_worker(keep_results=False)
+                st.session_state.stream_active = False
+                st.session_state.stream_error = str(worker.error)
+            elif finished:
+                st.session_state.detection_worker = None
+                st.session_state.stream_done = True
+            # The fragment timer paces the frames; every run draws one
+            scheduler.frame(len(items))
+
+        if st.session_state.stream_done:
+            st.session_state.status_html = "<div class='status-box completed'>Stream Completed</div>"
             st.session_state.stream_active = False
+        if st.session_state.get('stream_error'):
+            st.error(f"Detection stopped: {st.session_state.stream_error}")
+
+        render_frame()
+        if total_rows is None:
+            scored = st.session_state.benign_count + st.session_state.malicious_count
+            progress_placeholder.caption(f"Streaming {source['name']}: {scored} rows scored")
+        else:
+            progress_placeholder.progress(min(st.session_state.current_index / total_rows, 1.0))
+        if st.session_state.cascade_rows:
+            calibration = get_cascade().calibration
+            exit_rate = st.session_state.early_exits / st.session_state.cascade_rows
+            evaluations = get_cascade().tree_evaluations(exit_rate)
+            # Measured speedup at the calibrated batch size closest to the one in use
+            timed = min(calibration["speedup"], key=lambda size: abs(int(size) - batch_size))
+            st.caption(f"Early exit: {exit_rate:.1%} of {st.session_state.cascade_rows} rows stopped after "
+                       f"{calibration['trees']} of {calibration['n_trees']} trees "
+                       f"({calibration['n_trees'] / evaluations:.2f}x fewer tree evaluations). "
+                       f"Measured Isolation Forest speedup at batch size {timed}: "
+                       f"{calibration['speedup'][timed]:.2f}x.")
+
+        threat_log = st.session_state.threat_log
+        if len(threat_log):
+            st.markdown("<h3 class='log-heading'>Signal Detection Log</h3>", unsafe_allow_html=True)
+            log_placeholder.dataframe(threat_log.tail(), use_container_width=True)
+            if len(threat_log) > threat_log.window:
+                st.caption(f"Showing the latest {threat_log.window} of {len(threat_log)} rows; "
+                           "the download has them all.")
+            if st.session_state.stream_active:
+                st.caption("The detection log can be downloaded once the stream is stopped.")
+
+        if was_active and not st.session_state.stream_active:
+            # The stream ended on its own: redraw the whole page to stop the timer and offer the download
+            st.rerun()
 
-    if st.session_state.threat_logs:
-        log_df = pd.DataFrame(st.session_state.threat_logs)
-        st.markdown("<h3 class='log-heading'>Signal Detection Log</h3>", unsafe_allow_html=True)
-        log_placeholder.dataframe(log_df, use_container_width=True)
-        csv = log_df.to_csv(index=False).encode('utf-8')
+    live_panel()
+
+    # Redrawn every few seconds while streaming, so it keeps up with the flight without
+    # rebuilding a figure of up to MAX_POINTS points per trace on every frame
+    @st.fragment(run_every=HISTORY_REFRESH_SECONDS if st.session_state.stream_active else None)
+    def history_panel():
+        flight_history = st.session_state.flight_history
+        if len(flight_history) and st.toggle("Show full flight history"):
+            first, last = st.slider("History window (% of flight):", 0.0, 100.0, (0.0, 100.0), 0.5)
+            start, stop = (round(len(flight_history) * edge / 100) for edge in (first, last))
+            with metrics.stage("render_history"):
+                fig, detail = history_figure(
+                    flight_history, start, stop,
+                    [("speed", "Speed", speed_color), ("signal", "Jamming Indicator", signal_color),
+                     ("noise", "Noise/ms", noise_color)],
+                    {"Spoofing": "#E8B000", "Jamming": "#800080"},
+                    title="Flight History", template=plotly_template)
+                st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"Rows {start:,} to {stop:,} of {len(flight_history):,}"
+                       + (f", drawn as the minimum and maximum of every {detail} rows with the first spoofing "
+                          "and jamming verdict of each span marked." if detail > 1 else ".")
+                       + (f" Refreshed every {HISTORY_REFRESH_SECONDS:g} s while streaming."
+                          if st.session_state.stream_active else ""))
+
+    history_panel()
+
+    if source is None and st.toggle("Sweep contamination thresholds"):
+        import plotly.express as px
+
+        with st.spinner("Scoring the flight..."):
+            flight = flight_scores(stream_path)
+        sweep = flight.sweep()
+        fig = px.line(sweep, x="Contamination", y=["Flagged", "Spoofing", "Jamming"], markers=True,
+                      title="Flagged Rows over the Whole Flight", template=plotly_template)
+        fig.add_vline(x=contamination_threshold, line_dash="dash")
+        fig.update_layout(yaxis_title="Rows")
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Verdicts for all {len(flight):,} rows as a stream from the first row would give them, "
+                   f"from cached model outputs. At the current threshold of {contamination_threshold:.2f}, "
+                   f"{int(flight.verdicts(contamination_threshold).sum()):,} rows are flagged.")
+        # The whole-flight CSV is only built on request, once per flight and threshold
+        export_key = (flight.key, contamination_threshold)
+        if st.session_state.get('sweep_export') != export_key and \
+                st.button(f"Prepare Flight Log at {contamination_threshold:.2f}"):
+            st.session_state.sweep_export = export_key
+        if st.session_state.get('sweep_export') == export_key:
+            st.download_button(f"Download Flight Log at {contamination_threshold:.2f}",
+                               data=flight.detection_csv(contamination_threshold),
+                               file_name=f"detection_logs_{contamination_threshold:.2f}.csv", mime="text/csv")
+
+    threat_log = st.session_state.threat_log
+    if len(threat_log) and not st.session_state.stream_active:
         st.markdown("<div class='download-container'>", unsafe_allow_html=True)
-        st.download_button("Download Detection Log", data=csv, file_name="detection_logs.csv", mime="text/csv")
+        # The CSV is written to disk straight from the spill file, but a download button
+        # holds the whole file's bytes on every run, so it is only offered on request,
+        # for the rows logged when it was prepared
+        export_rows, export_path = st.session_state.get('log_export', (None, None))
+        prepared = export_rows == len(threat_log) and export_path is not None and os.path.exists(export_path)
+        if not prepared and st.button("Prepare Detection Log"):
+            export_path = threat_log.export_csv()
+            st.session_state.log_export = (len(threat_log), export_path)
+            prepared = True
+        if prepared:
+            with open(export_path, "rb") as export:
+                st.download_button("Download Detection Log", data=export, file_name="detection_logs.csv",
+                                   mime="text/csv")
         st.markdown("</div>", unsafe_allow_html=True)
 
     # --- Upload New Data Section ---
@@ -297,9 +547,44 @@ def app():
     st.markdown("<h1 class='big-font'>Upload New Data for Streaming</h1>", unsafe_allow_html=True)
     uploaded_file = st.file_uploader("Upload CSV File", type=["csv"])
     if uploaded_file:
-        data = pd.read_csv(uploaded_file)
-        st.success("Data uploaded successfully!")
-        st.write(data.head())
+        try:
+            # Only the header and a few rows are parsed here; the rest is parsed as it streams
+            preview = next(read_chunks(uploaded_file, chunksize=5))
+        except (SchemaError, StopIteration) as exc:
+            st.error(f"{uploaded_file.name} can't be streamed: {exc or 'no data rows'}")
+        else:
+            st.success("Data uploaded successfully!")
+            st.write(preview)
+            if st.button("Stream Uploaded Data"):
+                st.session_state.stream_source = {"name": uploaded_file.name, "data": uploaded_file.getvalue()}
+                reset_stream(contamination_threshold)
+                st.session_state.stream_active = True
+                st.rerun()
+    # --- Live Telemetry Section ---
+    st.markdown("---")
+    st.markdown("<h1 class='big-font'>Live Telemetry</h1>", unsafe_allow_html=True)
+    from utils.ingest_server import DEFAULT_TCP_PORT, DEFAULT_UDP_PORT
+    st.write(f"Vehicles can push telemetry to `tcp://127.0.0.1:{DEFAULT_TCP_PORT}` or "
+             f"`udp://127.0.0.1:{DEFAULT_UDP_PORT}`, one JSON object or CSV row per line. "
+             "The ingestion server scores it with its own batch size and contamination threshold.")
+    if st.button("Stream Live Telemetry"):
+        from utils.ingest_server import get_server
+
+        try:
+            get_server()
+        except (OSError, RuntimeError) as exc:
+            st.error(f"The ingestion server could not be started: {exc}")
+        else:
+            st.session_state.stream_source = {"name": "live telemetry", "live": True}
+            reset_stream(contamination_threshold)
+            st.session_state.stream_active = True
+            st.rerun()
+
+    if source is not None and st.button("Stream Built-in Dataset"):
+        st.session_state.stream_source = None
+        reset_stream(contamination_threshold)
+        st.rerun()
+
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
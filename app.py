@@ -1,7 +1,15 @@
+import importlib
+import os
 import streamlit as st
-import Home
-import ThreatAnalysis
-st.cache_data.clear()
+from utils import metrics, model_registry
+
+# Page modules are imported on first visit only, so a cold start doesn't pay for
+# pages (and their dependencies) the user never opens
+PAGES = {
+    "Home": "Home",
+    "Threat Analysis": "ThreatAnalysis",
+    "Fleet Monitor": "Fleet",
+}
 
 # Set Streamlit page config
 st.set_page_config(
@@ -84,13 +92,46 @@ with st.sidebar:
     # Radio-based navigation
     selected = st.radio(
         "Navigation",
-        ["Home", "Threat Analysis"],
+        list(PAGES),
         label_visibility="collapsed",
-        index=0
+        index=0,
+        key="page"
     )
 
+    # Compact model profiles written by `python -m utils.compact`. Models are shared
+    # by every session, so the profile is fixed at startup with UAV_MODEL_PROFILE
+    info = model_registry.profile_info()
+    if info:
+        st.caption(f"Model profile: {model_registry.active_profile()} · " + " · ".join(
+            f"{name.replace('_', ' ').title()}: {chosen['variant']}, {chosen['metric']} "
+            f"{chosen['score']:.3f} vs {chosen['baseline_score']:.3f} held out, "
+            f"{chosen['speedup_single_row']:.1f}x faster per row"
+            for name, chosen in info["models"].items()))
+
+    # Optional diagnostics; instrumentation costs nothing while this is off. It is
+    # process-wide, so it is only switched when a session flips its own toggle
+    if "diagnostics" not in st.session_state:
+        st.session_state.diagnostics = metrics.enabled()
+    if st.toggle("Diagnostics", key="diagnostics",
+                 on_change=lambda: metrics.set_enabled(st.session_state.diagnostics)):
+        if not metrics.enabled():
+            st.caption("Instrumentation was switched off in another session; toggle Diagnostics to resume.")
+        if os.environ.get("UAV_METRICS_PORT"):
+            metrics.serve(int(os.environ["UAV_METRICS_PORT"]))
+        if os.environ.get("UAV_METRICS_FILE"):
+            metrics.write_prometheus(os.environ["UAV_METRICS_FILE"])
+        snapshot = metrics.snapshot()
+        if snapshot["stages"]:
+            st.dataframe(snapshot["stages"], hide_index=True, use_container_width=True)
+        rate = metrics.flagged_rate()
+        st.caption(
+            f"Rows processed: {snapshot['counters'].get('rows_processed', 0)} · "
+            f"flagged rate: {'n/a' if rate is None else f'{rate:.1%}'} · "
+            f"queue depth: {snapshot['gauges'].get('queue_depth', 0)}"
+        )
+        st.download_button("Export Prometheus Metrics", data=metrics.render_prometheus(),
+                           file_name="uav_metrics.prom", mime="text/plain")
+
 # Load the selected page
-if selected == "Home":
-    Home.app()
-elif selected == "Threat Analysis":
-    ThreatAnalysis.app()
+with metrics.stage(f"rerun_{PAGES[selected].lower()}"):
+    importlib.import_module(PAGES[selected]).app()
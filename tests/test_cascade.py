@@ -0,0 +1,37 @@
+import warnings
+
+import numpy as np
+import pytest
+from utils.cascade import DEFAULT_AGREEMENT, break_even, get_cascade
+from utils.dataset_cache import load_dataset
+from utils.detection import detect_batch
+from utils.quantile import P2Quantile
+
+
+@pytest.fixture(scope="module")
+def data():
+    # The forests were fitted on DataFrames; scoring ndarrays only triggers a name warning
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    return load_dataset("datasets/data_stream.csv")
+
+
+def _verdicts(data, batch_size, contamination, cascade):
+    sketch = P2Quantile(contamination)
+    return np.concatenate([
+        detect_batch(data.iloc[i:i + batch_size], contamination, sketch=sketch, cascade=cascade)["Signal Type"]
+        for i in range(0, len(data), batch_size)])
+
+
+@pytest.mark.parametrize("contamination", [0.1, 0.2, 0.3])
+@pytest.mark.parametrize("batch_size", [12, 64])
+def test_cascade_verdicts_agree_with_the_full_model(data, batch_size, contamination):
+    get_cascade()
+    full = _verdicts(data, batch_size, contamination, cascade=False)
+    cascaded = _verdicts(data, batch_size, contamination, cascade=True)
+    assert np.mean(full == cascaded) >= DEFAULT_AGREEMENT
+
+
+def test_break_even_needs_every_larger_batch_to_be_faster():
+    assert break_even({"speedup": {"1": 1.3, "12": 0.8, "64": 1.2, "256": 1.5}}) == 64
+    assert break_even({"speedup": {"12": 1.2, "64": 0.9, "256": 1.5}}) == 256
+    assert break_even({"speedup": {"12": 0.8, "256": 1.0}}) is None
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from utils.compact import compact_model
+from utils.dataset_cache import feature_matrix
+from utils.detection import preprocess
+from utils.flat_forest import flatten, load_flat_forest, save_flat_forest
+from utils.load_model import load_classifier, load_isolation_forest
+
+
+# The forests were fitted on DataFrames; scoring ndarrays only triggers a name warning
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+
+@pytest.fixture(scope="module")
+def X():
+    return preprocess(None, feature_matrix("datasets/data_stream.csv"))
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return load_classifier()
+
+
+@pytest.fixture(scope="module")
+def isolation_forest():
+    return load_isolation_forest()
+
+
+def _assert_classifier_matches(flat, model, X):
+    np.testing.assert_array_equal(flat.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+
+
+def _assert_isolation_forest_matches(flat, model, X):
+    np.testing.assert_array_equal(flat.score_samples(X), model.score_samples(X))
+    np.testing.assert_array_equal(flat.decision_function(X), model.decision_function(X))
+    np.testing.assert_array_equal(flat.predict_anomaly(X), model.predict(X))
+
+
+def test_random_forest_export_is_bit_identical(X, classifier):
+    _assert_classifier_matches(flatten(classifier), classifier, X)
+
+
+def test_isolation_forest_export_is_bit_identical(X, isolation_forest):
+    _assert_isolation_forest_matches(flatten(isolation_forest), isolation_forest, X)
+
+
+@pytest.mark.parametrize("batch_size", [1, 12])
+def test_small_batches_are_bit_identical(X, classifier, isolation_forest, batch_size):
+    flat_classifier, flat_isolation = flatten(classifier), flatten(isolation_forest)
+    for start in range(0, 240, batch_size):
+        batch = X[start:start + batch_size]
+        _assert_classifier_matches(flat_classifier, classifier, batch)
+        _assert_isolation_forest_matches(flat_isolation, isolation_forest, batch)
+
+
+def test_saved_export_round_trips(X, isolation_forest, tmp_path):
+    path = tmp_path / "isolation_forest.npz"
+    save_flat_forest(flatten(isolation_forest), path)
+    _assert_isolation_forest_matches(load_flat_forest(path), isolation_forest, X)
+
+
+def test_uncut_compact_variant_matches_the_shipped_model(X, classifier, isolation_forest):
+    # compact_model recomputes IsolationForest's private path-length tables; with every
+    # tree and level kept they must reproduce the shipped model exactly
+    _assert_classifier_matches(compact_model(classifier, float32=True), classifier, X)
+    variant = compact_model(isolation_forest, float32=True)
+    for method in ("score_samples", "decision_function", "predict"):
+        np.testing.assert_array_equal(getattr(variant, method)(X), getattr(isolation_forest, method)(X))
+
+
+@pytest.mark.parametrize("trees, max_depth", [(10, 4), (50, 6), (100, 0)])
+def test_compact_variant_exports_are_bit_identical(X, classifier, isolation_forest, trees, max_depth):
+    for model, check in ((classifier, _assert_classifier_matches),
+                         (isolation_forest, _assert_isolation_forest_matches)):
+        variant = compact_model(model, trees, max_depth, float32=True)
+        check(flatten(variant), variant, X)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from utils.dataset_cache import feature_matrix
+from utils.fleet import Fleet, simulate_fleet
+
+
+@pytest.fixture(scope="module")
+def streams():
+    features = np.asarray(feature_matrix("datasets/data_stream.csv"))[:1000]
+    return simulate_fleet(features, 2)
+
+
+# With 256-row batches every remaining batch is in flight when the fleet stops
+@pytest.mark.parametrize("batch_size", [128, 256])
+def test_stop_then_start_scores_every_row(streams, batch_size):
+    fleet = Fleet(streams, batch_size=batch_size, workers=1)
+    applied = fleet.step()
+    fleet.cancel()
+    rows = fleet.run()
+
+    for vehicle_id, features in streams.items():
+        vehicle = fleet.vehicles[vehicle_id]
+        assert vehicle.current_index == len(features)
+        assert vehicle.benign_count + vehicle.malicious_count == len(features)
+        assert vehicle.sketch.count == len(features)
+    assert applied + rows == sum(map(len, streams.values()))
+
+
+def test_stop_then_start_matches_uninterrupted_run(streams):
+    interrupted = Fleet(streams, batch_size=128, workers=1)
+    interrupted.step()
+    interrupted.cancel()
+    interrupted.run()
+    uninterrupted = Fleet(streams, batch_size=128, workers=1)
+    uninterrupted.run()
+
+    assert interrupted.summary().equals(uninterrupted.summary())
+
+
+def test_switching_worker_count_shuts_the_old_pool_down(streams):
+    running = Fleet(streams, batch_size=128, workers=1)
+    old_pool = running.pool
+    running.step()
+    # Another fleet asks for a different pool while this one has batches in flight
+    Fleet(streams, batch_size=128, workers=2).run()
+    assert running.pool is old_pool and old_pool._shutdown_thread
+    running.run()
+
+    expected = Fleet(streams, batch_size=128, workers=2)
+    expected.run()
+    assert running.pool is expected.pool is not old_pool
+    assert running.summary().equals(expected.summary())
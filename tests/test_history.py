@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from utils.history import FlightHistory
+
+
+@pytest.fixture(scope="module")
+def history():
+    rng = np.random.default_rng(0)
+    rows = 50_000
+    history = FlightHistory()
+    for start in range(0, rows, 777):
+        n = min(777, rows - start)
+        history.append(np.arange(start, start + n), rng.choice([0, 0, 0, 1, 2], n),
+                       speed=rng.normal(size=n), signal=rng.normal(size=n), noise=rng.normal(size=n))
+    return history
+
+
+def test_windows_stay_inside_the_requested_rows(history):
+    rng = np.random.default_rng(1)
+    for _ in range(300):
+        start, stop = sorted(rng.integers(0, len(history) + 1, 2))
+        traces, markers, _ = history.window(start, stop, max_points=200)
+        for rows, _ in traces.values():
+            assert ((rows >= start) & (rows < stop)).all()
+            assert (np.diff(rows) >= 0).all()
+        for rows in markers.values():
+            assert ((rows >= start) & (rows < stop)).all()
+
+
+def test_window_keeps_the_extremes_and_bounds_the_points(history):
+    start, stop = 1234, 45_678
+    traces, markers, detail = history.window(start, stop, max_points=200)
+    rows, values = traces["speed"]
+    speed = history.values("speed", np.arange(start, stop))
+    assert values.max() == speed.max() and values.min() == speed.min()
+    assert detail > 1 and len(rows) < 600
+    attacks = history.rows["attack"][start:stop]
+    assert markers["Spoofing"].min() == start + np.flatnonzero(attacks == 1)[0]
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from utils import importance, summary
+from utils.features import FEATURES
+
+
+def test_features_missing_from_training_data_are_not_charted(tmp_path, monkeypatch):
+    def compute(*args):
+        frame = pd.DataFrame({"Feature": FEATURES, "Importance": 0.0, "Std": 0.0})
+        frame.loc[frame["Feature"] == FEATURES[0], "Importance"] = 1.0
+        return {"if": frame, "rf": frame.copy()}
+
+    paths = {"IMPORTANCE_IF_PATH": tmp_path / "if.csv", "IMPORTANCE_RF_PATH": tmp_path / "rf.csv"}
+    for name, path in paths.items():
+        monkeypatch.setattr(importance, name, str(path))
+    monkeypatch.setattr(importance, "CACHE_PATH", str(tmp_path / "cache.json"))
+    monkeypatch.setattr(importance, "compute_importance", compute)
+
+    missing = importance.missing_features()
+    assert missing == ["delta_heading", "terrain_alt_valid"]
+    for from_cache in (False, True):
+        frames, cached = importance.refresh_importance()
+        assert cached is from_cache
+        assert frames["if"].set_index("Feature").loc[missing, "Importance"].isna().all()
+
+    top = summary.top_importances(paths["IMPORTANCE_IF_PATH"], n=len(FEATURES))
+    assert not set(missing) & set(top["Feature"])
+    assert len(top) == len(FEATURES) - len(missing)
+    assert top["Feature"].iloc[0] == FEATURES[0] and np.isfinite(top["Importance"]).all()
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import socket
+
+import pytest
+from utils.dataset_cache import load_dataset
+from utils.features import FEATURES
+from utils.ingest_server import IngestServer, parse_record
+
+
+@pytest.fixture(scope="module")
+def records():
+    rows = load_dataset("datasets/data_stream.csv").head(20)
+    return [{"seq": i, **{name: float(row[name]) for name in FEATURES}} for i, (_, row) in enumerate(rows.iterrows())]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _exchange(server, *rounds):
+    """Start ``server`` and, over one TCP connection, send each round's lines and read its replies."""
+    task = asyncio.create_task(server.serve())
+    while not server._ready.is_set():
+        await asyncio.sleep(0.01)
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.tcp_port)
+    received = []
+    for lines, replies in rounds:
+        writer.write("".join(line + "\n" for line in lines).encode())
+        await writer.drain()
+        received.append([json.loads(await asyncio.wait_for(reader.readline(), 30)) for _ in range(replies)])
+    writer.close()
+    task.cancel()
+    return received
+
+
+def _server():
+    return IngestServer(tcp_port=_free_port(), udp_port=_free_port(), batch_size=4, max_delay=0.01)
+
+
+def test_parse_record_rejects_null_field(records):
+    record = dict(records[0], noise_per_ms=None)
+    with pytest.raises(ValueError, match="noise_per_ms"):
+        parse_record(json.dumps(record))
+
+
+def test_parse_record_rejects_non_numeric_csv_field():
+    header = list(FEATURES)
+    values = ["1"] * len(FEATURES)
+    values[FEATURES.index("noise_per_ms")] = "n/a"
+    with pytest.raises(ValueError, match="noise_per_ms"):
+        parse_record(",".join(values), header)
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "1e400"])
+def test_parse_record_rejects_non_finite_values(records, value):
+    values = [str(records[0][name]) for name in FEATURES]
+    values[FEATURES.index("timestamp")] = value
+    with pytest.raises(ValueError, match="timestamp"):
+        parse_record(",".join(values))
+    with pytest.raises(ValueError, match="timestamp"):
+        parse_record(",".join(values), list(FEATURES))
+    with pytest.raises(ValueError, match="timestamp"):
+        parse_record(json.dumps(dict(records[0], timestamp=float(value))))
+
+
+def test_nan_timestamp_over_tcp_does_not_stop_the_batcher(records):
+    server = _server()
+    bad = json.dumps(dict(records[0], timestamp=float("nan")))
+    first, later = asyncio.run(_exchange(
+        server, ([bad, json.dumps(records[1])], 2), ([json.dumps(record) for record in records[2:6]], 4)))
+
+    assert "timestamp" in first[0]["error"]
+    assert [reply["seq"] for reply in first[1:] + later] == [1, 2, 3, 4, 5]
+    assert all("signal_type" in reply for reply in first[1:] + later)
+    assert server.stats["invalid"] == 1 and server.stats["scored"] == 5
+
+
+def test_null_field_over_tcp_gets_an_error_reply(records):
+    server = _server()
+    bad = json.dumps(dict(records[0], noise_per_ms=None))
+    replies, = asyncio.run(_exchange(server, ([bad, json.dumps(records[1])], 2)))
+
+    assert "noise_per_ms" in replies[0]["error"]
+    assert replies[1]["seq"] == 1 and "signal_type" in replies[1]
+    assert server.stats["invalid"] == 1
+
+
+def test_batcher_survives_a_failing_batch(records):
+    server = _server()
+    detect = server._detect
+    calls = []
+
+    def fail_once(matrix):
+        calls.append(len(matrix))
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return detect(matrix)
+
+    server._detect = fail_once
+    failed, replies = asyncio.run(_exchange(
+        server, ([json.dumps(records[0])], 1), ([json.dumps(record) for record in records[1:5]], 4)))
+
+    assert "scoring failed" in failed[0]["error"]
+    assert [reply["seq"] for reply in replies] == [1, 2, 3, 4]
+    assert all("signal_type" in reply for reply in replies)
+    assert server.stats["failed"] == 1 and server.stats["scored"] == 4
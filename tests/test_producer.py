@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+import pytest
+from utils.dataset_cache import load_dataset
+from utils.producer import DetectionWorker
+from utils.quantile import P2Quantile
+from utils.stream import dataset_batches
+
+
+@pytest.fixture(scope="module")
+def data():
+    return load_dataset("datasets/data_stream.csv").head(600).reset_index(drop=True)
+
+
+def _run(data, sketch, start=0, stop_after=None, batch_size=32):
+    """Verdicts a worker queues from ``start``; stopped once ``stop_after`` rows are drained."""
+    worker = DetectionWorker(dataset_batches(data, batch_size, start), 0.2, sketch, batch_size=batch_size, maxsize=8)
+    worker.start()
+    items = []
+    while stop_after is None or len(items) < stop_after:
+        drained, finished = worker.drain()
+        items.extend(drained)
+        if finished:
+            break
+        time.sleep(0.001)
+    worker.stop()
+    worker.join(5)
+    items.extend(worker.drain()[0])
+    return items
+
+
+@pytest.mark.parametrize("stop_after", [1, 50, 333])
+def test_stop_and_resume_matches_uninterrupted_run(data, stop_after):
+    expected_sketch = P2Quantile(0.2)
+    expected = _run(data, expected_sketch)
+
+    sketch = P2Quantile(0.2)
+    first = _run(data, sketch, stop_after=stop_after)
+    assert sketch.count == len(first)
+    rest = _run(data, sketch, start=first[-1]["index"] + 1)
+
+    items = first + rest
+    assert [item["index"] for item in items] == list(range(len(data)))
+    assert [item["malicious"] for item in items] == [item["malicious"] for item in expected]
+    assert sketch.count == expected_sketch.count == len(data)
+    np.testing.assert_array_equal(sketch.heights, expected_sketch.heights)
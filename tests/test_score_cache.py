@@ -0,0 +1,32 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+from utils import score_cache
+
+
+@pytest.fixture
+def flight(tmp_path):
+    path = tmp_path / "flight.csv"
+    with open("datasets/data_stream.csv", encoding="utf-8") as source, open(path, "w", encoding="utf-8") as f:
+        f.writelines(line for _, line in zip(range(201), source))
+    yield str(path)
+    score_cache._flights.pop(str(path), None)
+
+
+@pytest.mark.parametrize("keep", [0, 100], ids=["empty", "truncated"])
+def test_broken_cache_is_rebuilt(flight, keep):
+    expected = score_cache.flight_scores(flight)
+    cache = score_cache._cache_path(flight)
+    with open(cache, "rb") as f:
+        head = f.read(keep)
+    with open(cache, "wb") as f:
+        f.write(head)
+    score_cache._flights.clear()
+
+    rebuilt = score_cache.flight_scores(flight)
+    np.testing.assert_array_equal(rebuilt.scores, expected.scores)
+    with np.load(cache) as stored:
+        np.testing.assert_array_equal(stored["scores"], expected.scores)
+    assert glob.glob(os.path.join(os.path.dirname(flight), "*.tmp")) == []
@@ -0,0 +1,24 @@
+import io
+
+import pytest
+from utils.features import FEATURES
+from utils.stream import SchemaError, read_chunks, validate_header
+
+
+@pytest.mark.parametrize("data", [b"", "timestamp,café\n1,2\n".encode("latin-1"), b'"timestamp\n1\n'],
+                         ids=["empty", "latin-1", "unclosed quote"])
+def test_unreadable_header_is_a_schema_error(data):
+    with pytest.raises(SchemaError):
+        validate_header(io.BytesIO(data))
+
+
+def test_missing_columns_are_a_schema_error():
+    with pytest.raises(SchemaError, match="missing"):
+        next(read_chunks(io.BytesIO(b"timestamp\n1\n")))
+
+
+def test_valid_upload_is_rewound_and_streamed():
+    source = io.BytesIO((",".join(FEATURES) + "\n" + ",".join("1" for _ in FEATURES) + "\n").encode())
+    validate_header(source)
+    chunk = next(read_chunks(source))
+    assert list(chunk.columns) == FEATURES and len(chunk) == 1
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from utils.track import MAX_ZOOM, build_track, synthetic_flight
+
+
+def _points(lines):
+    return [tuple(point) for polylines in lines.values() for line in polylines for point in line]
+
+
+def test_interleaved_recordings_are_never_joined():
+    first = synthetic_flight(2000, seed=1).assign(ref_lon=1.0, ref_alt=1.0)
+    second = synthetic_flight(2000, seed=2).assign(ref_lon=2.0, ref_alt=2.0, lat_x=lambda d: d["lat_x"] + 0.01)
+    # Same timestamps, so sorting the union by time alone would zig-zag between the two
+    flight = build_track(pd.concat([first, second]).sample(frac=1, random_state=0))
+    for zoom in (10, 16, MAX_ZOOM):
+        for polylines in flight.polylines(zoom).values():
+            for line in polylines:
+                lats = np.array(line)[:, 0]
+                assert (lats < 36.21).all() or (lats > 36.21).all()
+
+
+def test_short_runs_merge_when_zoomed_out():
+    data = synthetic_flight(20_000, seed=3)
+    # A verdict flip every 3 fixes: every run is far smaller than a pixel when zoomed out
+    data["source"] = (np.arange(len(data)) // 3) % 2
+    flight = build_track(data)
+    assert len(flight.kept(10)) < 50
+    assert sum(map(len, flight.polylines(10).values())) < 50
+    assert len(flight.kept(MAX_ZOOM)) > len(flight.kept(16)) > len(flight.kept(10))
+
+
+def test_runs_wider_than_a_pixel_keep_their_colour():
+    data = synthetic_flight(20_000, seed=4)
+    flight = build_track(data)
+    lines = flight.polylines(MAX_ZOOM)
+    runs = np.count_nonzero(np.diff(data["source"].to_numpy())) + 1
+    assert sum(map(len, lines.values())) == runs
+    assert set(_points(lines)) <= set(map(tuple, np.column_stack([data["lat_x"], data["lon_x"]]).round(7)))
@@ -0,0 +1,218 @@
+"""Benchmark the detection pipeline stage by stage.
+
+Times the pre-processing transform, the Isolation Forest and Random Forest calls and
+the end-to-end ``detect_batch`` (with and without early-exit scoring) over a sweep
+of batch sizes, on ``data_stream.csv`` scaled up with jittered copies. Model load times and peak memory are recorded as
+well. Results are written as JSON and can be compared with a stored baseline.
+
+Usage:
+    python -m utils.benchmark --save-baseline benchmark_baseline.json
+    python -m utils.benchmark --baseline benchmark_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import sklearn
+from utils import model_registry
+from utils.cascade import get_cascade
+from utils.dataset_cache import feature_matrix
+from utils.detection import detect_batch, preprocess
+from utils.features import FEATURES
+from utils.fused_preprocess import get_fused_preprocessor, workspace
+from utils.load_model import load_classifier, load_isolation_forest, load_scaler_function
+from utils.quantile import P2Quantile
+from utils.score_flight import peak_rss_bytes
+
+DEFAULT_SOURCE = os.path.join("datasets", "data_stream.csv")
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10_000]
+MODELS = ("preprocessor", "isolation_forest", "random_forest_model")
+
+
+def synthesize(features, rows, seed=0, jitter=0.01):
+    """Scale a feature matrix up to ``rows`` rows with jittered copies of its rows.
+
+    Each copy adds Gaussian noise of ``jitter`` times the column's standard deviation,
+    so repeated rows don't hit identical tree paths; timestamps keep increasing.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.asarray(features, dtype=np.float64)
+    picks = np.resize(np.arange(len(base)), rows)
+    data = base[picks] + rng.normal(0.0, jitter, (rows, base.shape[1])) * base.std(axis=0)
+    # Keep flags and counts at their recorded values
+    for name in ("timestamp", "terrain_alt_valid", "satellites_used"):
+        data[:, FEATURES.index(name)] = base[picks, FEATURES.index(name)]
+    span = np.ptp(base[:, FEATURES.index("timestamp")]) + 1
+    data[:, FEATURES.index("timestamp")] += (np.arange(rows) // len(base)) * span
+    return data
+
+
+def model_load_seconds():
+    """Cold load time of each model, read back from the registry after clearing it."""
+    model_registry.clear()
+    load_scaler_function(), load_isolation_forest(), load_classifier()
+    return {row["Model"]: row["Load Time (ms)"] / 1000 for row in model_registry.model_stats()
+            if row["Model"] in MODELS}
+
+
+def time_stage(run, data, batch_size, min_time=1.0, min_repeats=3):
+    """Time ``run(start, stop)`` on consecutive batches for at least ``min_time`` seconds."""
+    timings = []
+    start = 0
+    deadline = time.perf_counter() + min_time
+    while len(timings) < min_repeats or time.perf_counter() < deadline:
+        if start + batch_size > len(data):
+            start = 0
+        began = time.perf_counter()
+        run(start, start + batch_size)
+        timings.append(time.perf_counter() - began)
+        start += batch_size
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "batches": len(timings),
+        "median_s": median,
+        "p95_s": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "rows_per_sec": batch_size / median if median else float("inf"),
+    }
+
+
+def benchmark(source=DEFAULT_SOURCE, rows=100_000, batch_sizes=DEFAULT_BATCH_SIZES, min_time=1.0, seed=0,
+              contamination_threshold=0.20):
+    """Run the suite and return the report as a JSON-serialisable dict."""
+    load_times = model_load_seconds()
+    rss_after_load = peak_rss_bytes()
+    transformer, forest, classifier = load_scaler_function(), load_isolation_forest(), load_classifier()
+
+    features = synthesize(feature_matrix(source), max(rows, max(batch_sizes)), seed)
+    frame = pd.DataFrame(features, columns=FEATURES)
+    X = preprocess(None, features)
+    fused = get_fused_preprocessor()
+
+    stages = {
+        "preprocess": lambda a, b: transformer.transform(frame.iloc[a:b]),
+        "preprocess_fused": lambda a, b: fused.transform(features[a:b], workspace(b - a, fused.n_features_out)),
+        "isolation_forest": lambda a, b: forest.decision_function(X[a:b]),
+        "random_forest": lambda a, b: classifier.predict(X[a:b]),
+    }
+    report = {"stages": {}}
+    for name, run in stages.items():
+        report["stages"][name] = {
+            str(size): time_stage(run, features, size, min_time) for size in batch_sizes
+        }
+
+    # End to end as the dashboard runs it: running threshold, flat forests for small batches,
+    # with and without early-exit scoring
+    get_cascade()
+    for name, cascade in (("end_to_end", False), ("end_to_end_cascade", True)):
+        end_to_end = {}
+        for size in batch_sizes:
+            sketch = P2Quantile(contamination_threshold)
+            end_to_end[str(size)] = time_stage(
+                lambda a, b: detect_batch(frame.iloc[a:b], contamination_threshold, sketch=sketch,
+                                          features=features[a:b], cascade=cascade),
+                features, size, min_time)
+        report["stages"][name] = end_to_end
+
+    report["model_load_s"] = load_times
+    report["peak_rss_bytes"] = {"after_model_load": rss_after_load, "overall": peak_rss_bytes()}
+    report["meta"] = {
+        "source": source,
+        "rows": len(features),
+        "seed": seed,
+        "batch_sizes": list(batch_sizes),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    return report
+
+
+def compare(report, baseline, tolerance=0.20):
+    """Stage/batch-size pairs whose throughput fell more than ``tolerance`` below ``baseline``.
+
+    Returns ``(stage, batch_size, baseline rows/sec, current rows/sec)`` tuples.
+    """
+    regressions = []
+    for stage, sizes in baseline["stages"].items():
+        for size, before in sizes.items():
+            after = report["stages"].get(stage, {}).get(size)
+            if after is None:
+                continue
+            if after["rows_per_sec"] < before["rows_per_sec"] * (1 - tolerance):
+                regressions.append((stage, int(size), before["rows_per_sec"], after["rows_per_sec"]))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    sizes = report["meta"]["batch_sizes"]
+    print(f"{report['meta']['rows']} rows, {report['meta']['cpus']} CPUs; rows/sec per batch size")
+    width = 12 if baseline is None else 18
+    print(f"{'stage':<18}" + "".join(f"{size:>{width}}" for size in sizes))
+    for stage, results in report["stages"].items():
+        line = f"{stage:<18}"
+        for size in sizes:
+            rate = results[str(size)]["rows_per_sec"]
+            cell = f"{rate:,.0f}"
+            if baseline is not None and str(size) in baseline["stages"].get(stage, {}):
+                change = rate / baseline["stages"][stage][str(size)]["rows_per_sec"] - 1
+                cell += f" {change:+.0%}"
+            line += f"{cell:>{width}}"
+        print(line)
+    print("model load: " + ", ".join(f"{name} {secs:.2f}s" for name, secs in report["model_load_s"].items()))
+    peak = report["peak_rss_bytes"]
+    if peak["overall"]:
+        print(f"peak memory: {peak['after_model_load'] / 2**20:.1f} MB after model load, "
+              f"{peak['overall'] / 2**20:.1f} MB overall")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline stage by stage.")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="CSV the synthetic stream is built from")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows in the synthetic stream")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds spent timing each stage and batch size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON report to write")
+    parser.add_argument("--baseline", help="compare against this stored report")
+    parser.add_argument("--save-baseline", help="also store this run as the baseline at this path")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="allowed throughput drop against the baseline before failing")
+    args = parser.parse_args(argv)
+
+    # The forests were fitted on DataFrames; scoring ndarrays only triggers a name warning
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    report = benchmark(args.source, args.rows, args.batch_sizes, args.min_time, args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        for stage, size, before, after in regressions:
+            print(f"REGRESSION {stage} at batch size {size}: {before:,.0f} -> {after:,.0f} rows/sec")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
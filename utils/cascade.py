@@ -0,0 +1,305 @@
+"""Cascaded early-exit scoring for the Isolation Forest.
+
+Every row is first pushed through the forest's first ``trees`` trees only. Their
+summed path length, scaled up to the whole ensemble, estimates the row's anomaly
+score. Rows whose estimate lies at least ``margin`` away from the contamination
+cut-off keep that verdict. The others are finished with the remaining trees, which
+continues the same sum and gives exactly the full model's score.
+
+Calibration runs offline on ``Training Data.csv``. For each candidate number of
+trees, the base margin is the ``agreement`` quantile (99.9% by default) of the
+estimate's absolute error, so a fixed cut-off would flip at most 0.1% of verdicts.
+Exited rows feed their estimate to the running threshold, though, which then
+drifts a little from the full model's, mostly while it is still settling. So the
+stream is replayed at several contamination levels for each number of trees,
+margin multiplier and warm-up length (rows scored in full before any row may
+exit). The configuration walking the fewest trees per row is kept, provided its
+verdicts differ from the full model's at most half as often as ``agreement``
+allows everywhere, which leaves headroom for unseen flights.
+
+The result, with the measured speedup per batch size, is stored in a
+``cascade.json`` beside the Isolation Forest artifact in use (``models/`` or a
+model profile's directory) keyed by the model's version. ``get_cascade()``
+recalibrates when the model changes. The second walk over the remaining trees
+has a fixed per-call cost, so the cascade is slower than the full forest for
+small batches; ``break_even()`` is the smallest timed batch size from which it is
+faster, and the dashboard only offers it from there, once ``stored_calibration()``
+finds a calibration for the current model.
+
+Usage:
+    python -m utils.cascade            # calibrate, then check verdict agreement on a flight log
+"""
+import argparse
+import copy
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from utils.flat_forest import get_flat_forest
+from utils.model_registry import model_path, model_version
+
+DEFAULT_AGREEMENT = 0.999
+CALIBRATION_CONTAMINATION = 0.20
+CHECKED_CONTAMINATIONS = (0.10, CALIBRATION_CONTAMINATION, 0.30)
+TREE_COUNTS = (10, 20, 30, 40, 50)
+WARMUP_ROWS = (0, 250, 500, 1000)
+MARGIN_MULTIPLIERS = (1.0, 1.25, 1.5, 2.0)
+SIMULATED_BATCH_SIZE = 12
+TIMED_BATCH_SIZES = (1, 12, 32, 64, 100, 256)
+# Smallest measured speedup that counts as faster, above timing noise
+MIN_SPEEDUP = 1.05
+
+_cascade = None
+_cascade_lock = threading.Lock()
+
+
+class Cascade:
+    """Isolation Forest scoring that stops after ``trees`` trees for rows far from the cut-off.
+
+    No row exits early until the running threshold has seen ``warmup`` rows.
+    """
+
+    def __init__(self, forest, trees, margin, warmup=0, calibration=None):
+        self.forest = forest
+        self.trees = int(trees)
+        self.margin = float(margin)
+        self.warmup = int(warmup)
+        self.calibration = calibration or {}
+
+    def partial(self, X):
+        """Path lengths summed over the first ``trees`` trees, and the scores they estimate."""
+        depths = self.forest.path_lengths(X, slice(0, self.trees))
+        scale = self.forest.n_trees / self.trees
+        return depths, self.forest.depth_scores(depths * scale) - self.forest.meta["offset"]
+
+    def complete(self, X, depths, scores, cutoff):
+        """Finish the rows of ``scores`` within ``margin`` of ``cutoff``, in place.
+
+        ``cutoff`` is a scalar or one threshold per row (NaN: finish the row). Returns
+        the mask of rows that exited early; every other row now holds the exact
+        full-model score.
+        """
+        exited = np.abs(scores - cutoff) >= self.margin
+        if not exited.all():
+            rest = ~exited
+            total = self.forest.path_lengths(X[rest], slice(self.trees, None), depths[rest])
+            scores[rest] = self.forest.depth_scores(total) - self.forest.meta["offset"]
+        return exited
+
+    def score(self, X, cutoff):
+        """Scores for ``X`` against a known ``cutoff``; returns ``(scores, exited)``."""
+        depths, scores = self.partial(X)
+        return scores, self.complete(X, depths, scores, cutoff)
+
+    def cutoffs(self, estimates, contamination_threshold, window=None, sketch=None):
+        """Cut-offs to compare the estimated scores with, leaving ``sketch`` untouched.
+
+        Once ``sketch`` has seen ``warmup`` rows, its current value: the running
+        threshold barely moves within a batch by then. Before that, the per-row
+        thresholds the estimates would produce, NaN for rows still in the warm-up.
+        """
+        from utils.detection import window_thresholds
+
+        if sketch is None:
+            return window_thresholds(estimates, contamination_threshold, window)
+        if sketch.count >= self.warmup:
+            return sketch.value
+        cutoffs = copy.deepcopy(sketch).update_many(estimates)
+        cutoffs[:self.warmup - sketch.count] = np.nan
+        return cutoffs
+
+    def tree_evaluations(self, exit_rate):
+        """Trees walked per row on average when ``exit_rate`` of the rows exit early."""
+        return self.trees + (1 - exit_rate) * (self.forest.n_trees - self.trees)
+
+
+def simulate(cascade, estimates, full, contamination, expected, batch_size=SIMULATED_BATCH_SIZE):
+    """Replay precomputed scores as ``detect_batch`` would; returns ``(agreement, exit_rate)``.
+
+    ``estimates`` and ``full`` are every row's partial and full-model scores and
+    ``expected`` the full model's verdicts, so no trees are walked.
+    """
+    from utils.quantile import P2Quantile
+
+    sketch = P2Quantile(contamination)
+    agreeing = exits = 0
+    for start in range(0, len(full), batch_size):
+        batch = slice(start, start + batch_size)
+        cutoffs = cascade.cutoffs(estimates[batch], contamination, sketch=sketch)
+        exited = np.abs(estimates[batch] - cutoffs) >= cascade.margin
+        scores = np.where(exited, estimates[batch], full[batch])
+        agreeing += int(np.sum((scores < sketch.update_many(scores)) == expected[batch]))
+        exits += int(exited.sum())
+    return agreeing / len(full), exits / len(full)
+
+
+def _best_time(fn, batches, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for batch in batches:
+            fn(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_speedup(cascade, X, cutoff, batch_sizes=TIMED_BATCH_SIZES):
+    """Full-forest time over cascade time for scoring ``X`` in batches of each size."""
+    speedup = {}
+    for batch_size in batch_sizes:
+        batches = [X[i:i + batch_size] for i in range(0, len(X), batch_size)]
+        full = _best_time(cascade.forest.decision_function, batches)
+        cascaded = _best_time(lambda batch: cascade.score(batch, cutoff), batches)
+        speedup[str(batch_size)] = full / cascaded
+    return speedup
+
+
+def calibrate(agreement=DEFAULT_AGREEMENT, path=None):
+    """Pick the number of trees, margin and warm-up for the current Isolation Forest; returns the calibration."""
+    from utils.detection import preprocess
+    from utils.importance import TRAINING_PATH, training_data
+    from utils.quantile import P2Quantile
+
+    forest = get_flat_forest("isolation_forest")
+    X = preprocess(None, training_data(path or TRAINING_PATH)[0])
+    # Running sums in tree order, so row k holds exactly what the first k + 1 trees give
+    cumulative = np.cumsum(forest.value[forest.apply(X)], axis=0)
+    offset = forest.meta["offset"]
+    full = forest.depth_scores(cumulative[-1]) - offset
+    cutoff = np.percentile(full, CALIBRATION_CONTAMINATION * 100)
+
+    expected = {p: full < P2Quantile(p).update_many(full) for p in CHECKED_CONTAMINATIONS}
+
+    # Cheapest configuration (fewest trees walked per row) whose simulated verdicts
+    # use at most half the allowed disagreement, to leave headroom for unseen flights
+    best = None
+    # Compact model profiles may have fewer trees than some of the candidates
+    for trees in (count for count in TREE_COUNTS if count < forest.n_trees):
+        estimates = forest.depth_scores(cumulative[trees - 1] * (forest.n_trees / trees)) - offset
+        base_margin = float(np.quantile(np.abs(estimates - full), agreement))
+        for warmup in WARMUP_ROWS:
+            for multiplier in MARGIN_MULTIPLIERS:
+                cascade = Cascade(forest, trees, base_margin * multiplier, warmup)
+                runs = {p: simulate(cascade, estimates, full, p, expected[p]) for p in CHECKED_CONTAMINATIONS}
+                worst = min(run_agreement for run_agreement, _ in runs.values())
+                exit_rate = runs[CALIBRATION_CONTAMINATION][1]
+                evaluations = cascade.tree_evaluations(exit_rate)
+                if 1 - worst <= (1 - agreement) / 2 and (best is None or evaluations < best[3]):
+                    best = (cascade, worst, exit_rate, evaluations)
+    if best is None:
+        # Nothing met the target: never exit early
+        best = (Cascade(forest, forest.n_trees, np.inf), 1.0, 0.0, forest.n_trees)
+    cascade, worst, exit_rate, _ = best
+
+    return {
+        "model_version": model_version("isolation_forest"),
+        "n_trees": forest.n_trees,
+        "trees": cascade.trees,
+        "margin": cascade.margin,
+        "warmup": cascade.warmup,
+        "agreement_target": agreement,
+        "agreement": worst,
+        "contamination": CALIBRATION_CONTAMINATION,
+        "exit_rate": exit_rate,
+        "tree_evaluations": cascade.tree_evaluations(exit_rate),
+        "speedup": measure_speedup(cascade, X, cutoff),
+    }
+
+
+def calibration_path():
+    """``cascade.json`` beside the Isolation Forest being scored, so each model profile keeps its own."""
+    return os.path.join(os.path.dirname(model_path("isolation_forest")), "cascade.json")
+
+
+def _read_calibration():
+    try:
+        with open(calibration_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def stored_calibration():
+    """The saved calibration of the current Isolation Forest, or None; never calibrates."""
+    calibration = _read_calibration()
+    if calibration is None or calibration.get("model_version") != model_version("isolation_forest"):
+        return None
+    return calibration
+
+
+def break_even(calibration):
+    """Smallest timed batch size from which the cascade beat the full forest at every larger size, or None."""
+    size = None
+    for timed, speedup in sorted(calibration["speedup"].items(), key=lambda item: int(item[0]), reverse=True):
+        if speedup < MIN_SPEEDUP:
+            break
+        size = int(timed)
+    return size
+
+
+def get_cascade():
+    """Cascade for the current Isolation Forest, calibrating (and saving) when it has none yet."""
+    global _cascade
+    version = model_version("isolation_forest")
+    with _cascade_lock:
+        if _cascade is None or _cascade.calibration["model_version"] != version:
+            calibration = stored_calibration()
+            if calibration is None:
+                calibration = calibrate()
+                with open(calibration_path(), "w", encoding="utf-8") as f:
+                    json.dump(calibration, f, indent=2)
+            _cascade = Cascade(get_flat_forest("isolation_forest"), calibration["trees"],
+                               calibration["margin"], calibration["warmup"], calibration)
+        return _cascade
+
+
+def main(argv=None):
+    import warnings
+
+    from utils.dataset_cache import load_dataset
+    from utils.detection import detect_batch
+    from utils.quantile import P2Quantile
+
+    parser = argparse.ArgumentParser(description="Calibrate cascaded Isolation Forest scoring and check it.")
+    parser.add_argument("source", nargs="?", default=os.path.join("datasets", "data_stream.csv"),
+                        help="flight log used for the verdict agreement check")
+    parser.add_argument("--agreement", type=float, default=DEFAULT_AGREEMENT,
+                        help="quantile of the estimate's error the margin must cover")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--contamination", type=float, default=0.20)
+    args = parser.parse_args(argv)
+
+    # The forests were fitted on DataFrames; scoring ndarrays only triggers a name warning
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    calibration = calibrate(args.agreement)
+    with open(calibration_path(), "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+    print(f"Calibrated on training data: {calibration['trees']} of {calibration['n_trees']} trees, "
+          f"margin {calibration['margin']:.4f}, warm-up {calibration['warmup']} rows -> {calibration_path()}")
+    print(f"  early exit {calibration['exit_rate']:.1%}, {calibration['tree_evaluations']:.0f} trees per row, "
+          f"worst verdict agreement {calibration['agreement']:.3%}")
+    print("Isolation Forest speedup by batch size: " + ", ".join(
+        f"{size}: {speedup:.2f}x" for size, speedup in calibration["speedup"].items()))
+    threshold = break_even(calibration)
+    print(f"  faster than the full forest from batches of {threshold} rows" if threshold
+          else "  not faster than the full forest at any timed batch size")
+
+    data = load_dataset(args.source)
+    verdicts = {}
+    for cascade in (False, True):
+        sketch = P2Quantile(args.contamination)
+        parts = [detect_batch(data.iloc[i:i + args.batch_size], args.contamination, sketch=sketch, cascade=cascade)
+                 for i in range(0, len(data), args.batch_size)]
+        verdicts[cascade] = parts
+    full = np.concatenate([part["Signal Type"].to_numpy() for part in verdicts[False]])
+    cascaded = np.concatenate([part["Signal Type"].to_numpy() for part in verdicts[True]])
+    exited = np.concatenate([part["Early Exit"].to_numpy() for part in verdicts[True]])
+    print(f"{args.source}, batch size {args.batch_size}: verdict agreement {np.mean(full == cascaded):.3%}, "
+          f"early exit {exited.mean():.1%} ({int(np.sum(full != cascaded))} of {len(full)} verdicts differ)")
+
+
+if __name__ == "__main__":
+    main()
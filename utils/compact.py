@@ -0,0 +1,357 @@
+"""Compact variants of the shipped forests and an accuracy/latency Pareto report.
+
+Variants of the Random Forest and the Isolation Forest are built without
+retraining, by combining three reductions:
+
+- tree subsets: the first ``k`` trees of the ensemble;
+- depth truncation: nodes below ``max_depth`` are cut and their parent becomes a
+  leaf. For the classifier, that leaf keeps the class distribution of its samples.
+  For the Isolation Forest, it adds the usual average path length of its samples,
+  as a tree grown to that depth would;
+- float32 thresholds: each split threshold is rounded down to the nearest float32.
+  scikit-learn compares float32 inputs, so no verdict changes. The flat export
+  (``utils.flat_forest``) then stores the thresholds at half the size.
+
+Each variant is evaluated on ``datasets/data_stream.csv``, a labelled flight with
+no rows in common with ``Training Data.csv``. The Random Forest gets its spoofing
+vs jamming accuracy on the malicious rows, overall and per class. The Isolation
+Forest gets its F1 on malicious vs benign rows, with its offset re-fitted on the
+training data to flag as many rows as the shipped model does there. The same
+score on the training data is reported next to it as ``Training Score``. Every
+variant is also timed through the flat export the live stream uses, for one row
+and for a batch of ``BATCH_ROWS`` rows, and its pickle and flat export are sized.
+The report, ``models/compaction_report.csv``, marks the variants no other variant
+beats on held-out score, both latencies and both sizes.
+
+For each entry of ``PROFILE_TOLERANCES``, the fastest single-row Pareto variant
+of each model within that tolerance of the shipped model's held-out score is
+saved to ``models/profiles/<profile>/``, with a ``profile.json`` summary. A
+profile is a deployment choice: starting the app or a CLI tool with
+``UAV_MODEL_PROFILE=<profile>`` makes every model load come from those artifacts
+(see ``utils.model_registry``).
+
+Usage:
+    python -m utils.compact                          # build, evaluate, write the report and profiles
+    python -m utils.compact --trees 100 50 25 10 --depths 0 8 6 4 --repeats 200
+    UAV_MODEL_PROFILE=compact streamlit run app.py   # serve the dashboard with a profile
+"""
+import argparse
+import copy
+import io
+import json
+import os
+import shutil
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from utils.detection import preprocess
+from utils.flat_forest import flatten, save_flat_forest
+from utils.importance import BENIGN_SOURCE, JAMMING_SOURCE, TRAINING_PATH, isolation_forest_scorer, training_data
+from utils.model_registry import DEFAULT_PROFILE, MODELS_DIR, PROFILES_DIR, get_model, model_version, set_profile
+
+COMPACTED_MODELS = ("random_forest_model", "isolation_forest")
+TREE_COUNTS = (100, 50, 25, 10)
+# 0 keeps every level
+DEPTHS = (0, 8, 6, 4)
+BATCH_ROWS = 256
+# Labelled flight with no rows in common with the training data
+HOLDOUT_PATH = os.path.join("datasets", "data_stream.csv")
+REPORT_PATH = os.path.join(MODELS_DIR, "compaction_report.csv")
+# Largest drop in held-out accuracy (Random Forest) or F1 (Isolation Forest) each profile accepts
+PROFILE_TOLERANCES = {"compact": 0.005, "fast": 0.02}
+
+_LEAF, _UNDEFINED = -1, -2
+_COSTS = ("Single Row (ms)", f"Batch of {BATCH_ROWS} (ms)", "Pickle (KB)", "Flat Export (KB)")
+
+
+def _rebuild(tree, nodes, values, max_depth):
+    """A scikit-learn ``Tree`` with the given node table and values."""
+    from sklearn.tree._tree import Tree
+
+    rebuilt = Tree(tree.n_features, np.asarray(tree.n_classes, dtype=np.intp), tree.n_outputs)
+    rebuilt.__setstate__({"max_depth": int(max_depth), "node_count": len(nodes),
+                          "nodes": np.ascontiguousarray(nodes), "values": np.ascontiguousarray(values)})
+    return rebuilt
+
+
+def node_depths(nodes):
+    """Depth of every node of a node table, the root being 0."""
+    depth = np.zeros(len(nodes), dtype=np.intp)
+    frontier = np.array([0])
+    while frontier.size:
+        split = frontier[nodes["left_child"][frontier] != _LEAF]
+        children = np.concatenate([nodes["left_child"][split], nodes["right_child"][split]])
+        depth[children] = np.concatenate([depth[split], depth[split]]) + 1
+        frontier = children
+    return depth
+
+
+def truncate(tree, max_depth):
+    """Copy of ``tree`` with the nodes deeper than ``max_depth`` removed."""
+    state = tree.__getstate__()
+    nodes, values = state["nodes"], state["values"]
+    depth = node_depths(nodes)
+    kept = depth <= max_depth
+    # Node order is kept, so every kept node's new index is its rank among them
+    renumber = np.cumsum(kept) - 1
+    nodes, depth = nodes[kept].copy(), depth[kept]
+    split = nodes["left_child"] != _LEAF
+    inner = split & (depth < max_depth)
+    cut = split & (depth == max_depth)
+    nodes["left_child"][inner] = renumber[nodes["left_child"][inner]]
+    nodes["right_child"][inner] = renumber[nodes["right_child"][inner]]
+    nodes["left_child"][cut] = nodes["right_child"][cut] = _LEAF
+    nodes["feature"][cut] = _UNDEFINED
+    nodes["threshold"][cut] = _UNDEFINED
+    nodes["missing_go_to_left"][cut] = 0
+    return _rebuild(tree, nodes, values[kept], min(tree.max_depth, max_depth))
+
+
+def float32_thresholds(tree):
+    """Copy of ``tree`` whose thresholds are the largest float32 not above the original.
+
+    A float32 input ``x`` satisfies ``x <= t`` exactly when it satisfies
+    ``x <= t32`` for that ``t32``, so the tree's decisions are unchanged.
+    """
+    state = tree.__getstate__()
+    nodes = state["nodes"].copy()
+    split = nodes["left_child"] != _LEAF
+    thresholds = nodes["threshold"][split]
+    rounded = thresholds.astype(np.float32)
+    rounded = np.where(rounded > thresholds, np.nextafter(rounded, np.float32(-np.inf)), rounded)
+    nodes["threshold"][split] = rounded
+    return _rebuild(tree, nodes, state["values"], state["max_depth"])
+
+
+def compact_model(model, trees=None, max_depth=None, float32=False):
+    """Variant of a fitted forest: its first ``trees`` trees, cut at ``max_depth``, optionally float32.
+
+    The shipped model is left untouched; unchanged trees are shared with it.
+    """
+    estimators = model.estimators_[:trees]
+    if max_depth or float32:
+        compacted = []
+        for estimator in estimators:
+            tree = truncate(estimator.tree_, max_depth) if max_depth else estimator.tree_
+            estimator = copy.copy(estimator)
+            estimator.tree_ = float32_thresholds(tree) if float32 else tree
+            compacted.append(estimator)
+        estimators = compacted
+
+    variant = copy.copy(model)
+    variant.estimators_ = list(estimators)
+    variant.n_estimators = len(estimators)
+    if hasattr(model, "offset_"):
+        from sklearn.ensemble._iforest import _average_path_length
+
+        variant.estimators_features_ = model.estimators_features_[:trees]
+        variant._seeds = model._seeds[:trees]
+        # Per-node path lengths, as IsolationForest.fit computes them
+        variant._average_path_length_per_tree = [
+            _average_path_length(estimator.tree_.n_node_samples) for estimator in variant.estimators_]
+        variant._decision_path_lengths = [estimator.tree_.compute_node_depths() for estimator in variant.estimators_]
+    return variant
+
+
+def describe(trees, max_depth, float32):
+    parts = [f"{trees} trees"]
+    if max_depth:
+        parts.append(f"depth {max_depth}")
+    if float32:
+        parts.append("float32")
+    return ", ".join(parts)
+
+
+def _size_kb(save):
+    buffer = io.BytesIO()
+    save(buffer)
+    return len(buffer.getbuffer()) / 1024
+
+
+def artifact_sizes(variant):
+    """KB of the variant's pickle and of its flat export."""
+    forest = flatten(variant)
+    return dict(zip(_COSTS[2:], (_size_kb(lambda buffer: joblib.dump(variant, buffer)),
+                                 _size_kb(lambda buffer: save_flat_forest(forest, buffer)))))
+
+
+def measure_latency(variants, X, repeats):
+    """Best-of-``repeats`` ms per call of each variant's flat export, for one row and ``BATCH_ROWS`` rows.
+
+    The variants take turns on every repetition, so a burst of load on the machine
+    slows them all alike instead of one variant's whole measurement.
+    """
+    scorers = []
+    for variant in variants:
+        forest = flatten(variant)
+        scorers.append(forest.decision_function if hasattr(variant, "offset_") else forest.predict)
+    batches = (X[:1], X[np.arange(BATCH_ROWS) % len(X)])
+    best = np.full((len(scorers), len(batches)), np.inf)
+    for _ in range(repeats):
+        for i, score in enumerate(scorers):
+            for j, batch in enumerate(batches):
+                start = time.perf_counter()
+                score(batch)
+                best[i, j] = min(best[i, j], time.perf_counter() - start)
+    return 1000 * best
+
+
+def score_classifier(model, X, sources):
+    """Spoofing vs jamming accuracy on the malicious rows, overall and per class."""
+    malicious = sources != BENIGN_SOURCE
+    jamming = sources[malicious] == JAMMING_SOURCE
+    correct = model.predict(X[malicious]).astype(bool) == jamming
+    return {"Score": correct.mean(), "Spoofing Accuracy": correct[~jamming].mean(),
+            "Jamming Accuracy": correct[jamming].mean()}
+
+
+def refit_offset(variant, X, flagged_share):
+    """Move an Isolation Forest variant's offset so it flags ``flagged_share`` of ``X``."""
+    variant.offset_ = float(np.percentile(variant.score_samples(X), 100 * flagged_share))
+
+
+def score_variant(variant, X, sources):
+    """Accuracy (Random Forest) or F1 (Isolation Forest) of a variant, as ``Score`` plus any breakdown."""
+    if hasattr(variant, "offset_"):
+        return {"Score": isolation_forest_scorer(variant, X, (sources != BENIGN_SOURCE).astype(int))}
+    return score_classifier(variant, X, sources)
+
+
+def evaluate(name, fit, holdout, tree_counts=TREE_COUNTS, depths=DEPTHS, repeats=100):
+    """Every variant of model ``name`` with its scores and costs; returns ``(report rows, variants)``.
+
+    ``fit`` and ``holdout`` are ``(pre-processed X, source labels)``. Isolation Forest
+    offsets are re-fitted on ``fit``; ``Score`` and the class breakdown are measured
+    on ``holdout``, which profiles are chosen on, and ``Training Score`` on ``fit``.
+    """
+    model = get_model(name)
+    is_forest = hasattr(model, "offset_")
+    if is_forest:
+        flagged_share = float(np.mean(model.predict(fit[0]) == -1))
+    full_depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+
+    rows, variants = [], {}
+    for trees in sorted({min(count, model.n_estimators) for count in tree_counts} | {model.n_estimators}, reverse=True):
+        for max_depth in [0] + sorted({depth for depth in depths if 0 < depth < full_depth}, reverse=True):
+            for float32 in (False, True):
+                label = describe(trees, max_depth, float32)
+                variant = compact_model(model, trees, max_depth, float32)
+                if is_forest and (trees < model.n_estimators or max_depth):
+                    refit_offset(variant, fit[0], flagged_share)
+                rows.append({"Model": name, "Variant": label, "Trees": trees, "Max Depth": max_depth or full_depth,
+                             "Float32 Thresholds": float32, **score_variant(variant, *holdout),
+                             "Training Score": score_variant(variant, *fit)["Score"], **artifact_sizes(variant)})
+                variants[label] = variant
+
+    report = pd.DataFrame(rows)
+    latency = measure_latency(variants.values(), holdout[0], repeats)
+    report.insert(report.columns.get_loc(_COSTS[2]), _COSTS[0], latency[:, 0])
+    report.insert(report.columns.get_loc(_COSTS[2]), _COSTS[1], latency[:, 1])
+    report.insert(report.columns.get_loc("Score"), "Metric", "F1" if is_forest else "Accuracy")
+    report["Pareto"] = pareto_front(report)
+    return report, variants
+
+
+def pareto_front(report):
+    """Mask of the rows no other row matches or beats on score and every cost, while beating on one."""
+    score = report["Score"].to_numpy()
+    costs = report[list(_COSTS)].to_numpy()
+    better_or_equal = (score[None, :] >= score[:, None]) & (costs[None, :] <= costs[:, None]).all(axis=2)
+    strictly_better = (score[None, :] > score[:, None]) | (costs[None, :] < costs[:, None]).any(axis=2)
+    return ~(better_or_equal & strictly_better).any(axis=1)
+
+
+def pick(report, tolerance):
+    """The fastest single-row Pareto variant scoring within ``tolerance`` of the shipped model."""
+    baseline = report.iloc[0]["Score"]
+    candidates = report[report["Pareto"] & (report["Score"] >= baseline - tolerance)]
+    if candidates.empty:
+        # The shipped model itself, when nothing else qualifies
+        return report.iloc[0]
+    return candidates.sort_values(["Single Row (ms)", "Score"], ascending=[True, False]).iloc[0]
+
+
+def write_profiles(reports, variants, tolerances=PROFILE_TOLERANCES):
+    """Save each profile's chosen variants under ``models/profiles/<profile>/``; returns the summaries."""
+    summaries = {}
+    for profile, tolerance in tolerances.items():
+        directory = os.path.join(PROFILES_DIR, profile)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        summary = {"profile": profile, "tolerance": tolerance, "models": {}}
+        for name, report in reports.items():
+            chosen, baseline = pick(report, tolerance), report.iloc[0]
+            # A profile only holds the models it changes; the rest load from models/
+            if chosen["Variant"] != baseline["Variant"]:
+                joblib.dump(variants[name][chosen["Variant"]], os.path.join(directory, f"{name}.pkl"))
+            summary["models"][name] = {
+                "variant": chosen["Variant"],
+                "metric": chosen["Metric"],
+                "score": float(chosen["Score"]),
+                "baseline_score": float(baseline["Score"]),
+                "training_score": float(chosen["Training Score"]),
+                "baseline_training_score": float(baseline["Training Score"]),
+                "speedup_single_row": float(baseline["Single Row (ms)"] / chosen["Single Row (ms)"]),
+                "speedup_batch": float(baseline[_COSTS[1]] / chosen[_COSTS[1]]),
+                "pickle_kb": float(chosen["Pickle (KB)"]),
+                "baseline_pickle_kb": float(baseline["Pickle (KB)"]),
+                "source_version": model_version(name),
+            }
+        with open(os.path.join(directory, "profile.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        summaries[profile] = summary
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build compact forest variants and write a Pareto report.")
+    parser.add_argument("--data", default=TRAINING_PATH, help="labelled telemetry Isolation Forest offsets are fitted on")
+    parser.add_argument("--holdout", default=HOLDOUT_PATH,
+                        help="labelled telemetry, disjoint from --data, the variants are scored and chosen on")
+    parser.add_argument("--trees", type=int, nargs="+", default=list(TREE_COUNTS), help="tree subset sizes")
+    parser.add_argument("--depths", type=int, nargs="+", default=list(DEPTHS),
+                        help="depth limits (0 keeps every level)")
+    parser.add_argument("--repeats", type=int, default=100, help="timing repetitions per variant")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    # The forests were fitted on DataFrames; scoring ndarrays only triggers a name warning
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    # Variants are always cut from the shipped models, whatever UAV_MODEL_PROFILE says
+    set_profile(DEFAULT_PROFILE)
+
+    features, sources = training_data(args.data)
+    fit = (preprocess(None, features), sources)
+    features, sources = training_data(args.holdout)
+    holdout = (preprocess(None, features), sources)
+    reports, variants = {}, {}
+    for name in COMPACTED_MODELS:
+        start = time.perf_counter()
+        reports[name], variants[name] = evaluate(name, fit, holdout, args.trees, args.depths, args.repeats)
+        print(f"{name}: {len(reports[name])} variants evaluated in {time.perf_counter() - start:.1f} s")
+
+    report = pd.concat(reports.values(), ignore_index=True)
+    report.to_csv(args.output, index=False)
+    columns = ["Variant", "Metric", "Score", "Training Score", *_COSTS]
+    for name, model_report in reports.items():
+        print(f"\n{name} Pareto front ({int(model_report['Pareto'].sum())} of {len(model_report)} variants):")
+        print(model_report.loc[model_report["Pareto"], columns].to_string(
+            index=False, float_format=lambda value: f"{value:.3f}"))
+    print(f"\nFull report -> {args.output}")
+
+    for profile, summary in write_profiles(reports, variants).items():
+        print(f"\nProfile '{profile}' (held-out score within {summary['tolerance']:.1%}) -> "
+              f"{os.path.join(PROFILES_DIR, profile)}")
+        for name, chosen in summary["models"].items():
+            print(f"  {name:<20} {chosen['variant']:<26} {chosen['metric']} {chosen['score']:.3f} "
+                  f"(shipped {chosen['baseline_score']:.3f}), {chosen['speedup_single_row']:.2f}x single row, "
+                  f"{chosen['speedup_batch']:.2f}x batch, {chosen['pickle_kb']:,.0f} KB")
+    print(f"\nDeploy one by starting the app or tools with UAV_MODEL_PROFILE=<profile>; "
+          f"'{DEFAULT_PROFILE}' is the shipped models.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils import metrics
+from utils.features import FEATURES
+
+# Bump when the on-disk layout changes so stale caches are rebuilt
+CACHE_FORMAT = 1
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "format": CACHE_FORMAT}
+
+
+def _cache_paths(csv_path):
+    stem = os.path.splitext(csv_path)[0]
+    return {
+        "table": stem + ".feather",
+        "manifest": stem + ".cache.json",
+        "features": lambda dtype: f"{stem}.features.{np.dtype(dtype).name}.npy",
+    }
+
+
+def _read_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_atomic(path, write):
+    """Write through a temporary file so readers never see a half-written cache.
+
+    The temporary name is unique per call: Streamlit sessions are threads of one
+    process, so a name derived from the pid alone would be shared by concurrent rebuilds.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _ensure_table(csv_path):
+    """Rebuild the Feather copy of ``csv_path`` if the CSV changed; return its path."""
+    paths = _cache_paths(csv_path)
+    signature = _source_signature(csv_path)
+    manifest = _read_manifest(paths["manifest"])
+
+    if manifest.get("source") != signature or not os.path.exists(paths["table"]):
+        # Parse with pandas so cached values are bit-identical to what pd.read_csv returns
+        table = pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False)
+        # Uncompressed so the file can be memory-mapped instead of decoded
+        write_atomic(paths["table"], lambda p: feather.write_feather(table, p, compression="uncompressed"))
+        manifest = {"source": signature, "rows": table.num_rows, "features": {}}
+        write_atomic(paths["manifest"], lambda p: _dump_json(manifest, p))
+    return paths["table"]
+
+
+def _save_npy(array, path):
+    with open(path, "wb") as f:
+        np.save(f, array)
+
+
+def _dump_json(obj, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+
+
+def load_dataset(csv_path, columns=None):
+    """Load a dataset CSV through its typed, memory-mapped Feather cache.
+
+    The first call (and the first call after the CSV changes) parses the CSV once
+    and writes ``<name>.feather`` next to it; later calls map that file instead of
+    re-parsing text. ``columns`` restricts the load to a subset of columns.
+
+    Numeric columns without nulls are read-only views of the mapped file, one block
+    per column, rather than copies; string columns are still converted.
+    """
+    with metrics.stage("dataset_load"):
+        table = feather.read_table(_ensure_table(csv_path), columns=columns, memory_map=True)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def feature_matrix(csv_path, dtype=np.float64):
+    """Memory-mapped ``(rows, 34)`` matrix of the model features, in ``FEATURES`` order.
+
+    Stored as ``<name>.features.<dtype>.npy`` next to the CSV and rebuilt whenever the
+    CSV changes. Raises ``KeyError`` if the dataset lacks any of the features.
+    """
+    table_path = _ensure_table(csv_path)
+    paths = _cache_paths(csv_path)
+    matrix_path = paths["features"](dtype)
+    manifest = _read_manifest(paths["manifest"])
+    dtype_name = np.dtype(dtype).name
+
+    if dtype_name not in manifest.get("features", {}) or not os.path.exists(matrix_path):
+        table = feather.read_table(table_path, memory_map=True)
+        missing = [f for f in FEATURES if f not in table.column_names]
+        if missing:
+            raise KeyError(f"{csv_path} is missing model features: {missing}")
+        matrix = np.empty((table.num_rows, len(FEATURES)), dtype=dtype)
+        for j, name in enumerate(FEATURES):
+            matrix[:, j] = table.column(name).to_numpy()
+        write_atomic(matrix_path, lambda p: _save_npy(matrix, p))
+        manifest.setdefault("features", {})[dtype_name] = os.path.basename(matrix_path)
+        write_atomic(paths["manifest"], lambda p: _dump_json(manifest, p))
+
+    return np.load(matrix_path, mmap_mode="r")
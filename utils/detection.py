@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+from utils import metrics
+from utils.features import FEATURES
+from utils.flat_forest import get_flat_forest
+from utils.fused_preprocess import get_fused_preprocessor, workspace
+from utils.load_model import load_classifier, load_isolation_forest, load_scaler_function
+
+# Batches up to this many rows are scored with the flattened forests, which give
+# bit-identical results and avoid scikit-learn's fixed per-call overhead; larger
+# batches amortise that overhead and are faster through scikit-learn itself.
+FLAT_MAX_ROWS = 512
+
+# Random Forest class -> attack type
+ATTACK_TYPES = {0: "Spoofing", 1: "Jamming"}
+BENIGN = "Benign"
+
+
+def preprocess(batch, features=None, reuse_buffer=False):
+    """Apply the fitted ColumnTransformer to a batch of raw telemetry rows.
+
+    ``features`` may hold the batch's raw feature values already laid out in
+    ``FEATURES`` order (see ``utils.dataset_cache.feature_matrix``), which skips the
+    column selection from ``batch``.
+
+    The transformer runs as a fused NumPy kernel (``utils.fused_preprocess``) with
+    bit-identical output. ``reuse_buffer=True`` writes into this thread's reusable
+    output buffer instead of a new array; the result is then only valid until the
+    next such call on the same thread.
+    """
+    kernel = get_fused_preprocessor()
+    with metrics.stage("preprocess"):
+        if kernel is None:
+            transformer = load_scaler_function()
+            if features is not None:
+                return transformer.transform(pd.DataFrame(features, columns=FEATURES))
+            return transformer.transform(batch[FEATURES])
+        if features is None:
+            features = batch[FEATURES].to_numpy(dtype=np.float64)
+        out = workspace(len(features), kernel.n_features_out) if reuse_buffer else None
+        return kernel.transform(np.asarray(features), out)
+
+
+def anomaly_scores(X):
+    """Isolation Forest decision function for a pre-processed batch (lower is more anomalous)."""
+    forest = get_flat_forest("isolation_forest") if len(X) <= FLAT_MAX_ROWS else load_isolation_forest()
+    with metrics.stage("isolation_forest"):
+        return forest.decision_function(X)
+
+
+def attack_names(codes, is_malicious):
+    """Signal type per row: the attack type of its Random Forest class where flagged, else Benign."""
+    signal_types = np.full(len(is_malicious), BENIGN, dtype=object)
+    signal_types[is_malicious] = np.where(np.asarray(codes)[is_malicious] == 0, ATTACK_TYPES[0], ATTACK_TYPES[1])
+    return signal_types
+
+
+def classify_attacks(X, is_malicious):
+    """Label the flagged rows of ``X`` as Spoofing/Jamming in a single classifier call."""
+    if not is_malicious.any():
+        return np.full(len(X), BENIGN, dtype=object)
+    flagged = X[is_malicious]
+    if len(flagged) <= FLAT_MAX_ROWS:
+        classifier = get_flat_forest("random_forest_model")
+    else:
+        classifier = load_classifier()
+    codes = np.zeros(len(X), dtype=np.int8)
+    with metrics.stage("random_forest"):
+        codes[is_malicious] = classifier.predict(flagged)
+    return attack_names(codes, is_malicious)
+
+
+def window_thresholds(scores, contamination_threshold, window=None):
+    """Per-row contamination cut-off, computed over consecutive windows of ``window`` rows.
+
+    ``window=None`` uses the whole array as a single window.
+    """
+    q = contamination_threshold * 100
+    if window is None or window >= len(scores):
+        return np.full(len(scores), np.percentile(scores, q))
+
+    full = len(scores) // window * window
+    thresholds = np.empty(len(scores))
+    if full:
+        per_window = np.percentile(scores[:full].reshape(-1, window), q, axis=1)
+        thresholds[:full] = np.repeat(per_window, window)
+    if full < len(scores):
+        thresholds[full:] = np.percentile(scores[full:], q)
+    return thresholds
+
+
+def _cascade_scores(X, contamination_threshold, window, sketch):
+    """Early-exit Isolation Forest scores (see ``utils.cascade``) and the mask of rows that exited."""
+    from utils.cascade import get_cascade
+
+    cascade = get_cascade()
+    with metrics.stage("isolation_forest"):
+        depths, scores = cascade.partial(X)
+        cutoffs = cascade.cutoffs(scores, contamination_threshold, window, sketch)
+        exited = cascade.complete(X, depths, scores, cutoffs)
+    return scores, exited
+
+
+def detect_batch(batch, contamination_threshold=0.20, window=None, sketch=None, features=None, cascade=False,
+                 scored=None):
+    """Run the full detection chain over a batch of telemetry rows.
+
+    Each stage (pre-processing, Isolation Forest, Random Forest) is called once per
+    batch; the classifier only sees the rows flagged as anomalous and its labels are
+    scattered back into place.
+
+    The contamination cut-off comes from ``sketch`` when one is given: a running
+    quantile estimator (see ``utils.quantile.P2Quantile``) fed every score in stream
+    order, so verdicts do not depend on how the stream is batched. Otherwise it is
+    the percentile of the batch itself, or of each consecutive group of ``window``
+    rows.
+
+    ``features`` optionally supplies the batch's precomputed raw feature matrix.
+
+    ``cascade=True`` scores with the calibrated early-exit cascade (``utils.cascade``):
+    rows whose partial score is clearly on one side of the cut-off skip the rest of
+    the Isolation Forest and keep that estimate as their score.
+
+    ``scored`` supplies the batch's cached ``(anomaly scores, Random Forest classes)``
+    (see ``utils.score_cache``); no model is run then, only the cut-off is applied.
+
+    Returns one row per input row, indexed like ``batch``, with the columns ``Time``,
+    ``Signal Type``, ``Anomaly Score`` and ``Malicious``, plus ``Early Exit`` with
+    ``cascade=True``.
+    """
+    if batch.empty:
+        return pd.DataFrame(columns=["Time", "Signal Type", "Anomaly Score", "Malicious"])
+
+    if scored is not None:
+        if cascade:
+            raise ValueError("cached scores are exact; they can't be combined with cascade scoring")
+        scores, codes = scored
+    else:
+        X = preprocess(batch, features, reuse_buffer=True)
+        if cascade:
+            scores, exited = _cascade_scores(X, contamination_threshold, window, sketch)
+        else:
+            scores = anomaly_scores(X)
+    if sketch is not None:
+        thresholds = sketch.update_many(scores)
+    else:
+        thresholds = window_thresholds(scores, contamination_threshold, window)
+    is_malicious = scores < thresholds
+    if metrics.enabled():
+        metrics.count("rows_processed", len(batch))
+        metrics.count("rows_flagged", int(is_malicious.sum()))
+        if cascade:
+            metrics.count("rows_early_exit", int(exited.sum()))
+
+    if scored is not None:
+        signal_types = attack_names(codes, is_malicious)
+    else:
+        signal_types = classify_attacks(X, is_malicious)
+    results = pd.DataFrame({
+        "Time": batch["timestamp"].astype(str).to_numpy(),
+        "Signal Type": signal_types,
+        "Anomaly Score": scores,
+        "Malicious": is_malicious.astype(int),
+    }, index=batch.index)
+    if cascade:
+        results["Early Exit"] = exited
+    return results
@@ -0,0 +1,7 @@
+# Column order expected by preprocessor.pkl and both forests
+FEATURES = ['noise_per_ms', 'eph', 'timestamp', 's_variance_m_s', 'epv', 'lat_x',
+            'epv_x', 'evh', 'alt_ellipsoid_x', 'alt_ellipsoid_y', 'vel_m_s',
+            'satellites_used', 'hdop', 'vdop', 'y', 'vel_d_m_s', 'delta_heading',
+            'c_variance_rad', 'vel_n_m_s', 'z', 'heading_y', 'vy', 'vx',
+            'vel_e_m_s', 'q[2]', 'jamming_indicator', 'cog_rad', 'z_deriv', 'vz',
+            'ay', 'az', 'ax', 'q[1]', 'terrain_alt_valid']
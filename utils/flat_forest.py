@@ -0,0 +1,313 @@
+"""Array-backed evaluation of the shipped tree ensembles.
+
+Every tree of a fitted RandomForestClassifier or IsolationForest is flattened into one
+set of contiguous node arrays (split feature, threshold, children, leaf value). All
+trees are then walked together, level by level, with a handful of NumPy operations,
+which removes scikit-learn's per-call validation and per-tree dispatch overhead for
+the small batches typical of live telemetry. Scores and labels are bit-identical to
+the scikit-learn models they were exported from.
+
+Usage:
+    python -m utils.flat_forest            # export models/*.npz, check equivalence, time both paths
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+KIND_RANDOM_FOREST = "random_forest"
+KIND_ISOLATION_FOREST = "isolation_forest"
+
+
+class FlatForest:
+    """A tree ensemble stored as contiguous node arrays.
+
+    Leaves point to themselves with a ``+inf`` threshold, so every row can be pushed
+    down ``max_depth`` levels without checking whether it has already stopped.
+    """
+
+    def __init__(self, kind, feature, threshold, children, value, roots, max_depth, meta):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.meta = meta
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def apply(self, X, trees=slice(None)):
+        """Global leaf index reached by every row in every tree, shape ``(n_trees, n_rows)``.
+
+        ``trees`` (a slice) restricts the walk to a subset of the trees, in order.
+        """
+        # scikit-learn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = np.arange(n_rows) * n_features
+
+        nodes = np.repeat(self.roots[trees, None], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            x = flat_X[self.feature[nodes] + row_offsets]
+            go_right = ~(x <= self.threshold[nodes])
+            nodes = self.children[nodes, go_right.astype(np.intp)]
+        return nodes
+
+    def _accumulate(self, X, trees=slice(None), total=None):
+        """Sum the per-tree leaf values in tree order, as scikit-learn does.
+
+        With ``trees`` and ``total``, the sum over a later run of trees continues from
+        the sum over the earlier ones, giving the same result as summing all at once.
+        """
+        leaves = self.apply(X, trees)
+        if total is None:
+            total = np.zeros((leaves.shape[1],) + self.value.shape[1:])
+        for tree_leaves in leaves:
+            total += self.value[tree_leaves]
+        return total
+
+    def predict_proba(self, X):
+        """Class probabilities, matching ``RandomForestClassifier.predict_proba``."""
+        self._require(KIND_RANDOM_FOREST)
+        proba = self._accumulate(X)
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        """Class labels, matching ``RandomForestClassifier.predict``."""
+        return self.meta["classes"].take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def score_samples(self, X):
+        """Anomaly scores, matching ``IsolationForest.score_samples``."""
+        self._require(KIND_ISOLATION_FOREST)
+        return self.depth_scores(self._accumulate(X))
+
+    def path_lengths(self, X, trees=slice(None), total=None):
+        """Summed path lengths over ``trees``, continuing from ``total`` if given (see ``_accumulate``)."""
+        self._require(KIND_ISOLATION_FOREST)
+        return self._accumulate(X, trees, total)
+
+    def depth_scores(self, depths):
+        """Anomaly scores (as ``score_samples``) from path lengths summed over the whole ensemble."""
+        denominator = self.meta["denominator"]
+        scores = 2 ** (
+            -np.divide(depths, denominator, out=np.ones_like(depths), where=denominator != 0)
+        )
+        return -scores
+
+    def decision_function(self, X):
+        """Offset anomaly scores, matching ``IsolationForest.decision_function``."""
+        return self.score_samples(X) - self.meta["offset"]
+
+    def predict_anomaly(self, X):
+        """Inlier/outlier labels (1 / -1), matching ``IsolationForest.predict``."""
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+    def _require(self, kind):
+        if self.kind != kind:
+            raise TypeError(f"this operation needs a {kind} export, got {self.kind}")
+
+
+def _flatten(trees, leaf_values, feature_maps):
+    """Concatenate scikit-learn ``Tree`` objects into a single set of node arrays."""
+    sizes = [tree.node_count for tree in trees]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+    n_nodes = int(sum(sizes))
+
+    feature = np.empty(n_nodes, dtype=np.intp)
+    threshold = np.empty(n_nodes, dtype=np.float64)
+    children = np.empty((n_nodes, 2), dtype=np.intp)
+    value = np.concatenate(leaf_values)
+
+    for tree, offset, feature_map in zip(trees, offsets, feature_maps):
+        nodes = slice(offset, offset + tree.node_count)
+        own = np.arange(tree.node_count) + offset
+        is_leaf = tree.children_left < 0
+
+        local_feature = np.where(is_leaf, 0, tree.feature)
+        feature[nodes] = local_feature if feature_map is None else feature_map[local_feature]
+        threshold[nodes] = np.where(is_leaf, np.inf, tree.threshold)
+        children[nodes, 0] = np.where(is_leaf, own, tree.children_left + offset)
+        children[nodes, 1] = np.where(is_leaf, own, tree.children_right + offset)
+
+    if np.array_equal(threshold.astype(np.float32), threshold):
+        # Float32-exact thresholds (see ``utils.compact``) are kept at half the size
+        threshold = threshold.astype(np.float32)
+    max_depth = max(tree.max_depth for tree in trees)
+    return feature, threshold, children, value, offsets, max_depth
+
+
+def flatten_random_forest(model):
+    """Export a fitted ``RandomForestClassifier`` to a ``FlatForest``."""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    leaf_values = [tree.value[:, 0, :model.n_classes_] for tree in trees]
+    arrays = _flatten(trees, leaf_values, [None] * len(trees))
+    return FlatForest(KIND_RANDOM_FOREST, *arrays, meta={"classes": np.asarray(model.classes_)})
+
+
+def flatten_isolation_forest(model):
+    """Export a fitted ``IsolationForest`` to a ``FlatForest``.
+
+    Each node stores the path length a row ending there contributes to the ensemble
+    depth, so scoring is a gather and a sum.
+    """
+    from sklearn.ensemble._iforest import _average_path_length
+
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    leaf_values = [
+        decision_lengths + average_lengths - 1.0
+        for decision_lengths, average_lengths in zip(
+            model._decision_path_lengths, model._average_path_length_per_tree
+        )
+    ]
+    feature_maps = [np.asarray(features, dtype=np.intp) for features in model.estimators_features_]
+    arrays = _flatten(trees, leaf_values, feature_maps)
+    denominator = len(model.estimators_) * _average_path_length([model._max_samples])
+    return FlatForest(KIND_ISOLATION_FOREST, *arrays,
+                      meta={"denominator": denominator, "offset": float(model.offset_)})
+
+
+def flatten(model):
+    """Export either supported ensemble type."""
+    if hasattr(model, "offset_"):
+        return flatten_isolation_forest(model)
+    return flatten_random_forest(model)
+
+
+_compiled = {}
+
+
+def get_flat_forest(name):
+    """Flat export of the registry model ``name``, rebuilt whenever the model is reloaded."""
+    from utils.model_registry import get_model, model_version
+
+    model = get_model(name)
+    version = model_version(name)
+    cached = _compiled.get(name)
+    if cached is None or cached[0] != version:
+        cached = _compiled[name] = (version, flatten(model))
+    return cached[1]
+
+
+def save_flat_forest(forest, path):
+    """Write a ``FlatForest`` to an uncompressed ``.npz`` file."""
+    np.savez(
+        path, kind=forest.kind, feature=forest.feature, threshold=forest.threshold,
+        children=forest.children, value=forest.value, roots=forest.roots,
+        max_depth=forest.max_depth, **{f"meta_{k}": v for k, v in forest.meta.items()},
+    )
+
+
+def load_flat_forest(path):
+    """Read a ``FlatForest`` written by ``save_flat_forest``."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = {key[len("meta_"):]: data[key] for key in data.files if key.startswith("meta_")}
+        if "offset" in meta:
+            meta["offset"] = float(meta["offset"])
+        return FlatForest(
+            str(data["kind"]), data["feature"], data["threshold"], data["children"],
+            data["value"], data["roots"], int(data["max_depth"]), meta,
+        )
+
+
+def _best_time(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_equivalence(X):
+    """Compare both exports with the scikit-learn models on ``X``; return mismatch counts."""
+    from utils.load_model import load_classifier, load_isolation_forest
+
+    classifier = load_classifier()
+    isolation_forest = load_isolation_forest()
+    flat_classifier = flatten_random_forest(classifier)
+    flat_isolation = flatten_isolation_forest(isolation_forest)
+
+    return {
+        "random_forest_proba": int(np.sum(flat_classifier.predict_proba(X) != classifier.predict_proba(X))),
+        "random_forest_labels": int(np.sum(flat_classifier.predict(X) != classifier.predict(X))),
+        "isolation_forest_scores": int(np.sum(
+            flat_isolation.decision_function(X) != isolation_forest.decision_function(X))),
+        "isolation_forest_labels": int(np.sum(
+            flat_isolation.predict_anomaly(X) != isolation_forest.predict(X))),
+    }
+
+
+def compare_latency(X, batch_sizes=(1, 12, 1000), repeats=20):
+    """Best-of-``repeats`` latency in ms of scikit-learn vs flat evaluation per batch size."""
+    from utils.load_model import load_classifier, load_isolation_forest
+
+    classifier = load_classifier()
+    isolation_forest = load_isolation_forest()
+    flat_classifier = flatten_random_forest(classifier)
+    flat_isolation = flatten_isolation_forest(isolation_forest)
+
+    rows = []
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % len(X)]
+        timings = {
+            "sklearn_rf": _best_time(lambda: classifier.predict(batch), repeats),
+            "flat_rf": _best_time(lambda: flat_classifier.predict(batch), repeats),
+            "sklearn_if": _best_time(lambda: isolation_forest.decision_function(batch), repeats),
+            "flat_if": _best_time(lambda: flat_isolation.decision_function(batch), repeats),
+        }
+        rows.append({"batch_size": batch_size, **{k: v * 1000 for k, v in timings.items()}})
+    return rows
+
+
+def main(argv=None):
+    import warnings
+
+    import pandas as pd
+
+    from utils.detection import FEATURES, preprocess
+    from utils.load_model import load_classifier, load_isolation_forest
+
+    parser = argparse.ArgumentParser(description="Export the forests to flat arrays and verify them.")
+    parser.add_argument("--data", default=os.path.join("datasets", "data_stream.csv"),
+                        help="telemetry CSV used for the equivalence check and timings")
+    parser.add_argument("--repeats", type=int, default=20, help="timing repetitions per batch size")
+    args = parser.parse_args(argv)
+
+    # The forests were fitted on DataFrames; scoring ndarrays only triggers a name warning
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    for name, model in (("random_forest_model", load_classifier()), ("isolation_forest", load_isolation_forest())):
+        forest = flatten(model)
+        path = os.path.join("models", f"{name}.npz")
+        save_flat_forest(forest, path)
+        print(f"Exported {name}: {forest.n_trees} trees, {forest.n_nodes} nodes, depth {forest.max_depth} -> {path}")
+
+    X = preprocess(pd.read_csv(args.data, usecols=FEATURES))
+    mismatches = check_equivalence(X)
+    print(f"\nEquivalence on {len(X)} rows (mismatching values):")
+    for check, count in mismatches.items():
+        print(f"  {check:<26} {count}")
+
+    print("\nLatency in ms (best of %d):" % args.repeats)
+    print(f"  {'batch':>6} {'sklearn RF':>11} {'flat RF':>9} {'sklearn IF':>11} {'flat IF':>9}")
+    for row in compare_latency(X, repeats=args.repeats):
+        print(f"  {row['batch_size']:>6} {row['sklearn_rf']:>11.3f} {row['flat_rf']:>9.3f} "
+              f"{row['sklearn_if']:>11.3f} {row['flat_if']:>9.3f}")
+
+    if any(mismatches.values()):
+        raise SystemExit("Flat forests do not match the scikit-learn models")
+
+
+if __name__ == "__main__":
+    main()
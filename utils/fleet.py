@@ -0,0 +1,270 @@
+"""Fleet mode: score many vehicles' telemetry streams concurrently.
+
+Scoring (pre-processing, Isolation Forest, Random Forest) is sharded batch by batch
+across a process pool whose workers load the models once, when they start. Each
+vehicle keeps its own state in the parent process: running threshold, chart
+history and counters. Thresholding is the only per-vehicle sequential step and is
+cheap, so throughput scales with the number of worker processes.
+
+Usage:
+    python -m utils.fleet --vehicles 8 --workers 1 2 4
+"""
+import argparse
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from utils.detection import BENIGN, anomaly_scores, classify_attacks, preprocess
+from utils.features import FEATURES
+from utils.flat_forest import get_flat_forest
+from utils.fused_preprocess import get_fused_preprocessor
+from utils.load_model import load_classifier, load_isolation_forest, load_scaler_function
+from utils.model_registry import active_profile, set_profile
+from utils.quantile import P2Quantile
+
+VEHICLE_COLUMN = "vehicle_id"
+HISTORY_LEN = 30
+
+# Raw columns shown on the per-vehicle chart
+_CHART_COLUMNS = {key: FEATURES.index(name) for key, name in (
+    ("time", "timestamp"), ("speed", "vel_m_s"), ("signal", "jamming_indicator"), ("noise", "noise_per_ms"))}
+
+# (workers, profile) and the pool for them; only one pool of processes is kept alive
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _load_models(profile):
+    """Worker initializer: load every model of ``profile`` once for the life of the process."""
+    set_profile(profile)
+    load_scaler_function()
+    load_isolation_forest()
+    load_classifier()
+    get_fused_preprocessor()
+    get_flat_forest("isolation_forest")
+    get_flat_forest("random_forest_model")
+
+
+def score_features(features):
+    """Anomaly score and attack type for every row of a raw feature matrix.
+
+    Runs in the pool workers. The classifier labels all rows, not only the flagged
+    ones, because the threshold is applied afterwards by the vehicle's own state.
+    """
+    X = preprocess(None, features, reuse_buffer=True)
+    return anomaly_scores(X), classify_attacks(X, np.ones(len(X), dtype=bool))
+
+
+def get_pool(workers=None):
+    """Process-wide pool of ``workers`` scoring processes (default: one per CPU).
+
+    Workers score with the models of the profile active when the pool was created.
+    Asking for another worker count or profile shuts the current pool down: batches
+    still queued on it are cancelled (``Fleet.step()`` resubmits them) and its
+    processes exit once their running batch is done.
+    """
+    global _pool
+    workers = workers or os.cpu_count() or 1
+    key = (workers, active_profile())
+    with _pool_lock:
+        if _pool is None or _pool[0] != key:
+            if _pool is not None:
+                _pool[1].shutdown(wait=False, cancel_futures=True)
+            # Workers are spawned, not forked: the Streamlit server is multi-threaded
+            _pool = (key, ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_models, initargs=(key[1],)))
+        return _pool[1]
+
+
+def current_pool(workers=None):
+    """The pool currently alive, whatever its worker count; a new one of ``workers`` if there is none."""
+    with _pool_lock:
+        if _pool is not None:
+            return _pool[1]
+    return get_pool(workers)
+
+
+@atexit.register
+def shutdown_pool():
+    """Stop the scoring processes, if any were started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool[1].shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def split_streams(data, vehicle_column=VEHICLE_COLUMN):
+    """Raw feature matrix per vehicle from one telemetry table with a vehicle ID column."""
+    return {
+        vehicle_id: group[FEATURES].to_numpy(dtype=np.float64)
+        for vehicle_id, group in data.groupby(vehicle_column, sort=True)
+    }
+
+
+def simulate_fleet(features, vehicles):
+    """Split one recorded stream into ``vehicles`` contiguous streams, named UAV-1..N."""
+    return {f"UAV-{i + 1}": part for i, part in enumerate(np.array_split(features, vehicles))}
+
+
+class VehicleState:
+    """Everything the dashboard tracks for one vehicle."""
+
+    def __init__(self, vehicle_id, features, contamination_threshold):
+        self.vehicle_id = vehicle_id
+        self.features = features
+        self.sketch = P2Quantile(contamination_threshold)
+        self.history = {key: deque(maxlen=HISTORY_LEN) for key in _CHART_COLUMNS}
+        self.current_index = 0
+        self.submitted = 0
+        self.benign_count = 0
+        self.malicious_count = 0
+        self.last_signal_type = None
+        self.pending = deque()
+
+    @property
+    def done(self):
+        return self.current_index >= len(self.features)
+
+    def apply(self, start, scores, attacks):
+        """Threshold a scored batch with this vehicle's running quantile, in stream order."""
+        is_malicious = scores < self.sketch.update_many(scores)
+        signal_types = np.where(is_malicious, attacks, BENIGN)
+
+        rows = self.features[start:start + len(scores)]
+        for key, column in _CHART_COLUMNS.items():
+            self.history[key].extend(rows[-HISTORY_LEN:, column])
+        malicious = int(is_malicious.sum())
+        self.malicious_count += malicious
+        self.benign_count += len(scores) - malicious
+        self.last_signal_type = signal_types[-1]
+        self.current_index = start + len(scores)
+        return signal_types
+
+
+class Fleet:
+    """Per-vehicle state plus the process pool that scores it.
+
+    ``step()`` keeps up to ``depth`` batches per vehicle in flight on the pool, then
+    folds the oldest finished batch of every vehicle into its state. Batches of one
+    vehicle are always applied in order, so its verdicts match scoring the stream
+    alone with ``detect_batch`` and a running threshold. If another fleet replaces
+    the pool (see ``get_pool``), this one moves to the new pool rather than asking
+    for its own again, so fleets with different worker counts don't keep
+    restarting each other's processes.
+    """
+
+    def __init__(self, streams, contamination_threshold=0.20, batch_size=256, workers=None, depth=2):
+        self.vehicles = {vehicle_id: VehicleState(vehicle_id, features, contamination_threshold)
+                         for vehicle_id, features in streams.items()}
+        self.contamination_threshold = contamination_threshold
+        self.batch_size = batch_size
+        self.depth = depth
+        self.workers = workers
+        self.pool = get_pool(workers)
+
+    @property
+    def done(self):
+        return all(vehicle.done for vehicle in self.vehicles.values())
+
+    def _submit(self, vehicle):
+        while len(vehicle.pending) < self.depth and vehicle.submitted < len(vehicle.features):
+            start = vehicle.submitted
+            batch = vehicle.features[start:start + self.batch_size]
+            try:
+                future = self.pool.submit(score_features, batch)
+            except RuntimeError:
+                # Shut down by get_pool() for another fleet
+                self.pool = current_pool(self.workers)
+                future = self.pool.submit(score_features, batch)
+            vehicle.pending.append((start, future))
+            vehicle.submitted += len(batch)
+
+    def step(self):
+        """Score one batch per unfinished vehicle; returns the number of rows applied."""
+        for vehicle in self.vehicles.values():
+            self._submit(vehicle)
+        applied = 0
+        for vehicle in self.vehicles.values():
+            if vehicle.pending:
+                start, future = vehicle.pending.popleft()
+                try:
+                    scores, attacks = future.result()
+                except CancelledError:
+                    # Still queued when the pool was replaced: resubmit from the first unapplied rows
+                    self.cancel()
+                    return applied
+                vehicle.apply(start, scores, attacks)
+                applied += len(scores)
+        return applied
+
+    def run(self):
+        """Score every vehicle to the end of its stream; returns the number of rows."""
+        rows = 0
+        while not self.done:
+            rows += self.step()
+        return rows
+
+    def cancel(self):
+        """Drop the batches in flight on the pool; the next ``step()`` resubmits them.
+
+        Batches are applied in order, so every vehicle resumes from its first
+        unapplied row and no row skips the running threshold.
+        """
+        for vehicle in self.vehicles.values():
+            while vehicle.pending:
+                vehicle.pending.popleft()[1].cancel()
+            vehicle.submitted = vehicle.current_index
+
+    def summary(self):
+        """One row per vehicle: progress, counters and latest verdict."""
+        return pd.DataFrame([{
+            "Vehicle": vehicle.vehicle_id,
+            "Rows Scored": vehicle.current_index,
+            "Progress": vehicle.current_index / max(len(vehicle.features), 1),
+            "Benign": vehicle.benign_count,
+            "Malicious": vehicle.malicious_count,
+            "Flagged Rate": vehicle.malicious_count / max(vehicle.current_index, 1),
+            "Latest Verdict": vehicle.last_signal_type or "",
+        } for vehicle in self.vehicles.values()])
+
+
+def main(argv=None):
+    from utils.dataset_cache import feature_matrix
+
+    parser = argparse.ArgumentParser(description="Measure fleet-mode throughput per worker count.")
+    parser.add_argument("source", nargs="?", default=os.path.join("datasets", "data_stream.csv"))
+    parser.add_argument("--vehicles", type=int, default=8, help="simulated vehicles (each replays the whole file)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--contamination", type=float, default=0.20)
+    args = parser.parse_args(argv)
+
+    features = np.asarray(feature_matrix(args.source))
+    streams = {f"UAV-{i + 1}": features for i in range(args.vehicles)}
+    print(f"{args.vehicles} vehicles x {len(features)} rows, batch size {args.batch_size}, "
+          f"{os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in args.workers:
+        # Warm the pool so process start-up and model loading are not timed
+        pool = get_pool(workers)
+        list(pool.map(score_features, [features[:1]] * workers))
+
+        fleet = Fleet(streams, args.contamination, args.batch_size, workers)
+        start = time.perf_counter()
+        rows = fleet.run()
+        rate = rows / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"{workers:>3} workers: {rate:>10,.0f} rows/sec ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
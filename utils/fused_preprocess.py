@@ -0,0 +1,186 @@
+"""Fused NumPy kernel for the fitted pre-processing ColumnTransformer.
+
+The shipped transformer only scales columns: StandardScaler and RobustScaler subtract
+a centre and divide by a scale, MinMaxScaler multiplies and adds an offset, and a
+passthrough keeps one column as is. Each fitted step is folded into four per-output-
+column arrays, so a whole batch is transformed by one column gather and four in-place
+ufuncs, applied in the order scikit-learn applies them:
+
+    out = X[:, columns];  out -= sub;  out /= div;  out *= mul;  out += add
+
+Identity entries (``sub=0``, ``div=1``, ``mul=1``, ``add=0``) leave values unchanged, so
+the output is bit-identical to ``transformer.transform``. With an ``out`` buffer no
+arrays are allocated per batch; NumPy only uses its fixed-size (64 KB) ufunc scratch
+buffer for the broadcast steps.
+
+Usage:
+    python -m utils.fused_preprocess       # check equivalence, compare latency and allocations
+"""
+import argparse
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.preprocessing import FunctionTransformer, MinMaxScaler, RobustScaler, StandardScaler
+
+from utils.features import FEATURES
+
+_local = threading.local()
+
+
+class FusedPreprocessor:
+    """Column gather plus per-column ``(x - sub) / div * mul + add`` for a fitted ColumnTransformer.
+
+    Input rows are raw feature values in ``features`` order; output columns follow
+    the transformer's own order, as ``transform`` does. Raises ``TypeError`` for a
+    transformer containing anything other than the scalers it knows how to fuse.
+    """
+
+    def __init__(self, transformer, features=FEATURES):
+        position = {name: i for i, name in enumerate(features)}
+        names_in = list(getattr(transformer, "feature_names_in_", features))
+        columns, sub, div, mul, add = [], [], [], [], []
+
+        for name, step, selected in transformer.transformers_:
+            if isinstance(step, str) and step == "drop":
+                continue
+            selected = [names_in[c] if isinstance(c, (int, np.integer)) else c for c in np.atleast_1d(selected)]
+            n = len(selected)
+            ones, zeros = np.ones(n), np.zeros(n)
+            if isinstance(step, StandardScaler):
+                sub.append(step.mean_ if step.with_mean else zeros)
+                div.append(step.scale_ if step.with_std else ones)
+                mul.append(ones), add.append(zeros)
+            elif isinstance(step, RobustScaler):
+                sub.append(step.center_ if step.with_centering else zeros)
+                div.append(step.scale_ if step.with_scaling else ones)
+                mul.append(ones), add.append(zeros)
+            elif isinstance(step, MinMaxScaler) and not step.clip:
+                sub.append(zeros), div.append(ones)
+                mul.append(step.scale_), add.append(step.min_)
+            elif step == "passthrough" or (isinstance(step, FunctionTransformer) and step.func is None):
+                sub.append(zeros), div.append(ones), mul.append(ones), add.append(zeros)
+            else:
+                raise TypeError(f"can't fuse transformer step {name!r}: {step!r}")
+            columns.extend(position[c] for c in selected)
+
+        self.columns = np.asarray(columns, dtype=np.intp)
+        self.sub = np.ascontiguousarray(np.concatenate(sub), dtype=np.float64)
+        self.div = np.ascontiguousarray(np.concatenate(div), dtype=np.float64)
+        self.mul = np.ascontiguousarray(np.concatenate(mul), dtype=np.float64)
+        self.add = np.ascontiguousarray(np.concatenate(add), dtype=np.float64)
+        self._params = {np.dtype(np.float64): (self.sub, self.div, self.mul, self.add)}
+
+    @property
+    def n_features_out(self):
+        return len(self.columns)
+
+    def _params_for(self, dtype):
+        params = self._params.get(dtype)
+        if params is None:
+            params = self._params[dtype] = tuple(p.astype(dtype) for p in (self.sub, self.div, self.mul, self.add))
+        return params
+
+    def transform(self, X, out=None):
+        """Transform raw rows ``X`` (``(n, len(features))``) into ``out`` and return it.
+
+        ``out`` must be a C-contiguous ``(n, n_features_out)`` float array; its dtype
+        sets the precision (float64 reproduces ``transform`` exactly). A new float64
+        array is allocated when it is omitted. Nothing else is allocated as long as
+        ``X`` already has the dtype of ``out``.
+        """
+        if out is None:
+            out = np.empty((len(X), self.n_features_out), dtype=np.float64)
+        if X.dtype != out.dtype:
+            X = X.astype(out.dtype)
+        sub, div, mul, add = self._params_for(out.dtype)
+        # Column indices are known to be valid; "raise" mode would buffer the output
+        np.take(X, self.columns, axis=1, out=out, mode="clip")
+        np.subtract(out, sub, out=out)
+        np.divide(out, div, out=out)
+        np.multiply(out, mul, out=out)
+        np.add(out, add, out=out)
+        return out
+
+
+def workspace(rows, columns, dtype=np.float64):
+    """A ``(rows, columns)`` view of this thread's reusable output buffer.
+
+    The buffer only grows, so steady-state batches allocate nothing. Its contents are
+    overwritten by the next call on the same thread.
+    """
+    dtype = np.dtype(dtype)
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None or buffer.dtype != dtype or buffer.shape[1] != columns or len(buffer) < rows:
+        capacity = max(rows, len(buffer) * 2 if buffer is not None else 0)
+        buffer = _local.buffer = np.empty((capacity, columns), dtype=dtype)
+    return buffer[:rows]
+
+
+_compiled = {}
+
+
+def get_fused_preprocessor(name="preprocessor"):
+    """Fused kernel for the registry transformer ``name``, rebuilt whenever it is reloaded.
+
+    Returns None if the transformer has steps the kernel can't fuse.
+    """
+    from utils.model_registry import get_model, model_version
+
+    transformer = get_model(name)
+    version = model_version(name)
+    cached = _compiled.get(name)
+    if cached is None or cached[0] != version:
+        try:
+            kernel = FusedPreprocessor(transformer)
+        except TypeError:
+            kernel = None
+        cached = _compiled[name] = (version, kernel)
+    return cached[1]
+
+
+def main(argv=None):
+    import pandas as pd
+
+    from utils.dataset_cache import feature_matrix
+    from utils.load_model import load_scaler_function
+
+    parser = argparse.ArgumentParser(description="Check the fused pre-processing kernel against the transformer.")
+    parser.add_argument("--data", default=os.path.join("datasets", "data_stream.csv"))
+    parser.add_argument("--repeats", type=int, default=200, help="timed batches per batch size")
+    args = parser.parse_args(argv)
+
+    transformer = load_scaler_function()
+    fused = get_fused_preprocessor()
+    if fused is None:
+        parser.exit(1, "The shipped preprocessor has steps that can't be fused.\n")
+    features = np.ascontiguousarray(feature_matrix(args.data))
+
+    expected = transformer.transform(pd.DataFrame(features, columns=FEATURES))
+    actual = fused.transform(features)
+    identical = np.array_equal(expected.view(np.int64), actual.view(np.int64))
+    print(f"{len(features)} rows: bit-identical={identical}, max abs diff={np.abs(expected - actual).max():.3g}")
+
+    print(f"{'batch':>6} {'transformer ms':>15} {'fused ms':>9} {'transformer KB':>15} {'fused KB':>9}")
+    for batch_size in (1, 12, 1000):
+        batch = features[:batch_size]
+        out = workspace(batch_size, fused.n_features_out)
+        timings, allocated = [], []
+        for run in (lambda: transformer.transform(pd.DataFrame(batch, columns=FEATURES)),
+                    lambda: fused.transform(batch, out=out)):
+            run()
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                run()
+            timings.append((time.perf_counter() - start) / args.repeats * 1000)
+            tracemalloc.start()
+            run()
+            allocated.append(tracemalloc.get_traced_memory()[1] / 1024)
+            tracemalloc.stop()
+        print(f"{batch_size:>6} {timings[0]:>15.3f} {timings[1]:>9.4f} {allocated[0]:>15.1f} {allocated[1]:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Full-flight history of the live chart's series, downsampled through a min/max pyramid.
+
+Every scored row is appended to growable typed columns (row timestamp, attack
+type code and one float32 column per series). Level ``k`` of the pyramid
+summarises consecutive buckets of ``FANOUT ** k`` rows. For each series it keeps
+the value and row of the bucket's minimum and maximum, and for each attack type
+the first row in the bucket with that verdict. Levels are extended as buckets
+fill up, so an append costs O(rows appended) however long the flight is.
+
+``window`` picks the finest level that gives at most ``max_points`` points per
+trace over the requested rows. It draws each bucket as its minimum
+and maximum in row order, which keeps every spike visible. Only buckets that lie
+wholly inside the window are used at a coarse level; the rows at either end,
+including the partial bucket at the end of the flight, are filled in from finer
+levels. Every point and marker therefore lies inside the requested rows, and the
+newest rows are always shown. A window never returns more than about
+``max_points`` points per trace, whether it spans a hundred rows or the whole
+flight.
+"""
+import numpy as np
+
+FANOUT = 8
+MAX_POINTS = 2000
+ATTACK_TYPES = {1: "Spoofing", 2: "Jamming"}
+
+
+class _Columns:
+    """Typed arrays that double in capacity as rows are appended."""
+
+    def __init__(self, dtypes):
+        self.arrays = {name: np.empty(1024, dtype=dtype) for name, dtype in dtypes.items()}
+        self.length = 0
+
+    def extend(self, **values):
+        n = len(next(iter(values.values())))
+        end = self.length + n
+        if end > len(next(iter(self.arrays.values()))):
+            capacity = max(end, 2 * len(next(iter(self.arrays.values()))))
+            for name, array in self.arrays.items():
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:self.length] = array[:self.length]
+                self.arrays[name] = grown
+        for name, value in values.items():
+            self.arrays[name][self.length:end] = value
+        self.length = end
+
+    def __getitem__(self, name):
+        return self.arrays[name][:self.length]
+
+
+class FlightHistory:
+    """Incrementally built multi-resolution index over the rows of one stream."""
+
+    def __init__(self, series=("speed", "signal", "noise")):
+        self.series = tuple(series)
+        dtypes = {"timestamp": np.int64, "attack": np.int8}
+        dtypes.update({name: np.float32 for name in self.series})
+        self.rows = _Columns(dtypes)
+        self.levels = []
+
+    def __len__(self):
+        return self.rows.length
+
+    def append(self, timestamps, attack_codes, **series):
+        """Add a batch of rows: timestamps, attack type codes (0 benign) and one array per series."""
+        if len(timestamps) == 0:
+            return
+        self.rows.extend(timestamp=timestamps, attack=attack_codes, **series)
+        level = 1
+        while True:
+            complete = self._level_length(level - 1) // FANOUT
+            if level > len(self.levels):
+                if complete == 0:
+                    break
+                dtypes = {f"first_{code}": np.int64 for code in ATTACK_TYPES}
+                for name in self.series:
+                    dtypes.update({f"{name}_min": np.float32, f"{name}_min_at": np.int64,
+                                   f"{name}_max": np.float32, f"{name}_max_at": np.int64})
+                self.levels.append(_Columns(dtypes))
+            current = self.levels[level - 1]
+            if complete == current.length:
+                break
+            current.extend(**self._summarise(level - 1, current.length * FANOUT, complete * FANOUT))
+            level += 1
+
+    def _level_length(self, level):
+        return self.rows.length if level == 0 else self.levels[level - 1].length
+
+    def _column(self, level, key, first, last):
+        """Entries ``first:last`` of summary column ``key`` at ``level``; level 0 is the rows themselves."""
+        if level > 0:
+            return self.levels[level - 1][key][first:last]
+        if key.startswith("first_"):
+            # Each row is its own bucket: its index if it has that verdict, else -1
+            code = int(key[len("first_"):])
+            return np.where(self.rows["attack"][first:last] == code, np.arange(first, last), -1)
+        if key.endswith("_at"):
+            return np.arange(first, last)
+        return self.rows[key.rsplit("_", 1)[0]][first:last]
+
+    def _summarise(self, level, start, stop):
+        """Summary columns for the buckets of ``FANOUT`` entries of ``level`` in ``start:stop``."""
+        summary = {}
+        for name in self.series:
+            for extreme, pick in (("min", np.argmin), ("max", np.argmax)):
+                values = self._column(level, f"{name}_{extreme}", start, stop).reshape(-1, FANOUT)
+                at = self._column(level, f"{name}_{extreme}_at", start, stop).reshape(-1, FANOUT)
+                chosen = pick(values, axis=1)[:, None]
+                summary[f"{name}_{extreme}"] = np.take_along_axis(values, chosen, axis=1)[:, 0]
+                summary[f"{name}_{extreme}_at"] = np.take_along_axis(at, chosen, axis=1)[:, 0]
+        missing = np.iinfo(np.int64).max
+        for code in ATTACK_TYPES:
+            first = self._column(level, f"first_{code}", start, stop).reshape(-1, FANOUT)
+            # Children without that verdict hold -1
+            earliest = np.where(first >= 0, first, missing).min(axis=1)
+            summary[f"first_{code}"] = np.where(earliest == missing, -1, earliest)
+        return summary
+
+    def _parts(self, start, stop, max_points):
+        """``(level, first bucket, last bucket)`` ranges covering exactly rows ``start:stop``, in row order."""
+        level = 0
+        # Two points per bucket
+        while level < len(self.levels) and (stop - start) / FANOUT ** level > max_points / 2:
+            level += 1
+        return self._cover(start, stop, level)
+
+    def _cover(self, start, stop, level):
+        """The buckets of ``level`` inside rows ``start:stop``, with both ends covered by finer levels."""
+        if start >= stop:
+            return []
+        if level == 0:
+            return [(0, start, stop)]
+        size = FANOUT ** level
+        first = -(-start // size)
+        last = min(stop // size, self._level_length(level))
+        if first >= last:
+            return self._cover(start, stop, level - 1)
+        return (self._cover(start, first * size, level - 1) + [(level, first, last)]
+                + self._cover(last * size, stop, level - 1))
+
+    def window(self, start=0, stop=None, max_points=MAX_POINTS):
+        """Downsampled rows ``start:stop`` of the flight.
+
+        Returns ``{series: (rows, values)}`` with each trace's points in row order,
+        ``{attack type: rows}`` for the verdict markers (at most one per bucket and
+        type) and the level of detail, as rows per bucket, of the coarsest part.
+        Every returned row lies in ``start:stop``.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = max(0, min(start, stop))
+        parts = self._parts(start, stop, max_points)
+        traces = {name: ([], []) for name in self.series}
+        markers = {name: [] for name in ATTACK_TYPES.values()}
+        for level, first, last in parts:
+            for name in self.series:
+                low_at = self._column(level, f"{name}_min_at", first, last)
+                high_at = self._column(level, f"{name}_max_at", first, last)
+                low = self._column(level, f"{name}_min", first, last)
+                high = self._column(level, f"{name}_max", first, last)
+                if level == 0:
+                    traces[name][0].append(low_at)
+                    traces[name][1].append(low)
+                    continue
+                # Each bucket contributes its two extremes in row order
+                ordered = low_at <= high_at
+                rows = np.column_stack([np.where(ordered, low_at, high_at), np.where(ordered, high_at, low_at)])
+                values = np.column_stack([np.where(ordered, low, high), np.where(ordered, high, low)])
+                traces[name][0].append(rows.ravel())
+                traces[name][1].append(values.ravel())
+            for code, attack in ATTACK_TYPES.items():
+                first_rows = self._column(level, f"first_{code}", first, last)
+                markers[attack].append(first_rows[first_rows >= 0])
+
+        traces = {name: (np.concatenate(rows) if rows else np.empty(0, dtype=np.int64),
+                         np.concatenate(values) if values else np.empty(0, dtype=np.float32))
+                  for name, (rows, values) in traces.items()}
+        markers = {attack: np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+                   for attack, rows in markers.items()}
+        detail = FANOUT ** max(level for level, _, _ in parts) if parts else 1
+        return traces, markers, detail
+
+    def timestamps(self, rows):
+        return self.rows["timestamp"][rows]
+
+    def values(self, name, rows):
+        return self.rows[name][rows]
+
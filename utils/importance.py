@@ -0,0 +1,210 @@
+"""Recompute permutation feature importance for both models on the training data.
+
+The Isolation Forest is scored by F1 on malicious vs benign rows; the Random Forest
+by accuracy on Spoofing vs Jamming among the malicious rows. Columns are permuted
+after pre-processing, which is equivalent to permuting the raw features because
+every scaler works column by column. Features the training data lacks are filled
+with 0 so the models can score it, and their importance is recorded as missing
+(NaN) rather than as a measured 0, which keeps them off the Home charts.
+
+Results are cached in ``datasets/importance.cache.json`` under a key built from the
+three model versions, the training data's content hash and the job parameters, and
+written to the ``Feature Importance IF.csv`` / ``Feature Importance RF.csv`` files the
+Home page reads.
+
+Usage:
+    python -m utils.importance --repeats 5 --sample 3000 --n-jobs -1
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from utils.dataset_cache import load_dataset
+from utils.detection import preprocess
+from utils.features import FEATURES
+from utils.load_model import load_classifier, load_isolation_forest, load_scaler_function
+from utils.model_registry import model_version
+from utils.summary import IMPORTANCE_IF_PATH, IMPORTANCE_RF_PATH, content_hash
+
+TRAINING_PATH = os.path.join("datasets", "Training Data.csv")
+CACHE_PATH = os.path.join("datasets", "importance.cache.json")
+
+# `source` column of the training data
+BENIGN_SOURCE, SPOOFING_SOURCE, JAMMING_SOURCE = 0, 1, 2
+
+_job = None
+_job_lock = threading.Lock()
+
+
+def isolation_forest_scorer(estimator, X, y):
+    """F1 of the Isolation Forest's outlier predictions against binary malicious labels."""
+    from sklearn.metrics import f1_score
+
+    predictions = estimator.predict(X)
+    pred_binary = (predictions == -1).astype(int)
+    return f1_score(y, pred_binary, average='binary')
+
+
+def training_data(path=TRAINING_PATH):
+    """Raw ``FEATURES`` matrix (missing features filled with 0) and ``source`` labels."""
+    data = load_dataset(path)
+    features = data.reindex(columns=FEATURES, fill_value=0).to_numpy(dtype=np.float64)
+    return features, data["source"].to_numpy()
+
+
+def missing_features(path=TRAINING_PATH):
+    """``FEATURES`` the training data has no column for."""
+    columns = pd.read_csv(path, nrows=0).columns
+    return [name for name in FEATURES if name not in columns]
+
+
+def stratified_sample(labels, size, seed=0):
+    """Indices of ``size`` rows drawn with each label's share of the data preserved."""
+    if size is None or size >= len(labels):
+        return np.arange(len(labels))
+    from sklearn.model_selection import train_test_split
+
+    picked, _ = train_test_split(np.arange(len(labels)), train_size=size, stratify=labels, random_state=seed)
+    return np.sort(picked)
+
+
+def _importance_frame(result, names):
+    return pd.DataFrame({
+        "Feature": names,
+        "Importance": result.importances_mean,
+        "Std": result.importances_std,
+    }).set_index("Feature", drop=False).loc[FEATURES].reset_index(drop=True)
+
+
+def compute_importance(n_repeats=5, sample=None, n_jobs=None, seed=0, path=TRAINING_PATH):
+    """Permutation importance of every feature for both models, as two DataFrames.
+
+    ``sample`` stratifies the training rows down to that many (by ``source``);
+    ``n_jobs`` runs features in parallel, each with its ``n_repeats`` permutations.
+    """
+    from sklearn.inspection import permutation_importance
+
+    features, sources = training_data(path)
+    rows = stratified_sample(sources, sample, seed)
+    X = preprocess(None, features[rows])
+    sources = sources[rows]
+    # Transformed columns are named "<step>__<feature>" and ordered by step
+    names = [name.split("__", 1)[-1] for name in load_scaler_function().get_feature_names_out()]
+
+    malicious = sources != BENIGN_SOURCE
+    with warnings.catch_warnings():
+        # The forests were fitted on DataFrames; scoring ndarrays only triggers a name warning
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        forest = permutation_importance(
+            load_isolation_forest(), X, malicious.astype(int),
+            scoring=isolation_forest_scorer, n_repeats=n_repeats, n_jobs=n_jobs, random_state=seed)
+        classifier = permutation_importance(
+            load_classifier(), X[malicious], (sources[malicious] == JAMMING_SOURCE).astype(int),
+            n_repeats=n_repeats, n_jobs=n_jobs, random_state=seed)
+
+    return {"if": _importance_frame(forest, names), "rf": _importance_frame(classifier, names)}
+
+
+def cache_key(n_repeats, sample, seed, path=TRAINING_PATH):
+    parts = [model_version(name) for name in ("preprocessor", "isolation_forest", "random_forest_model")]
+    parts += [content_hash(path), f"{n_repeats}:{sample}:{seed}"]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def _read_cache():
+    try:
+        with open(CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def refresh_importance(n_repeats=5, sample=None, n_jobs=None, seed=0, force=False):
+    """Bring the Feature Importance CSVs up to date; returns ``(frames, from_cache)``.
+
+    Nothing is recomputed when the models, training data and parameters match the
+    cached run, unless ``force`` is set; the CSVs are rewritten either way.
+    """
+    key = cache_key(n_repeats, sample, seed)
+    stored = _read_cache()
+    if not force and key in stored:
+        frames = {model: pd.DataFrame(**split) for model, split in stored[key].items()}
+        from_cache = True
+    else:
+        frames = compute_importance(n_repeats, sample, n_jobs, seed)
+        stored[key] = {model: frame.to_dict(orient="split") for model, frame in frames.items()}
+        with open(CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(stored, f)
+        from_cache = False
+
+    # Zero-filled columns carry no signal to permute; don't report them as unimportant
+    missing = missing_features()
+    for frame in frames.values():
+        frame.loc[frame["Feature"].isin(missing), ["Importance", "Std"]] = np.nan
+
+    frames["if"].to_csv(IMPORTANCE_IF_PATH, index=False)
+    frames["rf"].to_csv(IMPORTANCE_RF_PATH, index=False)
+    return frames, from_cache
+
+
+class ImportanceJob(threading.Thread):
+    """Runs ``refresh_importance`` in the background; see ``start_job``."""
+
+    def __init__(self, **params):
+        super().__init__(daemon=True)
+        self.params = params
+        self.started_at = time.time()
+        self.finished_at = None
+        self.from_cache = None
+        self.error = None
+
+    def run(self):
+        try:
+            _, self.from_cache = refresh_importance(**self.params)
+        except Exception as exc:  # surfaced to the UI through .error
+            self.error = exc
+        self.finished_at = time.time()
+
+
+def start_job(**params):
+    """Start a background refresh unless one is already running; returns the job."""
+    global _job
+    with _job_lock:
+        if _job is None or not _job.is_alive():
+            _job = ImportanceJob(**params)
+            _job.start()
+        return _job
+
+
+def current_job():
+    """The most recent background refresh in this process, or None."""
+    return _job
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute permutation feature importance for both models.")
+    parser.add_argument("--repeats", type=int, default=5, help="permutations per feature")
+    parser.add_argument("--sample", type=int, help="stratified subsample of training rows (default: all)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel jobs over features (-1: all CPUs)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true", help="recompute even when the cache is current")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    frames, from_cache = refresh_importance(args.repeats, args.sample, args.n_jobs, args.seed, args.force)
+    print(f"{'Loaded from cache' if from_cache else 'Computed'} in {time.perf_counter() - start:.1f} s; "
+          f"wrote {IMPORTANCE_IF_PATH} and {IMPORTANCE_RF_PATH}")
+    for model, frame in frames.items():
+        top = frame.nlargest(5, "Importance")
+        print(f"{model.upper()} top features: " + ", ".join(
+            f"{row.Feature} {row.Importance:.3f}" for row in top.itertuples()))
+
+
+if __name__ == "__main__":
+    main()
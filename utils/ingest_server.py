@@ -0,0 +1,383 @@
+"""Live telemetry ingestion over TCP and UDP.
+
+Aircraft (or ``utils.replay_client``) push one record per line, either as JSON
+objects with the 34 ``features`` keys or as CSV rows. A TCP connection may start
+with a CSV header; otherwise the values must be in ``features`` order. Either format
+may carry a ``seq`` id (JSON key, or a 35th CSV field) that is echoed back with the
+record's verdict.
+
+Records go through a bounded queue into a micro-batcher that cuts a batch when it
+reaches ``batch_size`` records or when its oldest record has waited ``max_delay``
+seconds. Each batch is scored by ``detect_batch`` with a running threshold, on a
+worker thread so the event loop keeps accepting input. When the queue is full,
+new records are shed straight away and the sender is told so; nothing queues
+without bound.
+
+Verdicts are sent back to the sender as JSON lines, appended to a CSV log sink
+(the dashboard's ``detection_logs.csv`` format), and published to subscribers
+such as the Threat Analysis page (``subscribe()``).
+
+Usage:
+    python -m utils.ingest_server --tcp-port 8765 --udp-port 8766 --log live_detection_logs.csv
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from utils import metrics
+from utils.detection import detect_batch
+from utils.features import FEATURES
+from utils.quantile import P2Quantile
+
+DEFAULT_TCP_PORT = int(os.environ.get("UAV_INGEST_TCP_PORT", 8765))
+DEFAULT_UDP_PORT = int(os.environ.get("UAV_INGEST_UDP_PORT", 8766))
+
+# Replies are skipped for a TCP client that stops reading once this much is buffered
+MAX_REPLY_BUFFER = 1 << 20
+
+_server = None
+_server_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+
+
+def parse_record(line, columns=None):
+    """``(seq, values)`` from one NDJSON or CSV line; raises ``ValueError`` if malformed.
+
+    ``columns`` are the CSV header names, when the sender sent one.
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        record = json.loads(line)
+        return record.get("seq"), _feature_values(record)
+
+    fields = line.split(",")
+    if columns is not None:
+        record = dict(zip(columns, fields))
+        return record.get("seq"), _feature_values(record)
+    if len(fields) not in (len(FEATURES), len(FEATURES) + 1):
+        raise ValueError(f"expected {len(FEATURES)} values, got {len(fields)}")
+    seq = fields[len(FEATURES)] if len(fields) > len(FEATURES) else None
+    return seq, [_number(name, value) for name, value in zip(FEATURES, fields)]
+
+
+def _feature_values(record):
+    """``FEATURES`` values of a parsed record as floats; raises ``ValueError`` if one is missing or not a number."""
+    values = []
+    for name in FEATURES:
+        if name not in record:
+            raise ValueError(f"missing feature {name!r}")
+        values.append(_number(name, record[name]))
+    return values
+
+
+def _number(name, value):
+    """``value`` as a finite float; NaN and infinities (``nan``, ``inf``, ``1e400``) are rejected too."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"feature {name!r} is not a number: {value!r}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"feature {name!r} is not finite: {value!r}")
+    return number
+
+
+def _is_header(line):
+    return not line.lstrip().startswith("{") and "timestamp" in line.split(",")
+
+
+class VerdictFeed:
+    """A subscriber's bounded buffer of verdicts; the oldest are dropped when it's full.
+
+    ``drain()`` returns items in the same format as ``DetectionWorker.drain()``, so the
+    Threat Analysis page can consume it like a stream.
+    """
+
+    def __init__(self, server, maxsize=10_000):
+        self.server = server
+        self.items = deque(maxlen=maxsize)
+        self.dropped = 0
+        self.error = None
+
+    def publish(self, items):
+        overflow = len(self.items) + len(items) - self.items.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.items.extend(items)
+
+    def drain(self, max_items=None):
+        items = []
+        while self.items and (max_items is None or len(items) < max_items):
+            items.append(self.items.popleft())
+        return items, False
+
+    def stop(self):
+        self.server.unsubscribe(self)
+
+    @property
+    def stopped(self):
+        return self not in self.server.feeds
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        reply = lambda payload: self.transport.sendto(payload, addr)  # noqa: E731
+        for line in data.decode("utf-8", "replace").splitlines():
+            if line.strip():
+                self.server.submit(line, reply)
+
+
+class IngestServer:
+    """Asyncio TCP/UDP ingestion with micro-batching, load shedding and verdict fan-out."""
+
+    def __init__(self, host="127.0.0.1", tcp_port=DEFAULT_TCP_PORT, udp_port=DEFAULT_UDP_PORT,
+                 batch_size=64, max_delay=0.02, queue_size=10_000, contamination_threshold=0.20,
+                 log_path=None):
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue_size = queue_size
+        self.contamination_threshold = contamination_threshold
+        self.log_path = log_path
+        self.sketch = P2Quantile(contamination_threshold)
+        self.feeds = []
+        self.stats = {"received": 0, "shed": 0, "invalid": 0, "failed": 0, "scored": 0, "batches": 0, "replies_skipped": 0}
+        self._feeds_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-detect")
+        self._queue = None
+        self._loop = None
+        self._ready = threading.Event()
+
+    # --- input -------------------------------------------------------------------
+
+    def submit(self, line, reply):
+        """Parse one record and queue it, or shed it if the queue is full."""
+        self.stats["received"] += 1
+        try:
+            seq, values = parse_record(line)
+        except ValueError as exc:
+            self.stats["invalid"] += 1
+            reply(_encode({"error": str(exc)}))
+            return
+        self._enqueue(seq, values, reply)
+
+    def _enqueue(self, seq, values, reply):
+        try:
+            self._queue.put_nowait((seq, values, reply))
+        except asyncio.QueueFull:
+            self.stats["shed"] += 1
+            reply(_encode({"seq": seq, "shed": True}))
+        metrics.set_gauge("ingest_queue_depth", self._queue.qsize())
+
+    async def _handle_tcp(self, reader, writer):
+        columns = None
+
+        def reply(payload):
+            if writer.transport.get_write_buffer_size() > MAX_REPLY_BUFFER:
+                self.stats["replies_skipped"] += 1
+            else:
+                writer.write(payload)
+
+        try:
+            while line := await reader.readline():
+                line = line.decode("utf-8", "replace")
+                if not line.strip():
+                    continue
+                if columns is None and _is_header(line):
+                    columns = [name.strip() for name in line.split(",")]
+                    continue
+                self.stats["received"] += 1
+                try:
+                    seq, values = parse_record(line, columns)
+                except ValueError as exc:
+                    self.stats["invalid"] += 1
+                    reply(_encode({"error": str(exc)}))
+                    continue
+                self._enqueue(seq, values, reply)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # --- batching and scoring ------------------------------------------------------
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            matrix = np.array([values for _, values, _ in batch], dtype=np.float64)
+            try:
+                results = await loop.run_in_executor(self._executor, self._detect, matrix)
+                items = self._verdicts(batch, matrix, results)
+            except Exception as exc:
+                # One bad batch must not stop scoring: report it and carry on with the next
+                _log.exception("Scoring a batch of %d records failed", len(batch))
+                self.stats["failed"] += len(batch)
+                for seq, _, reply in batch:
+                    reply(_encode({"seq": seq, "error": f"scoring failed: {exc}"}))
+                continue
+            try:
+                self._publish(batch, items)
+            except Exception:
+                # Replies may be partly sent by now, so the records are not answered again
+                _log.exception("Delivering the verdicts of a batch of %d records failed", len(batch))
+
+    def _detect(self, matrix):
+        with metrics.stage("ingest_batch"):
+            return detect_batch(pd.DataFrame(matrix, columns=FEATURES), self.contamination_threshold,
+                                sketch=self.sketch, features=matrix)
+
+    def _verdicts(self, batch, matrix, results):
+        """Per-record verdict items of a scored batch, before anything is sent."""
+        first_index = self.stats["scored"]
+        items = []
+        for offset, (row, signal_type, malicious, score) in enumerate(zip(
+                matrix, results["Signal Type"], results["Malicious"], results["Anomaly Score"])):
+            record = dict(zip(FEATURES, row.tolist()))
+            record["timestamp"] = int(record["timestamp"])
+            items.append({"index": first_index + offset, "row": record, "signal_type": signal_type,
+                          "malicious": int(malicious), "score": float(score)})
+        return items
+
+    def _publish(self, batch, items):
+        self.stats["scored"] += len(batch)
+        self.stats["batches"] += 1
+        for (seq, _, reply), item in zip(batch, items):
+            reply(_encode({"seq": seq, "signal_type": item["signal_type"], "malicious": item["malicious"],
+                           "score": item["score"]}))
+
+        if self.log_path:
+            new_file = not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0
+            with open(self.log_path, "a", newline="", encoding="utf-8") as log:
+                writer = csv.writer(log, lineterminator="\n")
+                if new_file:
+                    writer.writerow(["Time", "Signal Type"])
+                writer.writerows((item["row"]["timestamp"], item["signal_type"]) for item in items)
+
+        with self._feeds_lock:
+            feeds = list(self.feeds)
+        for feed in feeds:
+            feed.publish(items)
+
+    # --- subscribers ---------------------------------------------------------------
+
+    def subscribe(self, maxsize=10_000):
+        """Start receiving verdicts; returns a ``VerdictFeed``."""
+        feed = VerdictFeed(self, maxsize)
+        with self._feeds_lock:
+            self.feeds.append(feed)
+        return feed
+
+    def unsubscribe(self, feed):
+        with self._feeds_lock:
+            if feed in self.feeds:
+                self.feeds.remove(feed)
+
+    # --- lifecycle -----------------------------------------------------------------
+
+    async def serve(self, stats_interval=None):
+        """Listen on the TCP and UDP ports until cancelled."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        tcp = await asyncio.start_server(self._handle_tcp, self.host, self.tcp_port)
+        udp, _ = await self._loop.create_datagram_endpoint(
+            lambda: _UDPProtocol(self), local_addr=(self.host, self.udp_port))
+        batcher = asyncio.create_task(self._batcher())
+        self._ready.set()
+        try:
+            async with tcp:
+                while True:
+                    await asyncio.sleep(stats_interval or 3600)
+                    if stats_interval:
+                        print(self.describe(), flush=True)
+        finally:
+            batcher.cancel()
+            udp.close()
+            self._executor.shutdown(wait=False)
+
+    def describe(self):
+        return ", ".join(f"{key} {value}" for key, value in self.stats.items()) + \
+            f", queued {self._queue.qsize() if self._queue else 0}"
+
+
+def _encode(message):
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+def get_server(**params):
+    """Process-wide ingestion server on a background thread, started on first call."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            server = IngestServer(**params)
+            thread = threading.Thread(target=asyncio.run, args=(server.serve(),), daemon=True,
+                                      name="ingest-server")
+            thread.start()
+            if not server._ready.wait(5):
+                raise RuntimeError(f"ingestion server did not start on ports {server.tcp_port}/{server.udp_port}")
+            _server = server
+        return _server
+
+
+def main(argv=None):
+    import warnings
+
+    from utils.load_model import load_classifier, load_isolation_forest, load_scaler_function
+
+    parser = argparse.ArgumentParser(description="Ingest live UAV telemetry over TCP/UDP and score it.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--tcp-port", type=int, default=DEFAULT_TCP_PORT)
+    parser.add_argument("--udp-port", type=int, default=DEFAULT_UDP_PORT)
+    parser.add_argument("--batch-size", type=int, default=64, help="records per micro-batch")
+    parser.add_argument("--max-delay-ms", type=float, default=20, help="longest a record waits for its batch")
+    parser.add_argument("--queue-size", type=int, default=10_000, help="records queued before shedding")
+    parser.add_argument("--contamination", type=float, default=0.20)
+    parser.add_argument("--log", help="append verdicts to this CSV")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="seconds between stats lines")
+    args = parser.parse_args(argv)
+
+    # Batches above 512 rows go to the scikit-learn forests, which warn about ndarray input
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    load_scaler_function(), load_isolation_forest(), load_classifier()
+
+    server = IngestServer(args.host, args.tcp_port, args.udp_port, args.batch_size, args.max_delay_ms / 1000,
+                          args.queue_size, args.contamination, args.log)
+    print(f"Listening on tcp://{args.host}:{args.tcp_port} and udp://{args.host}:{args.udp_port}", flush=True)
+    try:
+        asyncio.run(server.serve(args.stats_interval))
+    except KeyboardInterrupt:
+        print(server.describe())
+
+
+if __name__ == "__main__":
+    main()
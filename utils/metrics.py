@@ -0,0 +1,201 @@
+"""Lightweight in-process metrics: per-stage latency histograms, counters and gauges.
+
+Instrumentation is off unless ``UAV_METRICS=1`` is set or ``set_enabled(True)`` is
+called (the dashboard's Diagnostics toggle). While off, ``stage()`` returns a shared
+no-op context manager and the other recorders return after a single flag check, so
+the hot path pays a function call and nothing else.
+
+Metrics are process-wide, like the model registry: every session and the detection
+worker threads record into the same histograms. They can be rendered in Prometheus
+text format, written to a file for node_exporter's textfile collector
+(``UAV_METRICS_FILE``) or served over HTTP (``UAV_METRICS_PORT``).
+"""
+import bisect
+import contextlib
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency buckets, as in Prometheus client defaults
+# extended down to 100 us for the per-batch model calls
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+           2.5, 5.0, 10.0, float("inf"))
+
+_enabled = os.environ.get("UAV_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_server = None
+_NOOP = contextlib.nullcontext()
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(on):
+    """Turn recording on or off for the whole process."""
+    global _enabled
+    _enabled = bool(on)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate the ``q``-quantile by interpolating inside its bucket."""
+        if not self.count:
+            return float("nan")
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if BUCKETS[i] != float("inf") else lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-2]
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def stage(name):
+    """Context manager timing one execution of the stage ``name``."""
+    if not _enabled:
+        return _NOOP
+    return _Timer(name)
+
+
+def observe(name, seconds):
+    """Record one latency sample for the stage ``name``."""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = _Histogram()
+        histogram.observe(seconds)
+
+
+def count(name, n=1):
+    """Add ``n`` to the counter ``name``."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def set_gauge(name, value):
+    """Set the gauge ``name`` to its current ``value``."""
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[name] = value
+
+
+def reset():
+    """Forget everything recorded so far."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def snapshot():
+    """Per-stage latency summary plus counters and gauges, for display."""
+    with _lock:
+        stages = [{
+            "Stage": name,
+            "Calls": h.count,
+            "Mean (ms)": round(h.sum / h.count * 1000, 3),
+            "p50 (ms)": round(h.quantile(0.5) * 1000, 3),
+            "p95 (ms)": round(h.quantile(0.95) * 1000, 3),
+            "p99 (ms)": round(h.quantile(0.99) * 1000, 3),
+        } for name, h in sorted(_histograms.items())]
+        return {"stages": stages, "counters": dict(_counters), "gauges": dict(_gauges)}
+
+
+def flagged_rate():
+    """Share of scored rows flagged as malicious so far, or None before any row."""
+    with _lock:
+        rows = _counters.get("rows_processed", 0)
+        return _counters.get("rows_flagged", 0) / rows if rows else None
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP uav_stage_seconds Latency of each dashboard and pipeline stage.",
+        "# TYPE uav_stage_seconds histogram",
+    ]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'uav_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'uav_stage_seconds_sum{{stage="{name}"}} {h.sum!r}')
+            lines.append(f'uav_stage_seconds_count{{stage="{name}"}} {h.count}')
+        for name, value in sorted(_counters.items()):
+            lines += [f"# TYPE uav_{name}_total counter", f"uav_{name}_total {value}"]
+        for name, value in sorted(_gauges.items()):
+            lines += [f"# TYPE uav_{name} gauge", f"uav_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Atomically write the Prometheus text export to ``path``; returns ``path``."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve the Prometheus export at ``http://host:port/`` from a daemon thread (once per process)."""
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import warnings
+
+import joblib
+from utils import metrics
+
+MODELS_DIR = "models"
+# Compact variants written by ``python -m utils.compact``, one directory per profile
+PROFILES_DIR = os.path.join(MODELS_DIR, "profiles")
+DEFAULT_PROFILE = "full"
+
+_entries = {}
+_lock = threading.Lock()
+_profile = os.environ.get("UAV_MODEL_PROFILE") or DEFAULT_PROFILE
+
+
+def file_hash(path):
+    """Return the SHA-256 hex digest of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _pickled_size(model):
+    """Bytes of the model pickled in memory: its serialized size, not its resident memory."""
+    try:
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return None
+
+
+def _load(path):
+    """Load a joblib artifact, memory-mapping its arrays when the file allows it."""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            model = joblib.load(path, mmap_mode="r")
+            mmapped = not any("mmap_mode" in str(w.message) for w in caught)
+        except (ValueError, OSError):
+            model = joblib.load(path)
+            mmapped = False
+    for w in caught:
+        if "mmap_mode" not in str(w.message):
+            warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+    return model, mmapped
+
+
+def available_profiles():
+    """The shipped models' profile followed by every compact profile on disk."""
+    try:
+        names = sorted(entry.name for entry in os.scandir(PROFILES_DIR) if entry.is_dir())
+    except OSError:
+        names = []
+    return [DEFAULT_PROFILE] + [name for name in names if name != DEFAULT_PROFILE]
+
+
+def active_profile():
+    """Model profile this process loads from (``UAV_MODEL_PROFILE`` by default)."""
+    if _profile != DEFAULT_PROFILE and not os.path.isdir(os.path.join(PROFILES_DIR, _profile)):
+        return DEFAULT_PROFILE
+    return _profile
+
+
+def set_profile(name):
+    """Switch every later ``get_model`` call in this process to profile ``name``."""
+    global _profile
+    if name not in available_profiles():
+        raise ValueError(f"unknown model profile {name!r}; available: {', '.join(available_profiles())}")
+    _profile = name
+
+
+def profile_info(name=None):
+    """The ``profile.json`` summary of profile ``name`` (default: the active one), if it has one."""
+    name = name or active_profile()
+    try:
+        with open(os.path.join(PROFILES_DIR, name, "profile.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def model_path(name, extension=".pkl"):
+    """Path of artifact ``name`` in the active profile, falling back to the shipped one."""
+    profile = active_profile()
+    if profile != DEFAULT_PROFILE:
+        path = os.path.join(PROFILES_DIR, profile, f"{name}{extension}")
+        if os.path.exists(path):
+            return path
+    return os.path.join(MODELS_DIR, f"{name}{extension}")
+
+
+def get_model(name, check_hash=False):
+    """Return the process-wide shared instance of ``models/<name>.pkl``.
+
+    The artifact is loaded once per process and reused by every session, from the
+    active model profile's directory when it has a variant of ``name``.
+    It is reloaded when the file's path, mtime or size changes and its content hash
+    differs from the loaded copy; ``check_hash=True`` forces the hash check.
+    Returned models must be treated as read-only.
+    """
+    path = model_path(name)
+    stat = os.stat(path)
+    signature = (path, stat.st_mtime_ns, stat.st_size)
+
+    entry = _entries.get(name)
+    if entry is not None and entry["signature"] == signature and not check_hash:
+        return entry["model"]
+
+    with _lock:
+        entry = _entries.get(name)
+        if entry is not None and entry["signature"] == signature and not check_hash:
+            return entry["model"]
+
+        digest = file_hash(path)
+        if entry is not None and entry["sha256"] == digest:
+            entry["signature"] = signature
+            return entry["model"]
+
+        start = time.perf_counter()
+        model, mmapped = _load(path)
+        load_seconds = time.perf_counter() - start
+        metrics.observe("model_load", load_seconds)
+
+        _entries[name] = {
+            "model": model,
+            "path": path,
+            "signature": signature,
+            "sha256": digest,
+            "mmapped": mmapped,
+            "load_seconds": load_seconds,
+            "pickled_bytes": _pickled_size(model),
+            "file_bytes": stat.st_size,
+            "loads": (entry["loads"] + 1) if entry is not None else 1,
+        }
+        return model
+
+
+def model_version(name):
+    """Return the content hash of the currently loaded ``name`` artifact."""
+    get_model(name)
+    return _entries[name]["sha256"]
+
+
+def model_stats():
+    """Return load time, size and provenance for every loaded model."""
+    return [
+        {
+            "Model": name,
+            "Load Time (ms)": round(entry["load_seconds"] * 1000, 2),
+            "Pickled Size (KB)": round(entry["pickled_bytes"] / 1024, 1) if entry["pickled_bytes"] else None,
+            "File Size (KB)": round(entry["file_bytes"] / 1024, 1),
+            "Memory Mapped": entry["mmapped"],
+            "Loads": entry["loads"],
+            "SHA-256": entry["sha256"][:12],
+        }
+        for name, entry in sorted(_entries.items())
+    ]
+
+
+def clear():
+    """Drop every cached model so the next access reloads from disk."""
+    with _lock:
+        _entries.clear()
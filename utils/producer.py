@@ -0,0 +1,113 @@
+import copy
+import queue
+import threading
+import time
+
+from utils import metrics
+from utils.detection import detect_batch
+
+# The original page slept 0.4 s per row; "1x" replay keeps that pace
+REAL_TIME_ROWS_PER_SECOND = 2.5
+
+
+class DetectionWorker(threading.Thread):
+    """Scores a telemetry stream on a background thread and queues per-row verdicts.
+
+    ``batches`` is a stream source from ``utils.stream`` (``dataset_batches`` or
+    ``csv_batches``) yielding ``(start, batch, features)``; each batch is scored with
+    ``detect_batch`` and its rows are put on a bounded queue one by one. When the
+    queue is full the worker blocks, so it never runs further ahead of the UI than
+    ``maxsize`` rows (and never parses further ahead of it than one chunk).
+    ``rows_per_second`` paces the replay; ``None`` replays as fast as the consumer
+    drains. ``scores`` (a ``utils.score_cache.FlightScores`` for the streamed
+    dataset) replaces the models with lookups of its cached outputs. ``stop()`` takes
+    effect within a row, including while the worker is waiting on the pace or the
+    queue.
+
+    Batches are scored against a private copy of ``sketch``; the shared sketch is fed
+    a row's score only once the row is on the queue. After ``stop()`` and ``join()``
+    it has seen exactly the rows that were queued, so a replacement worker can carry
+    on from the next unqueued row with the same sketch.
+
+    Each queued item is a dict with the stream position (``index``), the raw row
+    (``row``) and its verdict (``signal_type``, ``malicious``, ``score``), plus
+    ``early_exit`` when scoring with ``cascade=True``. A final ``None`` marks the end
+    of the stream.
+    """
+
+    def __init__(self, batches, contamination_threshold, sketch, batch_size=12, rows_per_second=None,
+                 maxsize=1024, cascade=False, scores=None):
+        super().__init__(daemon=True)
+        self.batches = batches
+        self.contamination_threshold = contamination_threshold
+        self.sketch = sketch
+        self.batch_size = batch_size
+        self.rows_per_second = rows_per_second
+        self.cascade = cascade
+        self.scores = scores
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def _put(self, item):
+        """Block until there is room on the queue; return False if stopped meanwhile."""
+        while not self.stopped:
+            try:
+                self.queue.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        next_due = time.monotonic() - 1.0 / self.rows_per_second if self.rows_per_second else 0.0
+        # Runs ahead of self.sketch by at most the batch being queued
+        sketch = copy.deepcopy(self.sketch)
+        try:
+            for start, batch, features in self.batches:
+                scored = self.scores.batch(start, start + len(batch)) if self.scores is not None else None
+                results = detect_batch(batch, self.contamination_threshold, sketch=sketch,
+                                       features=features, cascade=self.cascade, scored=scored)
+                early_exit = results["Early Exit"].tolist() if self.cascade else None
+
+                for offset, (row, signal_type, malicious, score) in enumerate(zip(
+                        batch.to_dict("records"), results["Signal Type"], results["Malicious"],
+                        results["Anomaly Score"])):
+                    if self.rows_per_second:
+                        # Don't burst to catch up after the queue held us back
+                        next_due = max(next_due + 1.0 / self.rows_per_second, time.monotonic())
+                        if self._stop_event.wait(max(0.0, next_due - time.monotonic())):
+                            return
+                    item = {"index": start + offset, "row": row, "signal_type": signal_type,
+                            "malicious": int(malicious), "score": float(score)}
+                    if early_exit is not None:
+                        item["early_exit"] = early_exit[offset]
+                    if not self._put(item):
+                        return
+                    self.sketch.update(score)
+        except Exception as exc:  # surfaced to the UI thread through .error
+            self.error = exc
+        self._put(None)
+
+    def drain(self, max_items=None):
+        """Take every queued item without blocking; returns ``(items, finished)``."""
+        items = []
+        finished = False
+        while max_items is None or len(items) < max_items:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+                break
+            items.append(item)
+        metrics.set_gauge("queue_depth", self.queue.qsize())
+        return items, finished
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class P2Quantile:
+    """Streaming estimate of the ``p``-quantile using the P² algorithm (Jain & Chlamtac, 1985).
+
+    Keeps five markers regardless of how many values have been seen, so memory is
+    fixed and each update is O(1). Until five values have arrived the exact
+    percentile of what has been seen is returned.
+    """
+
+    def __init__(self, p):
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"p must be between 0 and 1, got {p}")
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x):
+        """Add one observation and return the updated quantile estimate."""
+        x = float(x)
+        self.count += 1
+        q = self.heights
+
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return self.value
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+        return self.value
+
+    def update_many(self, values):
+        """Feed values in order; return the estimate after each one as an array."""
+        return np.fromiter((self.update(x) for x in values), dtype=float, count=len(values))
+
+    @property
+    def value(self):
+        """Current quantile estimate, or NaN before any observation."""
+        if self.count == 0:
+            return float("nan")
+        if self.count <= 5:
+            return float(np.percentile(self.heights, self.p * 100))
+        # The outer markers track the exact running minimum and maximum
+        if self.p == 0.0:
+            return self.heights[0]
+        if self.p == 1.0:
+            return self.heights[4]
+        return self.heights[2]
@@ -0,0 +1,78 @@
+import plotly.graph_objs as go
+
+
+class RenderScheduler:
+    """Frame rate of the live panel, and a count of the frames it drew.
+
+    The panel is rerun on a timer every ``interval`` (``1 / fps``) seconds and draws
+    one frame per run. ``frame(count)`` records a frame that brought ``count`` new
+    updates; only the latest of them is shown, so the others count as dropped.
+    """
+
+    def __init__(self, fps=5.0):
+        self.fps = fps
+        self.rendered = 0
+        self.dropped = 0
+
+    @property
+    def fps(self):
+        return self._fps
+
+    @fps.setter
+    def fps(self, fps):
+        if fps <= 0:
+            raise ValueError(f"fps must be positive, got {fps}")
+        self._fps = fps
+        self.interval = 1.0 / fps
+
+    def frame(self, count=1):
+        """Record one drawn frame that folded in ``count`` updates."""
+        self.rendered += 1
+        self.dropped += max(count - 1, 0)
+
+    def stats(self):
+        return {"rendered": self.rendered, "dropped": self.dropped}
+
+
+class LiveChart:
+    """A Plotly figure built once whose trace data is replaced in place on each frame."""
+
+    def __init__(self, traces, title, template, xaxis_title="Timestamp", yaxis_title="Value"):
+        self.figure = go.Figure([
+            go.Scatter(x=[], y=[], name=name, line=dict(color=color)) for name, color in traces
+        ])
+        self.figure.update_layout(title=title, template=template,
+                                  xaxis_title=xaxis_title, yaxis_title=yaxis_title)
+
+    def update(self, x, *series):
+        """Replace the x values shared by every trace and each trace's y values."""
+        x = list(x)
+        with self.figure.batch_update():
+            for trace, y in zip(self.figure.data, series):
+                trace.x = x
+                trace.y = list(y)
+        return self.figure
+
+
+def history_figure(history, start, stop, traces, markers, title, template):
+    """Figure of rows ``start:stop`` of a ``FlightHistory``, downsampled, with verdict markers.
+
+    ``traces`` are ``(series, name, color)`` and ``markers`` ``{attack type: color}``;
+    markers sit on the first trace.
+    """
+    window, attacks, detail = history.window(start, stop)
+    figure = go.Figure()
+    for series, name, color in traces:
+        rows, values = window[series]
+        figure.add_trace(go.Scattergl(x=rows, y=values, name=name, mode="lines", line=dict(color=color),
+                                      customdata=history.timestamps(rows),
+                                      hovertemplate="row %{x}<br>timestamp %{customdata}<br>%{y}"))
+    series = traces[0][0]
+    for attack, color in markers.items():
+        rows = attacks[attack]
+        figure.add_trace(go.Scattergl(x=rows, y=history.values(series, rows), name=attack, mode="markers",
+                                      marker=dict(color=color, symbol="triangle-up", size=8),
+                                      customdata=history.timestamps(rows),
+                                      hovertemplate=attack + "<br>row %{x}<br>timestamp %{customdata}"))
+    figure.update_layout(title=title, template=template, xaxis_title="Row", yaxis_title="Value")
+    return figure, detail
@@ -0,0 +1,185 @@
+"""Replay a recorded flight into the ingestion server and measure throughput and latency.
+
+Every record carries a ``seq`` id; the server echoes it with the verdict, so each
+record's latency is measured from just before it was sent to when its verdict
+arrived. Records the server sheds are counted separately, as are records with no
+reply by the end of the run.
+
+Usage:
+    python -m utils.replay_client --rate 2000 --seconds 10
+    python -m utils.replay_client --protocol udp --format csv --rate 0
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+from utils.features import FEATURES
+from utils.ingest_server import DEFAULT_TCP_PORT, DEFAULT_UDP_PORT
+
+_TIMESTAMP = FEATURES.index("timestamp")
+
+
+def encode_records(features, fmt="ndjson"):
+    """One newline-terminated record per row, with its row number as ``seq``."""
+    lines = []
+    for seq, row in enumerate(np.asarray(features).tolist()):
+        row[_TIMESTAMP] = int(row[_TIMESTAMP])
+        if fmt == "ndjson":
+            record = dict(zip(FEATURES, row))
+            record["seq"] = seq
+            lines.append((json.dumps(record) + "\n").encode("utf-8"))
+        else:
+            lines.append((",".join(map(repr, row)) + f",{seq}\n").encode("utf-8"))
+    return lines
+
+
+class _Tally:
+    def __init__(self, count):
+        self.sent_at = np.full(count, np.nan)
+        self.latency = np.full(count, np.nan)
+        self.shed = 0
+        self.replies = 0
+        self.done = asyncio.Event()
+        self.expected = count
+
+    def receive(self, line):
+        message = json.loads(line)
+        seq = message.get("seq")
+        if seq is None:
+            return
+        seq = int(seq)
+        if message.get("shed"):
+            self.shed += 1
+        else:
+            self.latency[seq] = time.perf_counter() - self.sent_at[seq]
+        self.replies += 1
+        if self.replies >= self.expected:
+            self.done.set()
+
+
+async def _paced(lines, rate, send, tally, burst=64):
+    """Send ``lines`` at ``rate`` records/sec (0: as fast as possible), ``burst`` at a time."""
+    start = time.perf_counter()
+    for first in range(0, len(lines), burst):
+        if rate:
+            delay = start + first / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        for seq in range(first, min(first + burst, len(lines))):
+            tally.sent_at[seq] = time.perf_counter()
+            await send(lines[seq])
+        await asyncio.sleep(0)
+    return time.perf_counter() - start
+
+
+async def replay_tcp(lines, rate, host, port, timeout):
+    reader, writer = await asyncio.open_connection(host, port)
+    tally = _Tally(len(lines))
+
+    async def receive():
+        while line := await reader.readline():
+            tally.receive(line)
+            if tally.done.is_set():
+                return
+
+    async def send(line):
+        writer.write(line)
+        if writer.transport.get_write_buffer_size() > 1 << 16:
+            await writer.drain()
+
+    receiver = asyncio.create_task(receive())
+    start = time.perf_counter()
+    send_seconds = await _paced(lines, rate, send, tally)
+    await writer.drain()
+    try:
+        await asyncio.wait_for(tally.done.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    receiver.cancel()
+    writer.close()
+    return tally, send_seconds, elapsed
+
+
+class _ReplyProtocol(asyncio.DatagramProtocol):
+    def __init__(self, tally):
+        self.tally = tally
+
+    def datagram_received(self, data, addr):
+        for line in data.splitlines():
+            self.tally.receive(line)
+
+
+async def replay_udp(lines, rate, host, port, timeout):
+    loop = asyncio.get_running_loop()
+    tally = _Tally(len(lines))
+    transport, _ = await loop.create_datagram_endpoint(lambda: _ReplyProtocol(tally), remote_addr=(host, port))
+
+    async def send(line):
+        transport.sendto(line)
+
+    start = time.perf_counter()
+    send_seconds = await _paced(lines, rate, send, tally)
+    try:
+        await asyncio.wait_for(tally.done.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    transport.close()
+    return tally, send_seconds, elapsed
+
+
+def summarize(tally, send_seconds, elapsed):
+    """Sent/answered/shed/lost counts, sustained verdict throughput and latency percentiles."""
+    latency = tally.latency[~np.isnan(tally.latency)] * 1000
+    scored = len(latency)
+    return {
+        "sent": len(tally.sent_at),
+        "scored": scored,
+        "shed": tally.shed,
+        "lost": len(tally.sent_at) - tally.replies,
+        "offered_rate": len(tally.sent_at) / send_seconds if send_seconds else float("inf"),
+        "throughput": scored / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(latency, 50)) if scored else None,
+        "p99_ms": float(np.percentile(latency, 99)) if scored else None,
+        "max_ms": float(latency.max()) if scored else None,
+    }
+
+
+def main(argv=None):
+    from utils.dataset_cache import feature_matrix
+
+    parser = argparse.ArgumentParser(description="Replay a flight log into the ingestion server.")
+    parser.add_argument("source", nargs="?", default=os.path.join("datasets", "data_stream.csv"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="server port (default: the protocol's default port)")
+    parser.add_argument("--protocol", choices=["tcp", "udp"], default="tcp")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--rate", type=float, default=1000, help="records per second (0: as fast as possible)")
+    parser.add_argument("--rows", type=int, help="records to send (default: the whole file, repeated to fill --seconds)")
+    parser.add_argument("--seconds", type=float, help="at --rate, send this long (repeats the file as needed)")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds to wait for outstanding verdicts")
+    args = parser.parse_args(argv)
+
+    features = np.asarray(feature_matrix(args.source))
+    rows = args.rows or (int(args.rate * args.seconds) if args.rate and args.seconds else len(features))
+    lines = encode_records(np.resize(features, (rows, features.shape[1])), args.format)
+
+    if args.protocol == "tcp":
+        replay, port = replay_tcp, args.port or DEFAULT_TCP_PORT
+    else:
+        replay, port = replay_udp, args.port or DEFAULT_UDP_PORT
+    report = summarize(*asyncio.run(replay(lines, args.rate, args.host, port, args.timeout)))
+
+    print(f"sent {report['sent']} ({report['offered_rate']:,.0f}/s offered), scored {report['scored']}, "
+          f"shed {report['shed']}, lost {report['lost']}")
+    print(f"sustained throughput {report['throughput']:,.0f} verdicts/s")
+    if report["scored"]:
+        print(f"latency p50 {report['p50_ms']:.1f} ms, p99 {report['p99_ms']:.1f} ms, max {report['max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Measure server CPU and bytes sent per live-stream tick on the Threat Analysis page.
+
+Starts ``streamlit run app.py`` headless and drives it over its websocket the
+way a browser does. The client opens Threat Analysis, sets the replay speed and
+presses Start, then keeps the stream running for ``--seconds``. It fires fragment
+timers (``run_every``) as the frontend would. Every script run, full or fragment
+only, counts as one tick. CPU is the server process's user and system time from
+``/proc`` (Linux only), including the detection worker thread.
+
+Usage:
+    python -m utils.rerun_bench --seconds 20 --speed 10x
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+_ARGS = ["--server.headless", "true", "--server.enableXsrfProtection", "false",
+         "--server.enableCORS", "false", "--browser.gatherUsageStats", "false"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime, fields 14 and 15 of the whole line
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class _Session:
+    """Minimal Streamlit frontend: widget state, script runs and fragment timers."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.widgets = {}
+        self.elements = {}
+        self.timers = {}
+        self.running = False
+        self.runs = 0
+        self.bytes = 0
+
+    def _find(self, kind, label):
+        return self.elements[(kind, label)]
+
+    async def rerun(self, fragment_id="", trigger=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.fragment_id = fragment_id
+        state.is_auto_rerun = bool(fragment_id)
+        for widget_id, (field, value) in self.widgets.items():
+            widget = state.widget_states.widgets.add()
+            widget.id = widget_id
+            if field == "double_array_value":
+                widget.double_array_value.data.extend(value)
+            else:
+                setattr(widget, field, value)
+        if trigger is not None:
+            widget = state.widget_states.widgets.add()
+            widget.id = trigger
+            widget.trigger_value = True
+        self.running = True
+        await self.connection.write_message(msg.SerializeToString(), binary=True)
+
+    async def receive(self, timeout):
+        """Handle messages until the current script run finishes."""
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        deadline = time.monotonic() + timeout
+        while self.running:
+            raw = await asyncio.wait_for(self.connection.read_message(), max(deadline - time.monotonic(), 0.01))
+            if raw is None:
+                raise ConnectionError("the server closed the connection")
+            self.bytes += len(raw)
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof("type")
+            if kind == "new_session" and not msg.new_session.fragment_ids_this_run:
+                # A full run re-registers the fragment timers it still wants
+                self.timers.clear()
+            elif kind == "auto_rerun":
+                self.timers[msg.auto_rerun.fragment_id] = [msg.auto_rerun.interval, time.monotonic()]
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                widget = element.WhichOneof("type")
+                if widget in ("button", "radio", "slider"):
+                    self.elements[(widget, getattr(element, widget).label)] = getattr(element, widget)
+            elif kind == "script_finished":
+                self.running = False
+                self.runs += 1
+
+    async def tick(self, timeout):
+        """Fire the next due fragment timer, if any, and wait for its run."""
+        if not self.timers:
+            return False
+        fragment_id, (interval, last) = min(self.timers.items(), key=lambda item: sum(item[1]))
+        await asyncio.sleep(max(0.0, last + interval - time.monotonic()))
+        self.timers[fragment_id][1] = time.monotonic()
+        await self.rerun(fragment_id)
+        await self.receive(timeout)
+        return True
+
+
+async def measure(port, pid, seconds, speed, warmup=3, page="Threat Analysis", timeout=120):
+    from tornado.websocket import websocket_connect
+
+    connection = await websocket_connect(f"ws://127.0.0.1:{port}/_stcore/stream")
+    session = _Session(connection)
+    await session.rerun()
+    await session.receive(timeout)
+
+    navigation = session._find("radio", "Navigation")
+    session.widgets[navigation.id] = ("int_value", list(navigation.options).index(page))
+    await session.rerun()
+    await session.receive(timeout)
+
+    replay = session._find("slider", "Replay Speed:")
+    session.widgets[replay.id] = ("double_array_value", [list(replay.options).index(speed)])
+    await session.rerun(trigger=session._find("button", "Start").id)
+    await session.receive(timeout)
+
+    # Let the models load and the stream settle before measuring
+    await _drive(session, warmup, timeout)
+    runs, sent, cpu, start = session.runs, session.bytes, _cpu_seconds(pid), time.monotonic()
+    await _drive(session, seconds, timeout)
+    elapsed = time.monotonic() - start
+    cpu = _cpu_seconds(pid) - cpu
+    ticks = session.runs - runs
+    connection.close()
+    return {
+        "ticks": ticks,
+        "ticks_per_s": ticks / elapsed,
+        "cpu_ms_per_tick": 1000 * cpu / max(ticks, 1),
+        "kb_per_tick": (session.bytes - sent) / 1024 / max(ticks, 1),
+        "cpu_share": cpu / elapsed,
+    }
+
+
+async def _drive(session, seconds, timeout):
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        # Full reruns are requested by the server itself, fragment runs by the client's timers
+        session.running = True
+        if not await session.tick(timeout):
+            await session.receive(timeout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure server cost per live-stream tick.")
+    parser.add_argument("--seconds", type=float, default=20, help="measurement window")
+    parser.add_argument("--speed", default="1x", help="Replay Speed option to stream at")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds streamed before measuring")
+    args = parser.parse_args(argv)
+
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, "-m", "streamlit", "run", "app.py", "--server.port", str(port), *_ARGS],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(300):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        report = asyncio.run(measure(port, server.pid, args.seconds, args.speed, args.warmup))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{report['ticks']} ticks ({report['ticks_per_s']:.1f}/s) at {args.speed}: "
+          f"{report['cpu_ms_per_tick']:.1f} ms server CPU and {report['kb_per_tick']:.1f} KB sent per tick, "
+          f"{report['cpu_share']:.0%} of a core")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Per-flight cache of model outputs, so verdicts at any threshold are array lookups.
+
+The contamination threshold only moves the cut-off that anomaly scores are
+compared with. The scores themselves, and the Random Forest's attack type for
+every row, depend only on the flight and the models. They are computed once, in
+one vectorised pass, and stored in ``datasets/<name>.scores.npz`` under a key made
+of the flight's content hash and the versions of the preprocessor and both
+forests. Replaying the flight, changing the threshold or regenerating its
+detection log then costs a running-quantile pass over the cached scores. No
+model is run.
+
+Verdicts match streaming the flight through ``detect_batch``: the running
+cut-off sees the scores in the same order, and the flattened and scikit-learn
+forests give bit-identical outputs.
+
+Usage:
+    python -m utils.score_cache                               # threshold sweep for the built-in stream
+    python -m utils.score_cache datasets/data_stream.csv -o detection_logs.csv --contamination 0.1
+"""
+import argparse
+import os
+import time
+import warnings
+import zipfile
+
+import numpy as np
+import pandas as pd
+from utils.dataset_cache import feature_matrix, load_dataset, write_atomic
+from utils.detection import BENIGN, FLAT_MAX_ROWS, anomaly_scores, attack_names, preprocess
+from utils.flat_forest import get_flat_forest
+from utils.load_model import load_classifier
+from utils.model_registry import model_version
+from utils.quantile import P2Quantile
+from utils.summary import content_hash
+
+SCORED_MODELS = ("preprocessor", "isolation_forest", "random_forest_model")
+SWEEP_CONTAMINATIONS = tuple(np.round(np.arange(0.02, 0.51, 0.02), 2))
+
+_flights = {}
+
+
+class FlightScores:
+    """Isolation Forest scores and Random Forest classes for every row of one flight."""
+
+    def __init__(self, key, timestamps, scores, attack_codes):
+        self.key = key
+        self.timestamps = timestamps
+        self.scores = scores
+        self.attack_codes = attack_codes
+        self._verdicts = {}
+        self._csv = {}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def batch(self, start, stop):
+        """``(scores, attack codes)`` of rows ``start:stop``, as ``detect_batch`` takes them."""
+        return self.scores[start:stop], self.attack_codes[start:stop]
+
+    def verdicts(self, contamination_threshold):
+        """Malicious mask for the whole flight under a running cut-off, as streamed from its first row."""
+        malicious = self._verdicts.get(contamination_threshold)
+        if malicious is None:
+            thresholds = P2Quantile(contamination_threshold).update_many(self.scores)
+            malicious = self._verdicts[contamination_threshold] = self.scores < thresholds
+        return malicious
+
+    def detection_log(self, contamination_threshold):
+        """The flight's detection log at ``contamination_threshold``, in ``score_flight``'s format."""
+        malicious = self.verdicts(contamination_threshold)
+        return pd.DataFrame({
+            "Time": self.timestamps.astype(str),
+            "Signal Type": attack_names(self.attack_codes, malicious),
+        })
+
+    def detection_csv(self, contamination_threshold):
+        """``detection_log`` as CSV bytes, built once per threshold."""
+        data = self._csv.get(contamination_threshold)
+        if data is None:
+            data = self._csv[contamination_threshold] = \
+                self.detection_log(contamination_threshold).to_csv(index=False).encode("utf-8")
+        return data
+
+    def sweep(self, contaminations=SWEEP_CONTAMINATIONS):
+        """Flagged, spoofing and jamming row counts at each contamination threshold."""
+        rows = []
+        for contamination in contaminations:
+            malicious = self.verdicts(float(contamination))
+            jamming = int(np.count_nonzero(self.attack_codes[malicious]))
+            flagged = int(malicious.sum())
+            rows.append({"Contamination": float(contamination), "Flagged": flagged,
+                         "Flagged %": 100 * flagged / max(len(self), 1),
+                         "Spoofing": flagged - jamming, "Jamming": jamming})
+        return pd.DataFrame(rows)
+
+
+def _key(path):
+    return ":".join([content_hash(path)] + [model_version(name) for name in SCORED_MODELS])
+
+
+def compute_scores(path):
+    """Score every row of ``path`` once: returns ``(timestamps, scores, attack codes)``."""
+    X = preprocess(None, feature_matrix(path))
+    with warnings.catch_warnings():
+        # The forests were fitted on DataFrames; scoring ndarrays only triggers a name warning
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        scores = anomaly_scores(X)
+        classifier = get_flat_forest("random_forest_model") if len(X) <= FLAT_MAX_ROWS else load_classifier()
+        attack_codes = classifier.predict(X).astype(np.int8)
+    timestamps = load_dataset(path, columns=["timestamp"])["timestamp"].to_numpy()
+    return timestamps, scores, attack_codes
+
+
+def _cache_path(path):
+    return os.path.splitext(path)[0] + ".scores.npz"
+
+
+def _save_npz(path, **arrays):
+    # Through a file object, so np.savez doesn't append ".npz" to the temporary name
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def flight_scores(path):
+    """Cached model outputs for the flight in ``path``, recomputed when it or a model changes."""
+    key = _key(path)
+    flight = _flights.get(path)
+    if flight is not None and flight.key == key:
+        return flight
+
+    cache = _cache_path(path)
+    try:
+        with np.load(cache, allow_pickle=False) as stored:
+            if str(stored["key"]) != key:
+                raise ValueError("stale score cache")
+            flight = FlightScores(key, stored["timestamps"], stored["scores"], stored["attack_codes"])
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # A missing, stale or truncated cache is rebuilt and replaced in one step
+        flight = FlightScores(key, *compute_scores(path))
+        write_atomic(cache, lambda p: _save_npz(p, key=key, timestamps=flight.timestamps, scores=flight.scores,
+                                                attack_codes=flight.attack_codes))
+    _flights[path] = flight
+    return flight
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cache a flight's model outputs and sweep contamination thresholds.")
+    parser.add_argument("source", nargs="?", default=os.path.join("datasets", "synthetic_data_stream.csv"))
+    parser.add_argument("-o", "--output", help="also write the detection log at --contamination here")
+    parser.add_argument("--contamination", type=float, default=0.20)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    flight = flight_scores(args.source)
+    print(f"{len(flight)} rows scored or loaded from {_cache_path(args.source)} in "
+          f"{time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    sweep = flight.sweep()
+    print(f"Swept {len(sweep)} thresholds in {time.perf_counter() - start:.2f} s, no model calls:")
+    print(sweep.to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+
+    if args.output:
+        log = flight.detection_log(args.contamination)
+        log.to_csv(args.output, index=False)
+        print(f"Detection log at contamination {args.contamination} written to {args.output} "
+              f"({int((log['Signal Type'] != BENIGN).sum())} rows flagged)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure dashboard cold-start time per page.
+
+Each measurement runs in a fresh Python process, so nothing is already imported or
+cached in memory (on-disk caches such as the Feather datasets are kept, as they are
+in a deployed container). The app is driven headlessly with Streamlit's AppTest.
+
+Usage:
+    python -m utils.startup_bench --repeats 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Navigation labels from app.PAGES (app.py is a Streamlit script and can't be imported)
+DEFAULT_PAGES = ["Home", "Threat Analysis", "Fleet Monitor"]
+
+_CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_ready = time.perf_counter()
+modules_before = len(sys.modules)
+
+at = AppTest.from_file("app.py", default_timeout=600)
+at.session_state["page"] = sys.argv[1]
+at.run()
+rendered = time.perf_counter()
+
+print(json.dumps({
+    "streamlit_import_s": streamlit_ready - start,
+    "first_render_s": rendered - streamlit_ready,
+    "time_to_first_render_s": rendered - start,
+    "modules_imported": len(sys.modules) - modules_before,
+    "errors": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def measure_page(page):
+    """Cold-start timings for one page, measured in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, page], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(pages, repeats=3):
+    """Median cold-start timings per page over ``repeats`` fresh processes."""
+    report = {}
+    for page in pages:
+        runs = [measure_page(page) for _ in range(repeats)]
+        report[page] = {
+            key: statistics.median(run[key] for run in runs)
+            for key in ("streamlit_import_s", "first_render_s", "time_to_first_render_s", "modules_imported")
+        }
+        report[page]["errors"] = sorted({error for run in runs for error in run["errors"]})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure time-to-first-render for each dashboard page.")
+    parser.add_argument("--pages", nargs="+", default=DEFAULT_PAGES, help="navigation labels to measure")
+    parser.add_argument("--repeats", type=int, default=3, help="fresh processes per page")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.pages, args.repeats)
+    print(f"{'page':<18} {'streamlit':>10} {'render':>8} {'total':>8} {'modules':>8}")
+    for page, timings in report.items():
+        print(f"{page:<18} {timings['streamlit_import_s']:>9.2f}s {timings['first_render_s']:>7.2f}s "
+              f"{timings['time_to_first_render_s']:>7.2f}s {timings['modules_imported']:>8.0f}")
+        for error in timings["errors"]:
+            print(f"  error: {error}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
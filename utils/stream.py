@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from utils.features import FEATURES
+
+# Telemetry timestamps are integer microseconds; every other feature is a float
+FEATURE_DTYPES = {name: ("int64" if name == "timestamp" else "float64") for name in FEATURES}
+
+
+class SchemaError(ValueError):
+    """Raised when a telemetry CSV does not match the model's ``features`` schema."""
+
+
+def validate_header(source):
+    """Check that a CSV path or file has every model feature column.
+
+    File objects are rewound afterwards, so the same object can then be streamed.
+    An empty, unparseable or non-UTF-8 file raises ``SchemaError`` too.
+    """
+    try:
+        columns = pd.read_csv(source, nrows=0).columns
+    except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as exc:
+        raise SchemaError(f"the header could not be read: {exc}") from exc
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+    missing = [name for name in FEATURES if name not in columns]
+    if missing:
+        raise SchemaError(f"missing {len(missing)} of the {len(FEATURES)} model features: {', '.join(missing)}")
+
+
+def read_chunks(source, chunksize=10_000):
+    """Yield ``chunksize``-row DataFrames of the ``features`` columns from a CSV path or file.
+
+    The header is validated before any rows are read and every column is parsed
+    straight into its declared dtype, so only one chunk is ever held in memory.
+    """
+    validate_header(source)
+    reader = pd.read_csv(source, usecols=FEATURES, dtype=FEATURE_DTYPES, chunksize=chunksize)
+    first_row = 0
+    try:
+        for chunk in reader:
+            # Keep a running index so rows are addressed by stream position
+            chunk.index = pd.RangeIndex(first_row, first_row + len(chunk))
+            first_row += len(chunk)
+            yield chunk[FEATURES]
+    except ValueError as exc:
+        raise SchemaError(f"row {first_row + 1} onwards could not be parsed: {exc}") from exc
+
+
+def align_batches(chunks, batch_size):
+    """Re-cut a stream of DataFrames so every chunk holds a whole number of batches.
+
+    Batch boundaries are counted from the first row of the stream, independently of
+    how the input was chunked; only the final chunk may end in a partial batch.
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk])
+            carry = None
+        full = len(chunk) // batch_size * batch_size
+        if full:
+            yield chunk.iloc[:full]
+        if full < len(chunk):
+            carry = chunk.iloc[full:]
+    if carry is not None:
+        yield carry
+
+
+def dataset_batches(data, batch_size, start_index=0, features=None):
+    """Stream source over an in-memory dataset: yields ``(start, batch, features)``."""
+    for start in range(start_index, len(data), batch_size):
+        rows = slice(start, start + batch_size)
+        yield start, data.iloc[rows], (features[rows] if features is not None else None)
+
+
+def csv_batches(source, batch_size, start_index=0, chunksize=10_000):
+    """Stream source over a CSV path or file, parsed incrementally: yields ``(start, batch, features)``.
+
+    Each chunk's feature matrix is built once and sliced per batch. Rows before
+    ``start_index`` are parsed and skipped, which lets a stream resume where it stopped.
+    """
+    chunksize = max(chunksize // batch_size, 1) * batch_size
+    for chunk in align_batches(read_chunks(source, chunksize), batch_size):
+        chunk = chunk.loc[start_index:]
+        matrix = chunk.to_numpy(dtype=np.float64)
+        for offset in range(0, len(chunk), batch_size):
+            batch = chunk.iloc[offset:offset + batch_size]
+            yield int(batch.index[0]), batch, matrix[offset:offset + batch_size]
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.dataset_cache import load_dataset
+from utils.model_registry import file_hash
+
+SIGNALS_PATH = os.path.join("datasets", "data_sorted.csv")
+PREVIEW_PATH = os.path.join("datasets", "merged_data_unscaled.csv")
+IMPORTANCE_IF_PATH = "Feature Importance IF.csv"
+IMPORTANCE_RF_PATH = "Feature Importance RF.csv"
+CACHE_PATH = os.path.join("datasets", "home_summary.cache.json")
+
+# Remembers each source file's content hash against its (mtime, size), so unchanged
+# files are never re-read just to prove they are unchanged
+_hashes = {}
+_summaries = {}
+
+
+def content_hash(path):
+    """SHA-256 of a file, recomputed only when its mtime or size changes."""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _hashes.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _hashes[path] = (signature, file_hash(path))
+    return cached[1]
+
+
+def signal_counts(labels, sources):
+    """Benign / malicious / spoofed / jammed counts in a single pass over the labels."""
+    labels = np.asarray(labels, dtype=np.int64)
+    sources = np.asarray(sources, dtype=np.int64)
+    valid = (labels >= 0) & (labels <= 1) & (sources >= 0) & (sources <= 2)
+    # One bin per (label, source) pair: label * 3 + source
+    bins = np.bincount(labels[valid] * 3 + sources[valid], minlength=6)
+    return {
+        "benign": int(bins[:3].sum()),
+        "malicious": int(bins[3:].sum()),
+        "spoofed": int(bins[4]),
+        "jammed": int(bins[5]),
+    }
+
+
+def top_importances(path, n=10):
+    """The ``n`` most important features from a ``Feature Importance *.csv`` file.
+
+    Features without a measured importance (empty, e.g. missing from the training
+    data) are left out.
+    """
+    importances = pd.read_csv(path).dropna(subset=["Importance"])
+    return importances.nlargest(n, "Importance")[["Feature", "Importance"]]
+
+
+def _compute():
+    signals = load_dataset(SIGNALS_PATH, columns=["label", "source"])
+    preview = load_dataset(PREVIEW_PATH).head()
+    return {
+        "counts": signal_counts(signals["label"], signals["source"]),
+        "preview": preview.to_dict(orient="split"),
+        "importance_if": top_importances(IMPORTANCE_IF_PATH).to_dict(orient="split"),
+        "importance_rf": top_importances(IMPORTANCE_RF_PATH).to_dict(orient="split"),
+    }
+
+
+def _frame(split):
+    return pd.DataFrame(split["data"], index=split["index"], columns=split["columns"])
+
+
+def _read_cache():
+    try:
+        with open(CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def home_summary():
+    """Signal counts, dataset preview and top feature importances for the Home page.
+
+    Results are persisted in ``datasets/home_summary.cache.json`` under a key built
+    from the content hashes of every source file, and recomputed only when one of
+    those files changes. The file hashes themselves are persisted against each
+    file's (mtime, size), so a fresh process does not re-read unchanged datasets.
+    """
+    sources = (SIGNALS_PATH, PREVIEW_PATH, IMPORTANCE_IF_PATH, IMPORTANCE_RF_PATH)
+    stored = None
+    if not _hashes:
+        stored = _read_cache()
+        for path, (mtime_ns, size, digest) in stored.get("hashes", {}).items():
+            _hashes[path] = ((mtime_ns, size), digest)
+
+    key = hashlib.sha256("".join(content_hash(path) for path in sources).encode()).hexdigest()
+    summary = _summaries.get(key)
+    if summary is not None:
+        return summary
+
+    stored = stored if stored is not None else _read_cache()
+    if stored.get("key") == key:
+        payload = stored["summary"]
+    else:
+        payload = _compute()
+        hashes = {path: [*_hashes[path][0], _hashes[path][1]] for path in sources}
+        with open(CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "hashes": hashes, "summary": payload}, f)
+
+    summary = {
+        "counts": payload["counts"],
+        "preview": _frame(payload["preview"]),
+        "importance_if": _frame(payload["importance_if"]),
+        "importance_rf": _frame(payload["importance_rf"]),
+    }
+    _summaries.clear()
+    _summaries[key] = summary
+    return summary
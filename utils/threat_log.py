@@ -0,0 +1,125 @@
+import csv
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Attack type codes stored in the log
+SIGNAL_TYPES = ("Benign", "Spoofing", "Jamming")
+SIGNAL_CODES = {name: code for code, name in enumerate(SIGNAL_TYPES)}
+
+
+def _remove_spill(connection, path):
+    connection.close()
+    for leftover in (path, path + ".csv"):
+        try:
+            os.remove(leftover)
+        except OSError:
+            pass
+
+
+class ThreatLog:
+    """Detection log with a fixed-size in-memory window and an append-only spill file.
+
+    The newest ``window`` rows are held in preallocated typed columns (timestamp,
+    verdict, attack type code, anomaly score) used as a ring buffer, so appending is
+    O(rows appended) and memory stays constant however long the flight. Every row is
+    also appended to a SQLite file, from which the full log is streamed on export.
+    """
+
+    def __init__(self, window=1000, path=None):
+        self.window = window
+        self.timestamps = np.zeros(window, dtype=np.int64)
+        self.verdicts = np.zeros(window, dtype=np.int8)
+        self.attack_codes = np.zeros(window, dtype=np.int8)
+        self.scores = np.zeros(window, dtype=np.float32)
+        self.total = 0
+
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="uav-threat-log-", suffix=".sqlite")
+            os.close(fd)
+        self.path = path
+        self._lock = threading.Lock()
+        # Streamlit reruns may execute on different threads; access is serialised by _lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS log (timestamp INTEGER, verdict INTEGER, attack INTEGER, score REAL)"
+        )
+        self._finalizer = weakref.finalize(self, _remove_spill, self._db, path)
+
+    def __len__(self):
+        return self.total
+
+    def append(self, timestamps, signal_types, scores):
+        """Append a batch of verdicts; ``signal_types`` are names from ``SIGNAL_TYPES``."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        attack_codes = np.array([SIGNAL_CODES[name] for name in signal_types], dtype=np.int8)
+        verdicts = (attack_codes != 0).astype(np.int8)
+        scores = np.asarray(scores, dtype=np.float32)
+        n = len(timestamps)
+        if n == 0:
+            return
+
+        # Only the last `window` rows of the batch can survive in the ring
+        keep = slice(max(0, n - self.window), n)
+        positions = (self.total + np.arange(n)[keep]) % self.window
+        self.timestamps[positions] = timestamps[keep]
+        self.verdicts[positions] = verdicts[keep]
+        self.attack_codes[positions] = attack_codes[keep]
+        self.scores[positions] = scores[keep]
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO log VALUES (?, ?, ?, ?)",
+                zip(timestamps.tolist(), verdicts.tolist(), attack_codes.tolist(), scores.tolist()),
+            )
+            self._db.commit()
+        self.total += n
+
+    def tail(self, n=None):
+        """The newest ``n`` rows (at most ``window``) as a ``Time`` / ``Signal Type`` DataFrame."""
+        available = min(self.total, self.window)
+        n = available if n is None else min(n, available)
+        positions = (self.total - n + np.arange(n)) % self.window
+        return pd.DataFrame({
+            "Time": self.timestamps[positions].astype(str),
+            "Signal Type": np.asarray(SIGNAL_TYPES, dtype=object)[self.attack_codes[positions]],
+        })
+
+    def iter_csv(self, chunk_rows=10_000):
+        """Stream the full log as CSV text chunks, in the dashboard's download format."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(["Time", "Signal Type"])
+        with self._lock:
+            cursor = self._db.execute("SELECT timestamp, attack FROM log ORDER BY rowid")
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                writer.writerows((timestamp, SIGNAL_TYPES[attack]) for timestamp, attack in rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def export_csv(self, path=None):
+        """Write the full log to ``path`` without holding it in memory; returns ``path``.
+
+        Defaults to ``<spill file>.csv``, which is removed together with the log.
+        """
+        path = path or self.path + ".csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            for chunk in self.iter_csv():
+                f.write(chunk)
+        return path
+
+    def close(self):
+        """Close and delete the spill file."""
+        self._finalizer()
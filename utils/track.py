@@ -0,0 +1,286 @@
+"""Simplified flight tracks for the Home page map.
+
+A dataset may hold several recordings: each flight log has its own EKF reference
+origin (``RECORDING_COLUMNS``), and their timestamps overlap. Fixes are grouped
+by recording, ordered by timestamp within it and projected to local metres; no
+line is drawn between recordings. One Douglas-Peucker pass per recording gives
+every fix a significance: the largest tolerance at which Douglas-Peucker would
+still keep it. Each zoom level then shows only the fixes whose significance
+exceeds ``TOLERANCE_PX`` screen pixels at that zoom, which is the same as
+simplifying the track again at that tolerance.
+
+Verdict runs (benign, spoofing, jamming) are decimated the same way. The fix
+that starts a run is kept at least while both runs it separates span more than
+the tolerance, so every run wider than a pixel keeps its colour; runs smaller
+than a pixel merge into the run before them. Each segment takes the verdict of
+the fix it starts from.
+
+The significances are computed once per dataset content and cached in
+``datasets/<name>.track.npz``; the polylines for each zoom level are cached in
+memory. The map payload is therefore bounded by the detail each zoom level can
+show, not by how many fixes or verdict changes the flight has.
+
+Usage:
+    python -m utils.track                  # points kept and payload size per zoom level
+    python -m utils.track --fixes 200000   # the same for a synthetic long flight
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+import zipfile
+
+import numpy as np
+from utils.dataset_cache import load_dataset, write_atomic
+from utils.summary import PREVIEW_PATH, content_hash
+
+VERDICTS = {0: "Benign", 1: "Spoofing", 2: "Jamming"}
+# Reference origin of the local frame: the same for every fix of one flight log
+RECORDING_COLUMNS = ("ref_lon", "ref_alt")
+MIN_ZOOM, MAX_ZOOM = 1, 22
+TOLERANCE_PX = 1.0
+# Ground metres per pixel at zoom 0 on the equator (256-pixel Web Mercator tiles)
+METRES_PER_PIXEL = 156543.03392
+COORDINATE_DECIMALS = 7
+TRACK_COLUMNS = ["timestamp", "lat_x", "lon_x", "source", *RECORDING_COLUMNS]
+
+_tracks = {}
+
+
+def project(lat, lon):
+    """Equirectangular projection to metres around the track's mean position."""
+    lat0 = math.radians(float(np.mean(lat)))
+    y = (lat - np.mean(lat)) * 110_574.0
+    x = (lon - np.mean(lon)) * 111_320.0 * math.cos(lat0)
+    return x, y
+
+
+def _segment_distances(x, y, a, b):
+    """Distance of the points strictly between ``a`` and ``b`` to the segment joining them."""
+    px, py = x[a + 1:b] - x[a], y[a + 1:b] - y[a]
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    length = dx * dx + dy * dy
+    if length == 0.0:
+        return np.hypot(px, py)
+    t = np.clip((px * dx + py * dy) / length, 0.0, 1.0)
+    return np.hypot(px - t * dx, py - t * dy)
+
+
+def significance(x, y, breaks, min_tolerance=0.0):
+    """Douglas-Peucker significance of every point of a polyline.
+
+    ``breaks`` are indices that must always be kept (they get ``inf``), as are both
+    ends; the polyline is simplified separately between consecutive breaks. Points
+    that would only be kept below ``min_tolerance`` get 0, which saves refining
+    detail no zoom level shows.
+    """
+    n = len(x)
+    result = np.zeros(n)
+    fixed = np.unique(np.concatenate([[0, n - 1], np.asarray(breaks, dtype=np.intp)]))
+    result[fixed] = np.inf
+    stack = [(int(a), int(b), np.inf) for a, b in zip(fixed[:-1], fixed[1:])]
+    while stack:
+        a, b, cap = stack.pop()
+        if b - a < 2:
+            continue
+        distances = _segment_distances(x, y, a, b)
+        split = int(np.argmax(distances))
+        distance = float(distances[split])
+        if distance <= min_tolerance:
+            continue
+        # A point is only reached once its parent is kept, so it can't outrank it
+        keep = min(distance, cap)
+        split += a + 1
+        result[split] = keep
+        stack.append((a, split, keep))
+        stack.append((split, b, keep))
+    return result
+
+
+def tolerance(zoom, lat):
+    """Metres covered by ``TOLERANCE_PX`` screen pixels at ``zoom`` and latitude ``lat``."""
+    return TOLERANCE_PX * METRES_PER_PIXEL * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def run_extents(x, y, starts, ends):
+    """Diagonal of the bounding box of each run ``starts[i]:ends[i] + 1`` of a polyline."""
+    extents = []
+    for coordinate in (x, y):
+        low = np.minimum(np.minimum.reduceat(coordinate, starts), coordinate[ends])
+        high = np.maximum(np.maximum.reduceat(coordinate, starts), coordinate[ends])
+        extents.append(high - low)
+    return np.hypot(*extents)
+
+
+class FlightTrack:
+    """Time-ordered recordings with per-fix verdict codes and Douglas-Peucker significance."""
+
+    def __init__(self, lat, lon, verdict, significance, total_fixes, recording=None):
+        self.lat = lat
+        self.lon = lon
+        self.verdict = verdict
+        self.significance = significance
+        self.total_fixes = total_fixes
+        self.recording = np.zeros(len(lat), dtype=np.int32) if recording is None else recording
+        self._polylines = {}
+
+    @property
+    def center(self):
+        return [float(np.mean(self.lat)), float(np.mean(self.lon))]
+
+    @property
+    def bounds(self):
+        return [[float(self.lat.min()), float(self.lon.min())], [float(self.lat.max()), float(self.lon.max())]]
+
+    def kept(self, zoom):
+        """Indices of the fixes shown at ``zoom``."""
+        zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+        return np.flatnonzero(self.significance > tolerance(zoom, self.center[0]))
+
+    def polylines(self, zoom):
+        """``{verdict name: [[[lat, lon], ...], ...]}`` for ``zoom``, one polyline per verdict run.
+
+        Within a recording, each run ends on the first fix of the next one, so the
+        track is continuous; separate recordings are never joined.
+        """
+        zoom = min(max(int(zoom), MIN_ZOOM), MAX_ZOOM)
+        cached = self._polylines.get(zoom)
+        if cached is not None:
+            return cached
+
+        kept = self.kept(zoom)
+        # Segment i joins kept[i] and kept[i + 1] and takes the verdict of its start
+        segments = np.flatnonzero(self.recording[kept[1:]] == self.recording[kept[:-1]])
+        verdicts = self.verdict[kept[segments]]
+        splits = np.flatnonzero((np.diff(segments) != 1) | (np.diff(verdicts) != 0)) + 1
+        starts = np.concatenate([[0], splits]) if len(segments) else splits
+        ends = np.append(splits, len(segments))
+        points = np.column_stack([self.lat[kept], self.lon[kept]]).round(COORDINATE_DECIMALS)
+        lines = {}
+        for start, end in zip(starts, ends):
+            name = VERDICTS.get(int(verdicts[start]), "Unknown")
+            lines.setdefault(name, []).append(points[segments[start]:segments[end - 1] + 2].tolist())
+        self._polylines[zoom] = lines
+        return lines
+
+    def payload_bytes(self, zoom):
+        """Size of the coordinates sent to the browser at ``zoom``, as JSON."""
+        return len(json.dumps(self.polylines(zoom), separators=(",", ":")))
+
+
+def build_track(data, verdict_column="source"):
+    """``FlightTrack`` for a table with ``timestamp``, ``lat_x``, ``lon_x`` and verdict codes.
+
+    Rows are split into recordings by ``RECORDING_COLUMNS`` when the table has them.
+    """
+    columns = [name for name in RECORDING_COLUMNS if name in data.columns]
+    recording = data.groupby(columns, sort=False).ngroup().to_numpy() if columns else np.zeros(len(data), np.intp)
+    order = np.lexsort((data["timestamp"].to_numpy(), recording))
+    recording = recording[order].astype(np.int32)
+    lat = data["lat_x"].to_numpy(dtype=np.float64)[order]
+    lon = data["lon_x"].to_numpy(dtype=np.float64)[order]
+    verdict = data[verdict_column].to_numpy(dtype=np.int8)[order]
+    x, y = project(lat, lon)
+
+    # Both ends of every recording are kept, so each is simplified on its own
+    firsts = np.flatnonzero(np.diff(recording)) + 1
+    min_tolerance = tolerance(MAX_ZOOM, float(np.mean(lat)))
+    scores = significance(x, y, np.concatenate([firsts - 1, firsts]), min_tolerance)
+
+    # A run's first fix stays while it and the run before both span more than the tolerance
+    starts = np.concatenate([[0], np.flatnonzero((np.diff(verdict) != 0) | (np.diff(recording) != 0)) + 1])
+    ends = np.append(starts[1:], len(verdict))
+    # Runs close on the next run's first fix, within the same recording
+    closing = np.where((ends < len(verdict)) & (recording[np.minimum(ends, len(verdict) - 1)] == recording[starts]),
+                       ends, ends - 1)
+    extents = run_extents(x, y, starts, closing)
+    follows = recording[starts[1:]] == recording[starts[1:] - 1]
+    boundaries = starts[1:][follows]
+    scores[boundaries] = np.maximum(scores[boundaries], np.minimum(extents[:-1], extents[1:])[follows])
+    scores[scores <= min_tolerance] = 0.0
+
+    # Fixes no zoom level shows are dropped
+    shown = scores > 0
+    return FlightTrack(lat[shown], lon[shown], verdict[shown], scores[shown], len(data), recording[shown])
+
+
+def _cache_path(path):
+    return os.path.splitext(path)[0] + ".track.npz"
+
+
+def _save_npz(path, **arrays):
+    # Through a file object, so np.savez doesn't append ".npz" to the temporary name
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def flight_track(path=PREVIEW_PATH):
+    """Simplified track of the flight in ``path``, rebuilt only when the file's content changes."""
+    key = content_hash(path)
+    track = _tracks.get(path)
+    if track is not None and track[0] == key:
+        return track[1]
+
+    cache = _cache_path(path)
+    try:
+        with np.load(cache, allow_pickle=False) as stored:
+            if str(stored["key"]) != key:
+                raise ValueError("stale track cache")
+            flight = FlightTrack(stored["lat"], stored["lon"], stored["verdict"], stored["significance"],
+                                 int(stored["total_fixes"]), stored["recording"])
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # A missing, stale or truncated cache is rebuilt and replaced in one step
+        flight = build_track(load_dataset(path, columns=TRACK_COLUMNS))
+        write_atomic(cache, lambda p: _save_npz(p, key=key, lat=flight.lat, lon=flight.lon, verdict=flight.verdict,
+                                                significance=flight.significance, total_fixes=flight.total_fixes,
+                                                recording=flight.recording))
+    _tracks[path] = (key, flight)
+    return flight
+
+
+def synthetic_flight(fixes, seed=0):
+    """A long random-walk flight around the training data's position, with attack episodes."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.05, fixes))
+    step = 2e-6 * rng.uniform(0.5, 1.5, fixes)
+    verdict = np.zeros(fixes, dtype=np.int8)
+    for start in rng.integers(0, fixes, max(fixes // 5000, 1)):
+        verdict[start:start + rng.integers(100, 1000)] = rng.integers(1, 3)
+    return pd.DataFrame({
+        "timestamp": np.arange(fixes) * 50_000,
+        "lat_x": 36.2048 + np.cumsum(step * np.cos(heading)),
+        "lon_x": 138.2529 + np.cumsum(step * np.sin(heading)),
+        "source": verdict,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report flight-track simplification per zoom level.")
+    parser.add_argument("source", nargs="?", default=PREVIEW_PATH)
+    parser.add_argument("--fixes", type=int, help="use a synthetic flight with this many fixes instead")
+    args = parser.parse_args(argv)
+
+    if args.fixes:
+        data = synthetic_flight(args.fixes)
+    else:
+        data = load_dataset(args.source, columns=TRACK_COLUMNS)
+    start = time.perf_counter()
+    flight = build_track(data)
+    print(f"{flight.total_fixes} fixes simplified in {time.perf_counter() - start:.2f} s; "
+          f"{len(flight.lat)} are shown at some zoom level")
+
+    full = data[["lat_x", "lon_x"]].to_numpy().round(COORDINATE_DECIMALS).tolist()
+    print(f"Unsimplified payload: {len(json.dumps(full, separators=(',', ':'))) / 1024:,.0f} KB")
+    print(f"{'zoom':>4} {'fixes':>8} {'polylines':>9} {'KB':>8}")
+    for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+        lines = flight.polylines(zoom)
+        print(f"{zoom:>4} {len(flight.kept(zoom)):>8} {sum(map(len, lines.values())):>9} "
+              f"{flight.payload_bytes(zoom) / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()